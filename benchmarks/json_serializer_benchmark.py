@@ -0,0 +1,63 @@
+"""Compares the encode and decode times of the available JSON serializers on a
+vector-heavy add_documents batch.
+
+Usage:
+    python benchmarks/json_serializer_benchmark.py [--docs 128] [--dim 768] [--repeat 20]
+"""
+import argparse
+import random
+import timeit
+
+from marqo.serializers import JsonSerializer, OrjsonSerializer, orjson
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def build_batch(num_docs: int, dim: int, as_numpy: bool):
+    documents = []
+    for i in range(num_docs):
+        vector = [random.random() for _ in range(dim)]
+        documents.append({
+            "_id": str(i),
+            "title": f"Document {i}",
+            "my_custom_vector": {
+                "content": f"Content of document {i}",
+                "vector": np.asarray(vector, dtype=np.float32) if as_numpy else vector,
+            },
+        })
+    return {"documents": documents, "tensorFields": ["my_custom_vector"], "useExistingTensors": False}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=128, help="documents per batch")
+    parser.add_argument("--dim", type=int, default=768, help="dimensions of each custom vector")
+    parser.add_argument("--repeat", type=int, default=20, help="number of timed runs")
+    args = parser.parse_args()
+
+    serializers = [JsonSerializer()]
+    if orjson is not None:
+        serializers.append(OrjsonSerializer())
+    else:
+        print("orjson is not installed, only the json module is benchmarked.")
+
+    payloads = [("lists", build_batch(args.docs, args.dim, as_numpy=False))]
+    if np is not None:
+        payloads.append(("numpy", build_batch(args.docs, args.dim, as_numpy=True)))
+
+    print(f"{args.docs} docs x {args.dim} dims, best of {args.repeat} runs")
+    print(f"{'serializer':<10} {'vectors':<8} {'size (MB)':>10} {'encode (ms)':>12} {'decode (ms)':>12}")
+    for payload_name, payload in payloads:
+        for serializer in serializers:
+            encoded = serializer.dumps(payload)
+            encode_s = min(timeit.repeat(lambda: serializer.dumps(payload), number=1, repeat=args.repeat))
+            decode_s = min(timeit.repeat(lambda: serializer.loads(encoded), number=1, repeat=args.repeat))
+            print(f"{serializer.name:<10} {payload_name:<8} {len(encoded) / 1e6:>10.2f} "
+                  f"{encode_s * 1000:>12.1f} {decode_s * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
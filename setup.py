@@ -13,6 +13,15 @@ setup(
         "typing-extensions>=4.5.0",
         "packaging"
     ],
+    extras_require={
+        "async": ["httpx"],
+        "orjson": ["orjson"],
+        "simdjson": ["pysimdjson"],
+        "zstd": ["zstandard"],
+        "arrow": ["numpy", "pyarrow>=14"],
+        "prometheus": ["prometheus_client"],
+        "tracing": ["opentelemetry-api"],
+    },
     tests_require=[
         "pytest",
         "tox"
@@ -1,4 +1,11 @@
 from marqo.client import Client
+from marqo.async_client import AsyncClient
+from marqo.retry import RetryPolicy
+from marqo.search_cache import SearchResultCache
+from marqo.disk_cache import DiskCache
+from marqo.request_coalescing import DocumentLoader, SearchBatcher, SingleFlight
+from marqo.metrics import MetricsRegistry
+from marqo.batching import AdaptiveBatchSizer
 from marqo.enums import SearchMethods
 from marqo.version import supported_marqo_version
 import logging
@@ -0,0 +1,164 @@
+import asyncio
+import copy
+import functools
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - exercised only when the optional dependency is missing
+    httpx = None
+
+from marqo import compression, tracing
+from marqo._httprequests import ALLOWED_OPERATIONS, HTTP_OPERATIONS, HttpRequests, convert_to_marqo_error_and_raise
+from marqo.config import Config
+from marqo.errors import BackendCommunicationError, BackendTimeoutError
+
+
+def new_async_transport(
+        max_connections: Optional[int] = 100,
+        max_keepalive_connections: Optional[int] = 20
+) -> "httpx.AsyncClient":
+    """Creates the pooled asyncio HTTP transport used by AsyncClient.
+
+    Args:
+        max_connections: maximum number of concurrent connections in the pool.
+            None means no limit.
+        max_keepalive_connections: maximum number of idle connections kept alive.
+
+    Raises:
+        ImportError: if httpx, the optional async dependency, isn't installed.
+    """
+    if httpx is None:
+        raise ImportError(
+            "The Marqo async client requires the `httpx` package. "
+            "Install it with `pip install marqo[async]` or `pip install httpx`."
+        )
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections),
+        follow_redirects=True,
+    )
+
+
+class AsyncHttpRequests(HttpRequests):
+    """asyncio counterpart of HttpRequests.
+
+    Path construction and headers are inherited from HttpRequests. send_request()
+    is a coroutine, so the inherited get/post/put/delete/patch helpers return
+    awaitables. URLs of remote instance mappings are resolved in a worker thread,
+    as they may have to call the control plane, so as not to block the event loop.
+    """
+
+    def __init__(self, config: Config, transport: "httpx.AsyncClient") -> None:
+        super().__init__(config)
+        self.transport = transport
+
+    async def send_request(
+        self,
+        http_operation: HTTP_OPERATIONS,
+        path: str,
+        body: Optional[Union[Dict[str, Any], List[Dict[str, Any]], List[str], str]] = None,
+        content_type: Optional[str] = None,
+        index_name: str = "",
+        retryable: bool = False,
+        decoder: Optional[Callable[[bytes], Any]] = None,
+        retry_errors: bool = True
+    ) -> Any:
+        if http_operation not in ALLOWED_OPERATIONS:
+            raise ValueError("{} not an allowed operation {}".format(http_operation, ALLOWED_OPERATIONS))
+
+        req_headers = copy.deepcopy(self.headers)
+
+        if content_type is not None and content_type:
+            req_headers['Content-Type'] = content_type
+
+        if not isinstance(body, (bytes, str)) and body is not None:
+            body = self.config.serializer.dumps(body)
+
+        if body is not None and self.config.compressor is not None:
+            body, content_encoding = self.config.compressor.compress(body)
+            if content_encoding is not None:
+                req_headers['Content-Encoding'] = content_encoding
+        req_headers['Accept-Encoding'] = compression.accept_encoding()
+
+        with tracing.start_span("marqo.request", client=True) as span:
+            tracing.inject_context(req_headers)
+            start = time.perf_counter()
+            try:
+                response, res = await self._send_with_retries(
+                    http_operation, path, body, req_headers, index_name, retryable, decoder, retry_errors
+                )
+            except Exception as e:
+                self._record_request(http_operation, path, index_name, start, body, span, error=e)
+                raise
+            self._record_request(http_operation, path, index_name, start, body, span, response=response, res=res)
+            return res
+
+    async def _send_with_retries(
+        self,
+        http_operation: HTTP_OPERATIONS,
+        path: str,
+        body: Optional[Union[bytes, str]],
+        req_headers: Dict[str, str],
+        index_name: str,
+        retryable: bool,
+        decoder: Optional[Callable[[bytes], Any]] = None,
+        retry_errors: bool = True
+    ) -> Tuple["httpx.Response", Any]:
+        retry_policy = self.config.retry_policy if retryable else None
+        attempt = 1
+        while True:
+            try:
+                url = self._construct_url(await self._get_base_url_off_loop(path, index_name), path)
+                response = await self.transport.request(
+                    http_operation.upper(),
+                    url=url,
+                    timeout=self.config.timeout,
+                    headers=req_headers,
+                    content=body,
+                )
+            except httpx.TimeoutException as err:
+                delay = retry_policy.delay_for_error(True, attempt) \
+                    if retry_policy is not None and retry_errors else None
+                if delay is None:
+                    raise BackendTimeoutError(str(err)) from err
+                self._log_retry(http_operation, path, attempt, delay, "a timeout")
+            except httpx.TransportError as err:
+                if index_name:
+                    self.config.instance_mapping.index_http_error_handler(index_name)
+
+                delay = retry_policy.delay_for_error(False, attempt) \
+                    if retry_policy is not None and retry_errors else None
+                if delay is None:
+                    raise BackendCommunicationError(str(err)) from err
+                self._log_retry(http_operation, path, attempt, delay, f"a connection error ({err})")
+            else:
+                delay = retry_policy.delay_for_status(response.status_code, response.headers, attempt) \
+                    if retry_policy is not None else None
+                if delay is None:
+                    return response, self._add_retries_to_telemetry(self._validate(response, decoder), attempt - 1)
+                self._log_retry(http_operation, path, attempt, delay, f"status code {response.status_code}")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _get_base_url_off_loop(self, path: str, index_name: str = "") -> str:
+        if self.config.instance_mapping.is_remote():
+            return await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(self._get_base_url, path, index_name)
+            )
+        return self._get_base_url(path, index_name)
+
+    def _validate(
+        self,
+        request: "httpx.Response",
+        decoder: Optional[Callable[[bytes], Any]] = None
+    ) -> Any:
+        try:
+            request.raise_for_status()
+        except httpx.HTTPStatusError as err:
+            convert_to_marqo_error_and_raise(response=request, err=err)
+        if request.content == b'':
+            return request
+        return (decoder or self.config.serializer.loads)(
+            compression.decompress_response(request.content, request.headers.get('Content-Encoding'))
+        )
@@ -1,28 +1,22 @@
 import copy
-import json
+import time
 from json.decoder import JSONDecodeError
-from typing import get_args, Any, Callable, Dict, Literal, List, Optional, Tuple, Union
+from typing import get_args, Any, Callable, Dict, Literal, List, Mapping, Optional, Tuple, Union
 
 import requests
 
+from marqo import compression, tracing
 from marqo.config import Config
 from marqo.errors import (
     MarqoWebError,
     BackendCommunicationError,
     BackendTimeoutError
 )
+from marqo.marqo_logging import mq_logger
+from marqo.metrics import request_labels
 
 HTTP_OPERATIONS = Literal["delete", "get", "post", "put", "patch"]
 ALLOWED_OPERATIONS: Tuple[HTTP_OPERATIONS, ...] = get_args(HTTP_OPERATIONS)
-session = requests.Session()
-
-OPERATION_MAPPING = {
-    'delete': session.delete,
-    'get': session.get,
-    'post': session.post,
-    'put': session.put,
-    'patch': session.patch
-}
 
 
 class HttpRequests:
@@ -30,17 +24,22 @@ class HttpRequests:
         self.config = config
         self.headers = {'x-api-key': config.api_key} if config.api_key else {}
 
-    def _operation(self, method: HTTP_OPERATIONS) -> Callable:
+    def _operation(self, method: HTTP_OPERATIONS, base_url: str) -> Callable:
+        """Returns the method of the session pooling connections to base_url."""
         if method not in ALLOWED_OPERATIONS:
             raise ValueError("{} not an allowed operation {}".format(method, ALLOWED_OPERATIONS))
 
-        return OPERATION_MAPPING[method]
+        return getattr(self.config.session_pool.get_session(base_url), method)
+
+    def _get_base_url(self, path: str, index_name="") -> str:
+        return self.config.instance_mapping.get_index_base_url(index_name=index_name) if index_name \
+            else self.config.instance_mapping.get_control_base_url(path=path)
 
     def _construct_path(self, path: str, index_name="") -> str:
         """Augment the URL request path based if telemetry is required."""
-        base_url = self.config.instance_mapping.get_index_base_url(index_name=index_name) if index_name \
-            else self.config.instance_mapping.get_control_base_url(path=path)
+        return self._construct_url(self._get_base_url(path, index_name), path)
 
+    def _construct_url(self, base_url: str, path: str) -> str:
         url = f"{base_url}/{path}"
 
         if self.config.use_telemetry:
@@ -54,96 +53,249 @@ class HttpRequests:
         path: str,
         body: Optional[Union[Dict[str, Any], List[Dict[str, Any]], List[str], str]] = None,
         content_type: Optional[str] = None,
-        index_name: str = ""
+        index_name: str = "",
+        retryable: bool = False,
+        decoder: Optional[Callable[[bytes], Any]] = None,
+        retry_errors: bool = True
     ) -> Any:
+        """Sends a request to Marqo and returns its decoded response.
+
+        Args:
+            retryable: whether the request is safe to repeat. If True and the config
+                has a retry_policy, transient failures are retried according to it.
+            decoder: decodes the body of a successful response instead of the
+                configured serializer, e.g. serializers.lazy_loads
+            retry_errors: whether timeouts and connection errors are retried, as
+                well as the retried status codes. False for requests that may
+                not be safe to repeat if they reached Marqo before failing.
+        """
         req_headers = copy.deepcopy(self.headers)
 
         if content_type is not None and content_type:
             req_headers['Content-Type'] = content_type
 
         if not isinstance(body, (bytes, str)) and body is not None:
-            body = json.dumps(body)
+            body = self.config.serializer.dumps(body)
 
-        try:
-            response = self._operation(http_operation)(
-                url=self._construct_path(path, index_name),
-                timeout=self.config.timeout,
-                headers=req_headers,
-                data=body,
-                verify=True
-            )
-            return self._validate(response)
-        except requests.exceptions.Timeout as err:
-            raise BackendTimeoutError(str(err)) from err
-        except requests.exceptions.ConnectionError as err:
+        if body is not None and self.config.compressor is not None:
+            body, content_encoding = self.config.compressor.compress(body)
+            if content_encoding is not None:
+                req_headers['Content-Encoding'] = content_encoding
+        req_headers['Accept-Encoding'] = compression.accept_encoding()
+
+        with tracing.start_span("marqo.request", client=True) as span:
+            tracing.inject_context(req_headers)
+            start = time.perf_counter()
+            try:
+                response, res = self._send_with_retries(
+                    http_operation, path, body, req_headers, index_name, retryable, decoder, retry_errors
+                )
+            except Exception as e:
+                self._record_request(http_operation, path, index_name, start, body, span, error=e)
+                raise
+            self._record_request(http_operation, path, index_name, start, body, span, response=response, res=res)
+            return res
+
+    def _send_with_retries(
+        self,
+        http_operation: HTTP_OPERATIONS,
+        path: str,
+        body: Optional[Union[bytes, str]],
+        req_headers: Dict[str, str],
+        index_name: str,
+        retryable: bool,
+        decoder: Optional[Callable[[bytes], Any]] = None,
+        retry_errors: bool = True
+    ) -> Tuple[requests.Response, Any]:
+        """Sends an encoded request, retrying it if allowed. Returns the response and its decoded body."""
+        retry_policy = self.config.retry_policy if retryable else None
+        attempt = 1
+        while True:
+            try:
+                base_url = self._get_base_url(path, index_name)
+                response = self._operation(http_operation, base_url)(
+                    url=self._construct_url(base_url, path),
+                    timeout=self.config.timeout,
+                    headers=req_headers,
+                    data=body,
+                    verify=True
+                )
+                if retry_policy is not None:
+                    delay = retry_policy.delay_for_status(response.status_code, response.headers, attempt)
+                    if delay is not None:
+                        self._log_retry(http_operation, path, attempt, delay, f"status code {response.status_code}")
+                        time.sleep(delay)
+                        attempt += 1
+                        continue
+                return response, self._add_retries_to_telemetry(self._validate(response, decoder), attempt - 1)
+            except requests.exceptions.Timeout as err:
+                delay = retry_policy.delay_for_error(True, attempt) \
+                    if retry_policy is not None and retry_errors else None
+                if delay is None:
+                    raise BackendTimeoutError(str(err)) from err
+                self._log_retry(http_operation, path, attempt, delay, "a timeout")
+            except requests.exceptions.ConnectionError as err:
+                if index_name:
+                    self.config.instance_mapping.index_http_error_handler(index_name)
+
+                delay = retry_policy.delay_for_error(False, attempt) \
+                    if retry_policy is not None and retry_errors else None
+                if delay is None:
+                    raise BackendCommunicationError(str(err)) from err
+                self._log_retry(http_operation, path, attempt, delay, f"a connection error ({err})")
+            time.sleep(delay)
+            attempt += 1
+
+    def _record_request(self, http_operation: str, path: str, index_name: str, start: float,
+                        body: Optional[Union[bytes, str]], span: Any, response: Any = None, res: Any = None,
+                        error: Optional[BaseException] = None) -> None:
+        """Records a request sent by send_request() in the metrics registry of the config,
+        and on its tracing span."""
+        if error is not None:
+            # error responses are raised as MarqoWebErrors from the HTTP library's error
+            response = getattr(error.__cause__, "response", None)
+        bytes_sent = _sent_size(response, body)
+        bytes_received = _received_size(response)
+        self.config.metrics_registry.record_request(
+            http_operation, path, index_name, time.perf_counter() - start,
+            bytes_sent=bytes_sent, bytes_received=bytes_received, response=res, error=error
+        )
+
+        if span.is_recording():
+            operation, index_name = request_labels(http_operation, path, index_name)
+            span.set_attribute(tracing.HTTP_REQUEST_METHOD, http_operation.upper())
+            span.set_attribute(tracing.OPERATION, operation)
             if index_name:
-                self.config.instance_mapping.index_http_error_handler(index_name)
+                span.set_attribute(tracing.INDEX_NAME, index_name)
+            span.set_attribute(tracing.HTTP_REQUEST_BODY_SIZE, bytes_sent)
+            span.set_attribute(tracing.HTTP_RESPONSE_BODY_SIZE, bytes_received)
+            status_code = getattr(response, "status_code", None)
+            if isinstance(status_code, int):
+                span.set_attribute(tracing.HTTP_RESPONSE_STATUS_CODE, status_code)
+            tracing.set_processing_time(span, res)
+
+    def _log_retry(self, http_operation: str, path: str, attempt: int, delay: float, reason: str) -> None:
+        mq_logger.debug(f"Retrying {http_operation.upper()} {path} after {reason}: attempt {attempt} of "
+                        f"{self.config.retry_policy.max_attempts} failed, retrying in {delay:.3f}s.")
 
-            raise BackendCommunicationError(str(err)) from err
+    def _add_retries_to_telemetry(self, response: Any, retries: int) -> Any:
+        """Reports the number of client-side retries in the telemetry of the response."""
+        if retries and self.config.use_telemetry and isinstance(response, dict):
+            response.setdefault("telemetry", {})["clientRetries"] = retries
+        return response
 
     def get(
         self, path: str,
         body: Optional[Union[Dict[str, Any], List[Dict[str, Any]], List[str], str]] = None,
-        index_name: str = ""
+        index_name: str = "",
+        retryable: bool = True
     ) -> Any:
         content_type = None
         if body is not None:
             content_type = 'application/json'
-        return self.send_request('get', path=path, body=body, content_type=content_type,index_name=index_name)
+        return self.send_request('get', path=path, body=body, content_type=content_type,index_name=index_name,
+                                 retryable=retryable)
 
     def post(
         self,
         path: str,
         body: Optional[Union[Dict[str, Any], List[Dict[str, Any]], List[str], str]] = None,
         content_type: Optional[str] = 'application/json',
-        index_name: str = ""
+        index_name: str = "",
+        retryable: bool = False,
+        decoder: Optional[Callable[[bytes], Any]] = None,
+        retry_errors: bool = True
     ) -> Any:
-        return self.send_request('post', path, body, content_type, index_name=index_name)
+        return self.send_request('post', path, body, content_type, index_name=index_name, retryable=retryable,
+                                 decoder=decoder, retry_errors=retry_errors)
 
     def put(
         self,
         path: str,
         body: Optional[Union[Dict[str, Any], List[Dict[str, Any]], List[str], str]] = None,
         content_type: Optional[str] = None,
-        index_name: str = ""
+        index_name: str = "",
+        retryable: bool = False
     ) -> Any:
         if body is not None:
             content_type = 'application/json'
-        return self.send_request('put', path, body, content_type, index_name=index_name)
+        return self.send_request('put', path, body, content_type, index_name=index_name, retryable=retryable)
 
     def delete(
         self,
         path: str,
         body: Optional[Union[Dict[str, Any], List[Dict[str, Any]], List[str]]] = None,
-        index_name: str = ""
+        index_name: str = "",
+        retryable: bool = False
     ) -> Any:
-        return self.send_request('delete', path, body, index_name=index_name)
+        return self.send_request('delete', path, body, index_name=index_name, retryable=retryable)
 
     def patch(self,
               path: str,
               body: Optional[Union[Dict[str, Any], List[Dict[str, Any]], List[str], str]] = None,
-              index_name: str = "") -> Any:
-        return self.send_request('patch', path, body, index_name=index_name)
+              index_name: str = "",
+              retryable: bool = False) -> Any:
+        return self.send_request('patch', path, body, index_name=index_name, retryable=retryable)
 
-    @staticmethod
     def __to_json(
-        request: requests.Response
+        self,
+        request: requests.Response,
+        decoder: Optional[Callable[[bytes], Any]] = None
     ) -> Any:
         if request.content == b'':
             return request
-        return request.json()
+        content = compression.decompress_response(request.content, request.headers.get('Content-Encoding'))
+        try:
+            return (decoder or self.config.serializer.loads)(content)
+        except ValueError as e:
+            # raised as response.json() does, so that callers catching RequestException still catch it
+            raise requests.exceptions.JSONDecodeError(
+                getattr(e, "msg", str(e)), getattr(e, "doc", ""), getattr(e, "pos", 0)
+            ) from e
 
-    @staticmethod
     def _validate(
-        request: requests.Response
+        self,
+        request: requests.Response,
+        decoder: Optional[Callable[[bytes], Any]] = None
     ) -> Any:
         try:
             request.raise_for_status()
-            return HttpRequests.__to_json(request)
+            return self.__to_json(request, decoder)
         except requests.exceptions.HTTPError as err:
             convert_to_marqo_error_and_raise(response=request, err=err)
 
 
+def _content_length(message: Any) -> Optional[int]:
+    """Returns the Content-Length header of a requests or httpx request or response, if it has one."""
+    headers = getattr(message, "headers", None)
+    value = headers.get("Content-Length") if isinstance(headers, Mapping) else None
+    return int(value) if isinstance(value, (str, bytes, int)) and str(value).isdigit() else None
+
+
+def _sent_size(response: Any, body: Optional[Union[bytes, str]]) -> int:
+    """Returns the number of body bytes sent: the Content-Length the HTTP library sent,
+    or, when no response was received, the length of the body."""
+    content_length = _content_length(getattr(response, "request", None))
+    if content_length is not None:
+        return content_length
+    # JSON bodies serialised to str are ASCII, one byte per character
+    return len(body) if body is not None else 0
+
+
+def _received_size(response: Any) -> int:
+    """Returns the number of body bytes received, before the response was decompressed."""
+    content_length = _content_length(response)
+    if content_length is not None:
+        return content_length
+    # bytes read from the connection: urllib3's tell(), or httpx's num_bytes_downloaded
+    raw = getattr(response, "raw", None)
+    received = raw.tell() if callable(getattr(raw, "tell", None)) else getattr(response, "num_bytes_downloaded", None)
+    if isinstance(received, int):
+        return received
+    content = getattr(response, "content", None)
+    return len(content) if isinstance(content, bytes) else 0
+
+
 def convert_to_marqo_error_and_raise(response: requests.Response, err: requests.exceptions.HTTPError) -> None:
     """Raises a generic MarqoWebError for a given HTTPError"""
     try:
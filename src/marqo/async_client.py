@@ -0,0 +1,193 @@
+import asyncio
+import functools
+from timeit import default_timer as timer
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from marqo import tracing
+from marqo._async_httprequests import AsyncHttpRequests, new_async_transport
+from marqo.async_index import AsyncIndex
+from marqo.client import Client
+from marqo.disk_cache import DiskCache
+from marqo.cloud_helpers import async_cloud_wait_for_indexes_status
+from marqo.enums import IndexStatus
+from marqo.errors import UnsupportedOperationError
+from marqo.instance_mappings import InstanceMappings
+from marqo.metrics import MetricsRegistry
+from marqo.models.search_models import BulkSearchQuery
+from marqo.results import ColumnarBulkSearchResult
+from marqo.retry import RetryPolicy
+
+
+class AsyncClient:
+    """
+    asyncio counterpart of marqo.Client.
+
+    All index operations are coroutines sharing one pooled HTTP transport, so a
+    single event loop can keep many requests in flight. Index creation and
+    deletion are not provided here; use marqo.Client for those.
+
+    The client should be closed when no longer needed, either with
+    `await client.close()` or by using it as an async context manager:
+
+        async with marqo.AsyncClient("http://localhost:8882") as mq:
+            res = await mq.index("my-index").search("query")
+    """
+
+    def __init__(
+            self, url: Optional[str] = "http://localhost:8882",
+            instance_mappings: Optional[InstanceMappings] = None,
+            main_user: str = None, main_password: str = None,
+            return_telemetry: bool = False,
+            api_key: str = None,
+            max_connections: Optional[int] = 100,
+            max_keepalive_connections: Optional[int] = 20,
+            retry_policy: Optional[RetryPolicy] = None,
+            compression: Optional[str] = None,
+            compression_threshold: int = 64 * 1024,
+            bulk_search_chunk_size: int = 100,
+            get_documents_chunk_size: int = 10000,
+            background_url_refresh: bool = False,
+            disk_cache: Optional[DiskCache] = None,
+            metrics_registry: Optional[MetricsRegistry] = None
+    ) -> None:
+        """
+        Parameters
+        ----------
+        url, instance_mappings, main_user, main_password, return_telemetry, api_key:
+            Same as for marqo.Client
+        max_connections:
+            The maximum number of concurrent connections in the client's pool.
+            None means no limit.
+        max_keepalive_connections:
+            The maximum number of idle connections kept alive in the client's pool.
+        retry_policy, compression, compression_threshold, bulk_search_chunk_size, get_documents_chunk_size,
+        background_url_refresh, disk_cache, metrics_registry:
+            Same as for marqo.Client
+        """
+        self.config = Client._build_config(
+            url=url, instance_mappings=instance_mappings, main_user=main_user, main_password=main_password,
+            return_telemetry=return_telemetry, api_key=api_key, background_url_refresh=background_url_refresh,
+            disk_cache=disk_cache, metrics_registry=metrics_registry, retry_policy=retry_policy,
+            compression=compression, compression_threshold=compression_threshold,
+            bulk_search_chunk_size=bulk_search_chunk_size, get_documents_chunk_size=get_documents_chunk_size
+        )
+        self.http = AsyncHttpRequests(
+            self.config,
+            transport=new_async_transport(
+                max_connections=max_connections, max_keepalive_connections=max_keepalive_connections
+            )
+        )
+
+    async def __aenter__(self) -> "AsyncClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Closes the connections of the client's pool."""
+        await self.http.transport.aclose()
+        self.config.instance_mapping.close()
+
+    def metrics(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Returns a snapshot of the metrics of the requests sent by this client. See Client.metrics()."""
+        return self.config.metrics_registry.snapshot()
+
+    def index(self, index_name: str) -> AsyncIndex:
+        """Create a local reference to an index identified by index_name,
+        without doing an HTTP call.
+
+        Args:
+            index_name: name of the index
+
+        Returns:
+            An AsyncIndex instance.
+        """
+        if index_name is not None:
+            return AsyncIndex(self.config, index_name=index_name, http=self.http)
+        raise Exception('The index UID should not be None')
+
+    async def get_index(self, index_name: str) -> AsyncIndex:
+        """Get the index. This index should already exist.
+
+        Args:
+            index_name: name of the index
+
+        Returns:
+            An AsyncIndex instance containing the information of the fetched index.
+        """
+        ix = self.index(index_name)
+        # verify it exists:
+        await self.http.get(path=f"indexes/{index_name}/stats", index_name=index_name)
+        return ix
+
+    async def get_indexes(self) -> Dict[str, List[Dict[str, str]]]:
+        """Get all indexes.
+
+        Returns:
+        Indexes, a dictionary with the name of indexes.
+        """
+        response = await self.http.get(path='indexes')
+        return {
+            "results": [
+                {"indexName": index_info["indexName"]} for index_info in response["results"]
+            ]
+        }
+
+    async def wait_for_indexes(self, index_names: List[str], status: IndexStatus = IndexStatus.READY,
+                               timeout: Optional[float] = None) -> bool:
+        """Waits until Marqo Cloud indexes all reach a status, without blocking
+        the event loop. See Client.wait_for_indexes()."""
+        if not self.config.is_marqo_cloud:
+            raise UnsupportedOperationError("This operation is only supported for Marqo Cloud")
+        return await async_cloud_wait_for_indexes_status(self.http, index_names, status, timeout=timeout)
+
+    async def bulk_search(self, queries: List[Dict[str, Any]], device: Optional[str] = None,
+                          as_columnar: bool = False,
+                          include_cluster_details: bool = False) -> Union[Dict[str, Any], ColumnarBulkSearchResult]:
+        """Performs several searches in one call. See Client.bulk_search().
+
+        The queries are split into one bulk search request per cluster and per
+        bulk_search_chunk_size queries, and the requests are sent concurrently.
+        """
+        parsed_queries = Client._parse_bulk_search_queries(queries)
+        with tracing.start_span("marqo.bulk_search", {
+            tracing.INDEX_NAMES: sorted({q.index for q in parsed_queries}), tracing.QUERY_COUNT: len(parsed_queries)
+        }) as span:
+            if self.config.instance_mapping.is_remote():
+                # resolving the index URLs may call the control plane
+                cluster_groups = await asyncio.get_running_loop().run_in_executor(
+                    None, functools.partial(
+                        Client._group_queries_by_cluster, self.config.instance_mapping, parsed_queries
+                    )
+                )
+            else:
+                cluster_groups = Client._group_queries_by_cluster(self.config.instance_mapping, parsed_queries)
+            chunks = Client._chunk_cluster_groups(cluster_groups, self.config.bulk_search_chunk_size)
+
+            if len(chunks) <= 1 and not include_cluster_details:
+                res = await self.http.post(
+                    Client._bulk_search_path(device),
+                    body=BulkSearchQuery(queries=parsed_queries).dict(),
+                    index_name=parsed_queries[0].index,
+                    retryable=True
+                )
+                tracing.set_processing_time(span, res)
+                return ColumnarBulkSearchResult(res) if as_columnar else res
+
+            async def search_chunk(positions: List[int]) -> Tuple[Dict[str, Any], float]:
+                start_time = timer()
+                res = await self.http.post(
+                    Client._bulk_search_path(device),
+                    body=BulkSearchQuery(queries=[parsed_queries[i] for i in positions]).dict(),
+                    index_name=parsed_queries[positions[0]].index,
+                    retryable=True
+                )
+                return res, (timer() - start_time) * 1000
+
+            responses = await asyncio.gather(*(search_chunk(positions) for _, positions in chunks))
+            res = Client._merge_bulk_search_responses(
+                parsed_queries, cluster_groups, chunks, responses, include_cluster_details
+            )
+            tracing.set_processing_time(span, res)
+            return ColumnarBulkSearchResult(res) if as_columnar else res
@@ -0,0 +1,222 @@
+import asyncio
+from timeit import default_timer as timer
+from typing import Any, Dict, List, Optional, Union
+
+from marqo import batching, errors, serializers, tracing
+from marqo._async_httprequests import AsyncHttpRequests
+from marqo.config import Config
+from marqo.enums import SearchMethods
+from marqo.index import Index
+from marqo.marqo_logging import mq_logger
+from marqo.results import ColumnarSearchResult, SearchResult, wrap_search_response
+
+
+class AsyncIndex:
+    """
+    asyncio counterpart of marqo.index.Index. Wraps the /indexes/ endpoint.
+
+    Requests and responses are identical to the ones of Index; the request
+    bodies are built by the same helpers. Unlike Index, instantiation doesn't
+    perform the Marqo version check, as that would require a blocking request.
+    """
+
+    def __init__(self, config: Config, index_name: str, http: AsyncHttpRequests) -> None:
+        """
+
+        Args:
+            config: config object location and other info of marqo.
+            index_name: name of the index
+            http: the AsyncHttpRequests object of the AsyncClient this index belongs to
+        """
+        self.config = config
+        self.http = http
+        self.index_name = index_name
+
+    async def search(self, q: Optional[Union[str, dict]] = None, searchable_attributes: Optional[List[str]] = None,
+                     limit: int = 10, offset: int = 0,
+                     search_method: Union[SearchMethods.TENSOR, str] = SearchMethods.TENSOR,
+                     highlights=None, device: Optional[str] = None, filter_string: str = None,
+                     show_highlights=True, reranker=None, image_download_headers: Optional[Dict] = None,
+                     attributes_to_retrieve: Optional[List[str]] = None,
+                     boost: Optional[Dict[str, List[Union[float, int]]]] = None,
+                     context: Optional[dict] = None, score_modifiers: Optional[dict] = None,
+                     model_auth: Optional[dict] = None, ef_search: Optional[int] = None,
+                     approximate: Optional[bool] = None, as_search_result: bool = False,
+                     as_columnar: bool = False
+                     ) -> Union[Dict[str, Any], SearchResult, ColumnarSearchResult]:
+        """Search the index. See Index.search() for a description of the arguments.
+
+        Returns:
+            Dictionary with hits and other metadata, a SearchResult if
+            as_search_result is True, or a ColumnarSearchResult if as_columnar is True
+        """
+        if as_search_result and as_columnar:
+            raise errors.InvalidArgError("as_search_result and as_columnar can't both be set")
+        start_time_client_request = timer()
+        path_with_query_str, body = Index._build_search_request(
+            index_name=self.index_name, q=q, searchable_attributes=searchable_attributes, limit=limit,
+            offset=offset, search_method=search_method, highlights=highlights, device=device,
+            filter_string=filter_string, show_highlights=show_highlights, reranker=reranker,
+            image_download_headers=image_download_headers, attributes_to_retrieve=attributes_to_retrieve,
+            boost=boost, context=context, score_modifiers=score_modifiers, model_auth=model_auth,
+            ef_search=ef_search, approximate=approximate
+        )
+        with tracing.start_span("marqo.search", {
+            tracing.INDEX_NAME: self.index_name, tracing.SEARCH_METHOD: search_method.upper()
+        }) as span:
+            res = await self.http.post(
+                path=path_with_query_str,
+                body=body,
+                index_name=self.index_name,
+                retryable=True,
+                decoder=serializers.lazy_loads if as_search_result and serializers.simdjson is not None else None
+            )
+            if span.is_recording():
+                span.set_attribute(tracing.HIT_COUNT, len(res["hits"]))
+                tracing.set_processing_time(span, res)
+
+        total_client_request_time = timer() - start_time_client_request
+        search_time_log = (f"search ({search_method.lower()}): took {(total_client_request_time):.3f}s to send query "
+                           f"and received {len(res['hits'])} results from Marqo (roundtrip).")
+        if 'processingTimeMs' in res:
+            search_time_log += f" Marqo itself took {(res['processingTimeMs'] * 0.001):.3f}s to execute the search."
+        mq_logger.debug(search_time_log)
+        return wrap_search_response(res, as_search_result, as_columnar)
+
+    async def get_document(self, document_id: str, expose_facets=None,
+                           embeddings_as_numpy: bool = False) -> Dict[str, Any]:
+        """Get one document with given an ID. See Index.get_document()."""
+        url_string = f"indexes/{self.index_name}/documents/{document_id}"
+        if expose_facets is not None:
+            url_string += f"?expose_facets={expose_facets}"
+        res = await self.http.get(url_string, index_name=self.index_name)
+        if embeddings_as_numpy:
+            serializers.facet_embeddings_to_numpy(res)
+        return res
+
+    async def get_documents(self, document_ids: List[str], expose_facets=None,
+                            embeddings_as_numpy: bool = False) -> Dict[str, Any]:
+        """Gets a selection of documents based on their IDs. See Index.get_documents().
+
+        IDs beyond get_documents_chunk_size are fetched in concurrent requests.
+        """
+        url_string = f"indexes/{self.index_name}/documents"
+        if expose_facets is not None:
+            url_string += f"?expose_facets={expose_facets}"
+        chunk_size = self.config.get_documents_chunk_size
+        if len(document_ids) <= chunk_size:
+            res = await self.http.get(url_string, body=document_ids, index_name=self.index_name)
+        else:
+            responses = await asyncio.gather(*(
+                self.http.get(url_string, body=chunk, index_name=self.index_name)
+                for chunk in batching.iter_batches(document_ids, chunk_size)
+            ))
+            res = {"results": [document for chunk_res in responses for document in chunk_res["results"]]}
+        if embeddings_as_numpy:
+            for document in res["results"]:
+                serializers.facet_embeddings_to_numpy(document)
+        return res
+
+    async def add_documents(
+        self,
+        documents: List[Dict[str, Any]],
+        client_batch_size: int = None,
+        device: str = None,
+        tensor_fields: List[str] = None,
+        use_existing_tensors: bool = False,
+        image_download_headers: dict = None,
+        mappings: dict = None,
+        model_auth: dict = None,
+        max_concurrency: Optional[int] = None
+    ) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        """Add documents to this index. See Index.add_documents() for a description of the arguments.
+
+        With client_batch_size set, up to max_concurrency batches are sent
+        concurrently on the event loop.
+
+        Returns:
+            Response body outlining indexing result, or a list of them if
+            client_batch_size is set
+
+        Raises:
+            MarqoWebError: if a batch failed, once all the batches are sent,
+                with `batch_results` and `batch_failures` as for
+                Index.add_documents()
+        """
+        if image_download_headers is None:
+            image_download_headers = dict()
+        base_path, query_str_params, base_body = Index._build_add_documents_request(
+            index_name=self.index_name, device=device, tensor_fields=tensor_fields,
+            use_existing_tensors=use_existing_tensors, image_download_headers=image_download_headers,
+            mappings=mappings, model_auth=model_auth
+        )
+
+        if client_batch_size is None:
+            path_with_query_str = f"{base_path}?{query_str_params}" if query_str_params else base_path
+            with tracing.start_span("marqo.add_documents", {
+                tracing.INDEX_NAME: self.index_name, tracing.DOCUMENT_COUNT: len(documents)
+            }) as span:
+                res = await self.http.post(
+                    path=path_with_query_str, body={"documents": documents, **base_body}, index_name=self.index_name,
+                    retryable=True, retry_errors=Index._can_resend_documents(documents)
+                )
+                tracing.set_processing_time(span, res)
+                return res
+
+        if client_batch_size <= 0:
+            raise errors.InvalidArgError("Batch size can't be less than 1!")
+        path_with_query_str = f"{base_path}?refresh=false"
+        if query_str_params:
+            path_with_query_str += f"&{query_str_params}"
+        semaphore = asyncio.Semaphore(batching.validate_max_concurrency(max_concurrency))
+
+        async def send_batch(batch_number: int, docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+            async with semaphore:
+                t0 = timer()
+                with tracing.start_span("marqo.add_documents.batch", {
+                    tracing.INDEX_NAME: self.index_name, tracing.BATCH_NUMBER: batch_number,
+                    tracing.DOCUMENT_COUNT: len(docs)
+                }) as span:
+                    res = await self.http.post(
+                        path=path_with_query_str, body={"documents": docs, **base_body}, index_name=self.index_name,
+                        retryable=True, retry_errors=Index._can_resend_documents(docs)
+                    )
+                    tracing.set_processing_time(span, res)
+                mq_logger.debug(f"    add_documents batch {batch_number} roundtrip: took {(timer() - t0):.3f}s.")
+                return res
+
+        with tracing.start_span("marqo.add_documents", {
+            tracing.INDEX_NAME: self.index_name, tracing.DOCUMENT_COUNT: len(documents)
+        }):
+            results = batching.raise_for_failed_batches("add_documents", await asyncio.gather(*(
+                send_batch(batch_number, documents[i:i + client_batch_size])
+                for batch_number, i in enumerate(range(0, len(documents), client_batch_size))
+            ), return_exceptions=True))
+        batching.log_batches_with_errors("add_documents", results)
+        return results
+
+    async def update_documents(self, documents: List[Dict]) -> Dict[str, Any]:
+        """Update documents in this index. Does a partial update on existing documents."""
+        return await self.http.patch(
+            path=f"indexes/{self.index_name}/documents", body={"documents": documents}, index_name=self.index_name,
+            retryable=True
+        )
+
+    async def delete_documents(self, ids: List[str]) -> Dict[str, int]:
+        """Delete documents from this index by a list of their ids."""
+        return await self.http.post(
+            path=f"indexes/{self.index_name}/documents/delete-batch", body=ids, index_name=self.index_name,
+            retryable=True
+        )
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Get stats about the index"""
+        return await self.http.get(path=f"indexes/{self.index_name}/stats", index_name=self.index_name)
+
+    async def get_settings(self) -> dict:
+        """Get all settings of the index"""
+        return await self.http.get(path=f"indexes/{self.index_name}/settings", index_name=self.index_name)
+
+    async def health(self) -> dict:
+        """Check the health of an index"""
+        return await self.http.get(path=f"indexes/{self.index_name}/health", index_name=self.index_name)
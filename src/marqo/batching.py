@@ -0,0 +1,302 @@
+"""Helpers for sending client-side batches of work to Marqo."""
+import collections
+import contextvars
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from timeit import default_timer as timer
+from typing import Any, Callable, Iterable, Iterator, List, Optional, TypeVar
+
+from marqo import errors
+from marqo.marqo_logging import mq_logger
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def validate_max_concurrency(max_concurrency: Optional[int]) -> int:
+    """Validates a user supplied max_concurrency and returns it, defaulting to 1.
+
+    Raises:
+        InvalidArgError: if max_concurrency is not a positive integer
+    """
+    if max_concurrency is None:
+        return 1
+    if not isinstance(max_concurrency, int) or isinstance(max_concurrency, bool) or max_concurrency <= 0:
+        raise errors.InvalidArgError("max_concurrency must be a positive integer")
+    return max_concurrency
+
+
+def iter_batches(items: Iterable[T], batch_size: int) -> Iterator[List[T]]:
+    """Lazily groups items into lists of batch_size items. The last batch may be smaller.
+
+    Only one batch is held in memory at a time, so items can be a generator
+    over a corpus that doesn't fit in memory.
+    """
+    items = iter(items)
+    while True:
+        batch = list(itertools.islice(items, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def map_in_order(fn: Callable[[T], R], items: Iterable[T], max_concurrency: int = 1) -> Iterator[R]:
+    """Lazily applies fn to each item using up to max_concurrency threads.
+
+    Results are yielded in the order of items. At most max_concurrency items
+    are in flight at a time, and items are only pulled from the iterable when
+    there is room in the window.
+
+    If fn raises for an item, no further items are dispatched, the items
+    already in flight are allowed to finish and the first error (in item
+    order) is raised. Use map_all_in_order() to keep the results of the others.
+
+    fn runs in a copy of the context variables of the thread pulling the
+    results, so e.g. tracing spans started by fn are children of its span.
+
+    Args:
+        fn: function to apply to each item
+        items: items to process
+        max_concurrency: maximum number of items processed concurrently. If 1,
+            items are processed one after another in the calling thread.
+
+    Returns:
+        An iterator over the results of fn, in the order of items
+    """
+    if max_concurrency <= 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    items = iter(items)
+    executor = ThreadPoolExecutor(max_workers=max_concurrency)
+    in_flight = collections.deque()
+    try:
+        for item in itertools.islice(items, max_concurrency):
+            in_flight.append(executor.submit(contextvars.copy_context().run, fn, item))
+
+        while in_flight:
+            future = in_flight.popleft()
+            try:
+                result = future.result()
+            except Exception:
+                _log_errors_of_remaining(in_flight)
+                raise
+            # keep the window full while the caller processes the result
+            for item in itertools.islice(items, 1):
+                in_flight.append(executor.submit(contextvars.copy_context().run, fn, item))
+            yield result
+    finally:
+        for future in in_flight:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def map_all_in_order(
+        operation: str, fn: Callable[[T], R], items: Iterable[T], max_concurrency: int = 1
+) -> List[R]:
+    """Applies fn to each item like map_in_order(), and returns all the results.
+
+    If fn raises for an item, no further items are dispatched and the items
+    already in flight are allowed to finish, as with map_in_order(). The first
+    error is then raised with the outcome of every item dispatched, so that the
+    work already done isn't lost (see raise_for_failed_batches()).
+
+    Args:
+        operation: the name of the operation, for the logs
+        fn: function to apply to each item
+        items: items to process
+        max_concurrency: maximum number of items processed concurrently
+    """
+    failed = threading.Event()
+
+    def outcome(item: T) -> Any:
+        try:
+            return fn(item)
+        except Exception as e:
+            failed.set()
+            return e
+
+    def until_failure() -> Iterator[T]:
+        for item in items:
+            if failed.is_set():
+                return
+            yield item
+
+    return raise_for_failed_batches(operation, list(map_in_order(outcome, until_failure(), max_concurrency)))
+
+
+def raise_for_failed_batches(operation: str, outcomes: List[Any]) -> List[Any]:
+    """Returns the results of the batches of operation, or raises the error of
+    the first batch that failed.
+
+    The error raised keeps its type, and gets two attributes:
+    `batch_results`, the result of each batch sent in batch order (None for
+    the failed batches), and `batch_failures`, the error of each failed batch
+    by batch number. The errors of the other failed batches are logged.
+
+    Args:
+        operation: the name of the operation, for the logs
+        outcomes: the result of each batch, or the exception it raised
+    """
+    failures = {i: outcome for i, outcome in enumerate(outcomes) if isinstance(outcome, Exception)}
+    if not failures:
+        return outcomes
+    first_error = failures[min(failures)]
+    for i, error in failures.items():
+        if error is not first_error:
+            mq_logger.warning(f"Additional error in {operation} client batch {i}: {error}")
+    first_error.batch_results = [None if i in failures else outcome for i, outcome in enumerate(outcomes)]
+    first_error.batch_failures = failures
+    raise first_error
+
+
+def log_batches_with_errors(operation: str, results: List[Any]) -> None:
+    """Logs a single summary of the batch results that report document errors."""
+    batches_with_errors = [
+        i for i, res in enumerate(results)
+        if (isinstance(res, dict) and res.get("errors"))
+        or (isinstance(res, list) and any(isinstance(r, dict) and r.get("errors") for r in res))
+    ]
+    if batches_with_errors:
+        mq_logger.debug(f"{operation}: errors detected in batch(es) {batches_with_errors} out of {len(results)}. "
+                        f"Please examine the returned result object for more information.")
+
+
+class AdaptiveBatchSizer:
+    """
+    Chooses the number of documents of each add_documents client batch so that
+    each batch takes about target_latency_ms for Marqo to process.
+
+    After each batch, the per-document processing time (the response's
+    processingTimeMs, or the roundtrip time if absent) is used to estimate the
+    batch size that would hit the target. The batch size moves towards that
+    estimate by at most a factor of 2 per batch. Batches are also capped at
+    max_batch_bytes of serialized documents, so a few very large documents
+    don't end up in the same request.
+
+    A batch that times out or is rejected with a 413 or 429 status code is split
+    in two halves that are sent one after the other, and the batch size is
+    halved. The error is raised if a batch of a single document still fails.
+
+    The same sizer can be reused across calls to keep what it learnt.
+    """
+
+    def __init__(
+            self,
+            target_latency_ms: float = 2000,
+            initial_batch_size: int = 16,
+            min_batch_size: int = 1,
+            max_batch_size: int = 512,
+            max_batch_bytes: Optional[int] = 8 * 1024 * 1024
+    ) -> None:
+        """
+        Args:
+            target_latency_ms: the processing time to aim for per batch, in milliseconds
+            initial_batch_size: the number of documents of the first batch
+            min_batch_size: the smallest batch size the sizer can choose
+            max_batch_size: the largest batch size the sizer can choose
+            max_batch_bytes: the maximum serialized size of the documents of a
+                batch. A single document larger than this is sent on its own.
+                None means no limit.
+        """
+        if target_latency_ms <= 0:
+            raise errors.InvalidArgError("target_latency_ms must be positive")
+        for name, value in (("initial_batch_size", initial_batch_size), ("min_batch_size", min_batch_size),
+                            ("max_batch_size", max_batch_size)):
+            if not isinstance(value, int) or value <= 0:
+                raise errors.InvalidArgError(f"{name} must be a positive integer")
+        if not min_batch_size <= initial_batch_size <= max_batch_size:
+            raise errors.InvalidArgError("initial_batch_size must be between min_batch_size and max_batch_size")
+        if max_batch_bytes is not None and max_batch_bytes <= 0:
+            raise errors.InvalidArgError("max_batch_bytes must be positive")
+        self.target_latency_ms = target_latency_ms
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self._batch_size = initial_batch_size
+        self._lock = threading.Lock()
+
+    @property
+    def batch_size(self) -> int:
+        """The number of documents of the next batch."""
+        return self._batch_size
+
+    def batches(self, items: Iterable[T], size_fn: Callable[[T], int]) -> Iterator[List[T]]:
+        """Lazily groups items into batches of the current batch size, capped at
+        max_batch_bytes as measured by size_fn."""
+        batch, batch_bytes = [], 0
+        for item in items:
+            item_bytes = size_fn(item) if self.max_batch_bytes is not None else 0
+            if batch and (len(batch) >= self._batch_size
+                          or (self.max_batch_bytes is not None and batch_bytes + item_bytes > self.max_batch_bytes)):
+                yield batch
+                batch, batch_bytes = [], 0
+            batch.append(item)
+            batch_bytes += item_bytes
+        if batch:
+            yield batch
+
+    def send(self, batch: List[T], send_fn: Callable[[List[T]], Any]) -> List[Any]:
+        """Sends batch with send_fn and adapts the batch size to how it went.
+
+        Returns:
+            The responses of send_fn: one, or more if the batch had to be split.
+            Each dict response gets a `clientBatchSize` key with the number of
+            documents it was sent with.
+        """
+        t0 = timer()
+        try:
+            res = send_fn(batch)
+        except errors.MarqoWebError as e:
+            if not self._should_back_off(e) or len(batch) <= 1:
+                raise
+            self._back_off(len(batch))
+            mq_logger.debug(f"adaptive batching: batch of {len(batch)} docs failed ({e.status_code}), "
+                            f"retrying it in two halves. Batch size is now {self._batch_size}.")
+            middle = len(batch) // 2
+            return self.send(batch[:middle], send_fn) + self.send(batch[middle:], send_fn)
+
+        latency_ms = res["processingTimeMs"] \
+            if isinstance(res, dict) and isinstance(res.get("processingTimeMs"), (int, float)) \
+            else (timer() - t0) * 1000
+        self._adapt(len(batch), latency_ms)
+        if isinstance(res, dict):
+            res["clientBatchSize"] = len(batch)
+        return [res]
+
+    @staticmethod
+    def _should_back_off(error: errors.MarqoWebError) -> bool:
+        return isinstance(error, errors.BackendTimeoutError) or error.status_code in (413, 429)
+
+    def _back_off(self, failed_batch_size: int) -> None:
+        with self._lock:
+            self._batch_size = max(self.min_batch_size, min(self._batch_size, failed_batch_size) // 2)
+
+    def _adapt(self, num_docs: int, latency_ms: float) -> None:
+        with self._lock:
+            if latency_ms <= 0:
+                estimate = self._batch_size * 2
+            else:
+                estimate = int(num_docs * self.target_latency_ms / latency_ms)
+            if num_docs < self._batch_size:
+                # a partial batch (the last one, or one capped by bytes) says nothing about larger batches
+                estimate = min(estimate, self._batch_size)
+            estimate = min(max(estimate, self._batch_size // 2), self._batch_size * 2)
+            self._batch_size = min(max(estimate, self.min_batch_size), self.max_batch_size)
+
+    def __deepcopy__(self, memo) -> "AdaptiveBatchSizer":
+        return AdaptiveBatchSizer(
+            target_latency_ms=self.target_latency_ms, initial_batch_size=self._batch_size,
+            min_batch_size=self.min_batch_size, max_batch_size=self.max_batch_size,
+            max_batch_bytes=self.max_batch_bytes
+        )
+
+
+def _log_errors_of_remaining(in_flight: Iterable) -> None:
+    """Waits for in-flight futures after a failure and logs any further errors."""
+    for future in in_flight:
+        exception = future.exception()
+        if exception is not None:
+            mq_logger.warning(f"Additional error in a concurrent client batch: {exception}")
@@ -1,18 +1,26 @@
 import base64
 import os
-from typing import Any, Dict, List, Optional
+from timeit import default_timer as timer
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from pydantic import error_wrappers
 
-from marqo.cloud_helpers import cloud_wait_for_index_status
+from marqo.cloud_helpers import cloud_wait_for_index_status, cloud_wait_for_indexes_status
 from marqo.default_instance_mappings import DefaultInstanceMappings
+from marqo.disk_cache import DiskCache
 from marqo.index import Index
 from marqo.config import Config
 from marqo.instance_mappings import InstanceMappings
 from marqo.marqo_cloud_instance_mappings import MarqoCloudInstanceMappings
+from marqo.metrics import MetricsRegistry
 from marqo.models.search_models import BulkSearchBody, BulkSearchQuery
+from marqo.results import ColumnarBulkSearchResult
+from marqo.request_coalescing import DocumentLoader, SearchBatcher, SingleFlight
+from marqo.retry import RetryPolicy
+from marqo.search_cache import SearchResultCache
+from marqo.serializers import JsonSerializer
 from marqo._httprequests import HttpRequests
-from marqo import utils, enums
+from marqo import batching, tracing, utils, enums
 from marqo import errors
 from marqo.models import marqo_index
 
@@ -30,7 +38,24 @@ class Client:
             instance_mappings: Optional[InstanceMappings] = None,
             main_user: str = None, main_password: str = None,
             return_telemetry: bool = False,
-            api_key: str = None
+            api_key: str = None,
+            pool_connections: int = 10,
+            pool_maxsize: int = 10,
+            pool_block: bool = False,
+            keep_alive: bool = True,
+            retry_policy: Optional[RetryPolicy] = None,
+            search_cache: Optional[SearchResultCache] = None,
+            serializer: Optional[JsonSerializer] = None,
+            compression: Optional[str] = None,
+            compression_threshold: int = 64 * 1024,
+            bulk_search_chunk_size: int = 100,
+            get_documents_chunk_size: int = 10000,
+            background_url_refresh: bool = False,
+            disk_cache: Optional[DiskCache] = None,
+            search_coalescer: Optional[SingleFlight] = None,
+            search_batcher: Optional[SearchBatcher] = None,
+            document_loader: Optional[DocumentLoader] = None,
+            metrics_registry: Optional[MetricsRegistry] = None
     ) -> None:
         """
         Parameters
@@ -44,25 +69,122 @@ class Client:
             If True, returns telemetry object with HTTP responses. Used for measuring timing.
         api_key:
             The api key to use for authentication with the Marqo API
+        pool_connections:
+            The number of per-host connection pools cached for each Marqo endpoint
+        pool_maxsize:
+            The maximum number of connections kept alive per Marqo host. Set it to at
+            least the number of threads sending requests through this client.
+        pool_block:
+            If True, requests wait for a free connection once pool_maxsize connections
+            to a host are in use, instead of opening short-lived extra connections.
+        keep_alive:
+            If False, connections are closed after every request
+        retry_policy:
+            If set, searches, gets and document upserts that fail with a transient
+            error (e.g. a 429 or 503 status code, or a timeout) are retried with
+            exponential backoff, according to this policy
+        search_cache:
+            If set, responses of Index.search are cached in this SearchResultCache.
+            The cached responses of an index are dropped whenever documents are
+            added, updated or deleted through this client.
+        serializer:
+            Encodes request bodies and decodes response bodies. Defaults to
+            OrjsonSerializer if orjson is installed, and to JsonSerializer otherwise.
+        compression:
+            "gzip" or "zstd" (requires the zstandard package) to compress request
+            bodies, e.g. large add_documents batches, with Content-Encoding. The
+            Marqo endpoint, or a proxy in front of it, must accept compressed
+            requests. Defaults to no compression.
+        compression_threshold:
+            Request bodies smaller than this number of bytes are sent uncompressed
+        bulk_search_chunk_size:
+            The maximum number of queries sent in one bulk search request. Larger
+            bulk searches are split into concurrent requests of this size.
+        get_documents_chunk_size:
+            The maximum number of ids sent in one get_documents request. Larger
+            calls are split into concurrent requests of this size. Keep it at or
+            below the limit of the Marqo server (MARQO_MAX_RETRIEVABLE_DOCS).
+        background_url_refresh:
+            Marqo Cloud only. If True, the index endpoints are refreshed from the
+            control plane by a background thread, so searches on known indexes
+            never wait for the control plane. See MarqoCloudInstanceMappings.
+        disk_cache:
+            If set, the Marqo Cloud index endpoints and the Marqo version of each
+            endpoint are saved in this DiskCache, so that new processes sharing
+            the file can skip fetching them on start-up.
+        search_coalescer:
+            If set, concurrent Index.search calls with the same index and search
+            parameters share a single request and all get its response. Its
+            stats() tell how many calls were collapsed.
+        search_batcher:
+            If set, Index.search calls made concurrently on the same Marqo
+            cluster are gathered for a short window and sent as one bulk search.
+            See SearchBatcher.
+        document_loader:
+            If set, Index.get_document calls made concurrently on the same index
+            are gathered for a short window and fetched with one get_documents
+            request. See DocumentLoader.
+        metrics_registry:
+            The MetricsRegistry recording the requests of this client, e.g. to
+            share one between several clients. Defaults to a new registry.
         """
+        self.config = self._build_config(
+            url=url, instance_mappings=instance_mappings, main_user=main_user, main_password=main_password,
+            return_telemetry=return_telemetry, api_key=api_key, background_url_refresh=background_url_refresh,
+            disk_cache=disk_cache, search_coalescer=search_coalescer, search_batcher=search_batcher,
+            document_loader=document_loader, metrics_registry=metrics_registry, pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+            pool_block=pool_block, keep_alive=keep_alive, retry_policy=retry_policy, search_cache=search_cache,
+            serializer=serializer, compression=compression, compression_threshold=compression_threshold,
+            bulk_search_chunk_size=bulk_search_chunk_size, get_documents_chunk_size=get_documents_chunk_size
+        )
+        self.http = HttpRequests(self.config)
+
+    def close(self) -> None:
+        """Closes the pooled connections of this client."""
+        self.config.session_pool.close()
+        self.config.instance_mapping.close()
+
+    def metrics(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Returns a snapshot of the metrics of the requests sent by this client,
+        by operation and index. See MetricsRegistry.snapshot().
+
+        Use self.config.metrics_registry.to_prometheus() to export them to Prometheus.
+        """
+        return self.config.metrics_registry.snapshot()
+
+    @staticmethod
+    def _build_config(
+            url: Optional[str], instance_mappings: Optional[InstanceMappings],
+            main_user: str = None, main_password: str = None,
+            return_telemetry: bool = False, api_key: str = None,
+            background_url_refresh: bool = False, disk_cache: Optional[DiskCache] = None,
+            **config_kwargs
+    ) -> Config:
+        """Resolves the instance mappings for the given url and builds the client's Config.
+
+        Shared by Client and AsyncClient."""
         if url is not None and instance_mappings is not None:
             raise ValueError("Cannot specify both url and instance_mappings")
 
         is_marqo_cloud = False
         if url is not None:
             if url.lower().startswith(os.environ.get("MARQO_CLOUD_URL", "https://api.marqo.ai")):
-                instance_mappings = MarqoCloudInstanceMappings(control_base_url=url, api_key=api_key)
+                instance_mappings = MarqoCloudInstanceMappings(
+                    control_base_url=url, api_key=api_key, background_refresh=background_url_refresh,
+                    disk_cache=disk_cache
+                )
                 is_marqo_cloud = True
             else:
                 instance_mappings = DefaultInstanceMappings(url, main_user, main_password)
 
-        self.config = Config(
+        return Config(
             instance_mappings=instance_mappings,
             is_marqo_cloud=is_marqo_cloud,
             use_telemetry=return_telemetry,
-            api_key=api_key
+            api_key=api_key,
+            disk_cache=disk_cache,
+            **config_kwargs
         )
-        self.http = HttpRequests(self.config)
 
     def create_index(
         self, index_name: str,
@@ -159,6 +281,10 @@ class Client:
         """
         try:
             res = self.http.delete(path=f"indexes/{index_name}")
+            if self.config.search_cache is not None:
+                self.config.search_cache.invalidate_index(index_name)
+            if self.config.search_coalescer is not None:
+                self.config.search_coalescer.forget(lambda key: key[0] == index_name)
             if self.config.is_marqo_cloud and wait_for_readiness:
                 cloud_wait_for_index_status(self.http, index_name, enums.IndexStatus.DELETED)
             return res
@@ -212,20 +338,185 @@ class Client:
             ]
         }
 
-    def bulk_search(self, queries: List[Dict[str, Any]], device: Optional[str] = None) -> Dict[str, Any]:
+    def wait_for_indexes(self, index_names: List[str], status: enums.IndexStatus = enums.IndexStatus.READY,
+                         timeout: Optional[float] = None) -> bool:
+        """Waits until Marqo Cloud indexes all reach a status, e.g. after
+        creating or deleting them with wait_for_readiness=False.
+
+        The statuses of all the indexes are read with a single list-indexes
+        request per check. Checks are frequent at first and then back off to one
+        every 10 seconds.
+
+        Args:
+            index_names: names of the indexes
+            status: the status to wait for. An index that no longer exists is
+                considered DELETED.
+            timeout: the number of seconds after which to give up, raising
+                MarqoCloudIndexStatusTimeoutError. None waits forever.
+
+        Returns:
+            True once all the indexes have the status
+        """
+        if not self.config.is_marqo_cloud:
+            raise errors.UnsupportedOperationError("This operation is only supported for Marqo Cloud")
+        return cloud_wait_for_indexes_status(self.http, index_names, status, timeout=timeout)
+
+    def bulk_search(self, queries: List[Dict[str, Any]], device: Optional[str] = None,
+                    max_concurrency: Optional[int] = None, as_columnar: bool = False,
+                    include_cluster_details: bool = False) -> Union[Dict[str, Any], ColumnarBulkSearchResult]:
+        """Performs several searches in one call.
+
+        Queries on indexes that live on different Marqo clusters (e.g. Marqo Cloud
+        indexes in different regions) are grouped by cluster, and the queries of
+        each cluster are sent in bulk search requests of at most
+        bulk_search_chunk_size queries (see Client). All the requests are sent
+        concurrently.
+
+        Args:
+            queries: the searches to perform. Each is a dict of search parameters
+                with an `index` key.
+            device: the device used to run the searches
+            max_concurrency: the maximum number of requests in flight. Defaults to
+                the number of requests, capped at the client's pool_maxsize.
+            as_columnar: if True, the results are returned as a
+                ColumnarBulkSearchResult, holding numpy arrays of the ids, scores
+                and embeddings of the hits of each query. Requires numpy.
+            include_cluster_details: if True, the response has a `clusters` key
+                listing, for each cluster, the indexes searched, the positions of
+                its queries, the number of requests sent, and the processingTimeMs
+                and roundtrip time of its slowest request.
+
+        Returns:
+            The bulk search response, whose `result` holds the result of each
+            query in the order of queries. It has the same shape however many
+            requests were sent: if there were several, `processingTimeMs` and
+            `telemetry` are those of the slowest request.
+            A ColumnarBulkSearchResult if as_columnar is True.
+        """
+        parsed_queries = self._parse_bulk_search_queries(queries)
+
+        index_names = {q.index for q in parsed_queries}
+
+        with tracing.start_span("marqo.bulk_search", {
+            tracing.INDEX_NAMES: sorted(index_names), tracing.QUERY_COUNT: len(parsed_queries)
+        }) as span:
+            for index_name in index_names:
+                self.index(index_name)  # it will perform all basic checks for index readiness
+            cluster_groups = self._group_queries_by_cluster(self.config.instance_mapping, parsed_queries)
+            chunks = self._chunk_cluster_groups(cluster_groups, self.config.bulk_search_chunk_size)
+
+            if len(chunks) <= 1 and not include_cluster_details:
+                res = self.http.post(
+                    self._bulk_search_path(device),
+                    body=BulkSearchQuery(queries=parsed_queries).dict(),
+                    index_name=parsed_queries[0].index,
+                    retryable=True
+                )
+                tracing.set_processing_time(span, res)
+                return ColumnarBulkSearchResult(res) if as_columnar else res
+
+            def search_chunk(chunk: Tuple[int, List[int]]) -> Tuple[Dict[str, Any], float]:
+                _, positions = chunk
+                start_time = timer()
+                res = self.http.post(
+                    self._bulk_search_path(device),
+                    body=BulkSearchQuery(queries=[parsed_queries[i] for i in positions]).dict(),
+                    index_name=parsed_queries[positions[0]].index,
+                    retryable=True
+                )
+                return res, (timer() - start_time) * 1000
+
+            responses = list(batching.map_in_order(
+                search_chunk, chunks,
+                batching.validate_max_concurrency(
+                    max_concurrency or min(len(chunks), self.config.session_pool.pool_maxsize)
+                )
+            ))
+            res = self._merge_bulk_search_responses(
+                parsed_queries, cluster_groups, chunks, responses, include_cluster_details
+            )
+            tracing.set_processing_time(span, res)
+            return ColumnarBulkSearchResult(res) if as_columnar else res
+
+    @staticmethod
+    def _group_queries_by_cluster(
+            instance_mapping: InstanceMappings, parsed_queries: List[BulkSearchBody]
+    ) -> List[List[int]]:
+        """Groups the positions of the queries by the base URL of their index's cluster.
+
+        Returns:
+            One list of query positions per cluster, in order of first appearance
+        """
+        groups: Dict[str, List[int]] = {}
+        for position, query in enumerate(parsed_queries):
+            groups.setdefault(instance_mapping.get_index_base_url(query.index), []).append(position)
+        return list(groups.values())
+
+    @staticmethod
+    def _chunk_cluster_groups(cluster_groups: List[List[int]], chunk_size: int) -> List[Tuple[int, List[int]]]:
+        """Splits the query positions of each cluster into chunks of at most chunk_size.
+
+        Returns:
+            A list of (cluster number, query positions) tuples, one per request to send
+        """
+        return [
+            (cluster_number, chunk)
+            for cluster_number, positions in enumerate(cluster_groups)
+            for chunk in batching.iter_batches(positions, chunk_size)
+        ]
+
+    @staticmethod
+    def _merge_bulk_search_responses(
+            parsed_queries: List[BulkSearchBody], cluster_groups: List[List[int]],
+            chunks: List[Tuple[int, List[int]]], responses: List[Tuple[Dict[str, Any], float]],
+            include_cluster_details: bool = False
+    ) -> Dict[str, Any]:
+        """Merges the responses of the requests of a bulk search back into query order.
+
+        The merged response has the keys of a single bulk search response, taken
+        from the slowest request, with the results of all the requests. With
+        include_cluster_details, clusters are reported under `clusters` by their
+        index names rather than their URLs, which may contain credentials.
+        """
+        results: List[Any] = [None] * len(parsed_queries)
+        clusters = [
+            {
+                "indexes": sorted({parsed_queries[i].index for i in positions}),
+                "queries": positions,
+                "requests": 0,
+                "processingTimeMs": None,
+                "roundtripMs": 0.0,
+            }
+            for positions in cluster_groups
+        ]
+        for (cluster_number, positions), (res, roundtrip_ms) in zip(chunks, responses):
+            for position, result in zip(positions, res["result"]):
+                results[position] = result
+            cluster = clusters[cluster_number]
+            cluster["requests"] += 1
+            cluster["roundtripMs"] = max(cluster["roundtripMs"], roundtrip_ms)
+            if res.get("processingTimeMs") is not None:
+                cluster["processingTimeMs"] = max(cluster["processingTimeMs"] or 0, res["processingTimeMs"])
+            if "telemetry" in res:
+                cluster.setdefault("telemetry", []).append(res["telemetry"])
+
+        slowest, _ = max(responses, key=lambda response: response[0].get("processingTimeMs") or 0)
+        merged = {**slowest, "result": results}
+        if include_cluster_details:
+            merged["clusters"] = clusters
+        return merged
+
+    @staticmethod
+    def _parse_bulk_search_queries(queries: List[Dict[str, Any]]) -> List[BulkSearchBody]:
         try:
-            parsed_queries = [BulkSearchBody(**q) for q in queries]
+            return [BulkSearchBody(**q) for q in queries]
         except error_wrappers.ValidationError as e:
             raise errors.InvalidArgError(f"some parameters in search query(s) are invalid. Errors are: {e.errors()}")
 
-        self._validate_all_indexes_belong_to_the_same_cluster(parsed_queries)
-
+    @staticmethod
+    def _bulk_search_path(device: Optional[str] = None) -> str:
         translated_device_param = f"{f'?&device={utils.translate_device_string_for_url(device)}' if device is not None else ''}"
-        return self.http.post(
-            f"indexes/bulk/search{translated_device_param}",
-            body=BulkSearchQuery(queries=parsed_queries).json(),
-            index_name=parsed_queries[0].index
-        )
+        return f"indexes/bulk/search{translated_device_param}"
 
     @staticmethod
     def _base64url_encode(
@@ -239,35 +530,3 @@ class Client:
             f"The `mq.{function_name}()` API is not supported on Marqo Cloud. "
             f"Please Use `mq.index('your-index-name').{function_name}()` instead. "
             "Check `https://docs.marqo.ai/1.1.0/API-Reference/indexes/` for more details.")
-
-    def _validate_all_indexes_belong_to_the_same_cluster(self, parsed_queries: List[BulkSearchBody]):
-        """
-        Validates that all indices in the bulk request belong to the same cluster.
-
-        This method checks whether all the specified indices in a bulk search request
-        are associated with the same cluster. It ensures that the indexes are not spread
-        across multiple clusters, as a bulk search operation should be performed within
-        a single cluster to guarantee consistency and reliability.
-
-        Args:
-            parsed_queries (List[BulkSearchBody]): A list of parsed bulk search queries.
-
-        Raises:
-            errors.InvalidArgError: If the indices belong to different clusters.
-
-        Returns:
-            bool: True if all indices belong to the same cluster, False otherwise.
-        """
-        cluster = None
-        index_names = set([q.index for q in parsed_queries])
-        for index_name in index_names:
-            self.index(index_name)  # it will perform all basic checks for index readiness
-            if cluster is None:
-                cluster = self.config.instance_mapping.get_index_base_url(index_name)
-            if cluster != self.config.instance_mapping.get_index_base_url(index_name):
-                raise errors.InvalidArgError(
-                    "All indexes in a bulk search request must belong to the same Marqo cluster.\n"
-                    "- If you are using Marqo Cloud, make sure all search requests"
-                    " in your bulk search use the same index"
-                )
-        return True
\ No newline at end of file
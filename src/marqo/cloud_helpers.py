@@ -1,24 +1,162 @@
+import asyncio
 import time
+from typing import Dict, Iterable, Iterator, Optional
 
+from marqo import tracing
 from marqo.marqo_logging import mq_logger
 from marqo._httprequests import HttpRequests
 from marqo.enums import IndexStatus
+from marqo.errors import MarqoCloudIndexStatusTimeoutError
 from marqo.models.marqo_cloud import IndexStatusResponse
 
+# the index status is polled after 1, 2, 4, 8s and then every 10s
+DEFAULT_INITIAL_POLL_INTERVAL = 1.0
+DEFAULT_MAX_POLL_INTERVAL = 10.0
+POLL_INTERVAL_MULTIPLIER = 2.0
 
-def cloud_wait_for_index_status(req: HttpRequests, index_name: str, status: IndexStatus):
+
+def poll_intervals(initial_interval: float = DEFAULT_INITIAL_POLL_INTERVAL,
+                   max_interval: float = DEFAULT_MAX_POLL_INTERVAL) -> Iterator[float]:
+    """Yields the delays between status checks: initial_interval, doubled at
+    every check until it reaches max_interval."""
+    interval = initial_interval
+    while True:
+        yield min(interval, max_interval)
+        interval = min(interval * POLL_INTERVAL_MULTIPLIER, max_interval)
+
+
+def cloud_wait_for_index_status(req: HttpRequests, index_name: str, status: IndexStatus,
+                                timeout: Optional[float] = None,
+                                initial_interval: float = DEFAULT_INITIAL_POLL_INTERVAL,
+                                max_interval: float = DEFAULT_MAX_POLL_INTERVAL):
     """ Wait for index to achieve some status on Marqo Cloud by checking
-    it's status every 10 seconds until it becomes expected value
+    it's status, quickly at first and then every max_interval seconds, until
+    it becomes expected value
 
     Args:
         req (HttpRequests): HttpRequests object
         index_name (str): name of the index
         status (IndexStatus): expected status of the index
+        timeout: the number of seconds after which to give up, raising
+            MarqoCloudIndexStatusTimeoutError. None waits forever.
+        initial_interval: the delay before the second status check
+        max_interval: the maximum delay between two status checks
     """
-    current_status = IndexStatusResponse(**req.get(f"indexes/{index_name}/status"))
-    while current_status.indexStatus != status:
-        time.sleep(10)
+    with tracing.start_span("marqo.wait_for_index_status", {
+        tracing.INDEX_NAMES: [index_name], tracing.INDEX_STATUS: IndexStatus(status).value
+    }):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        intervals = poll_intervals(initial_interval, max_interval)
         current_status = IndexStatusResponse(**req.get(f"indexes/{index_name}/status"))
-        mq_logger.info(f"Current index status: {current_status.indexStatus}")
-    mq_logger.info(f"Index achieved status {status} successfully")
-    return True
+        while current_status.indexStatus != status:
+            time.sleep(_next_delay(intervals, deadline, {index_name: current_status.indexStatus}, status, timeout))
+            current_status = IndexStatusResponse(**req.get(f"indexes/{index_name}/status"))
+            mq_logger.info(f"Current index status: {current_status.indexStatus}")
+        mq_logger.info(f"Index achieved status {status} successfully")
+        return True
+
+
+def cloud_wait_for_indexes_status(req: HttpRequests, index_names: Iterable[str], status: IndexStatus,
+                                  timeout: Optional[float] = None,
+                                  initial_interval: float = DEFAULT_INITIAL_POLL_INTERVAL,
+                                  max_interval: float = DEFAULT_MAX_POLL_INTERVAL):
+    """Wait for several indexes to achieve a status on Marqo Cloud.
+
+    The statuses of all the indexes are read with one list-indexes request per
+    check, however many indexes are waited for. Checks are spaced as in
+    cloud_wait_for_index_status(). An index missing from the list is considered
+    DELETED.
+
+    Args:
+        req: HttpRequests object
+        index_names: names of the indexes
+        status: expected status of the indexes
+        timeout: the number of seconds after which to give up, raising
+            MarqoCloudIndexStatusTimeoutError. None waits forever.
+        initial_interval: the delay before the second check
+        max_interval: the maximum delay between two checks
+    """
+    pending = set(index_names)
+    with tracing.start_span("marqo.wait_for_index_status", {
+        tracing.INDEX_NAMES: sorted(pending), tracing.INDEX_STATUS: IndexStatus(status).value
+    }):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        intervals = poll_intervals(initial_interval, max_interval)
+        while True:
+            statuses = _pending_index_statuses(req.get("indexes"), pending, status)
+            if not statuses:
+                break
+            time.sleep(_next_delay(intervals, deadline, statuses, status, timeout))
+        mq_logger.info(f"Indexes achieved status {status} successfully")
+        return True
+
+
+async def async_cloud_wait_for_index_status(req, index_name: str, status: IndexStatus,
+                                            timeout: Optional[float] = None,
+                                            initial_interval: float = DEFAULT_INITIAL_POLL_INTERVAL,
+                                            max_interval: float = DEFAULT_MAX_POLL_INTERVAL):
+    """Asyncio version of cloud_wait_for_index_status(), for an AsyncHttpRequests."""
+    with tracing.start_span("marqo.wait_for_index_status", {
+        tracing.INDEX_NAMES: [index_name], tracing.INDEX_STATUS: IndexStatus(status).value
+    }):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        intervals = poll_intervals(initial_interval, max_interval)
+        current_status = IndexStatusResponse(**await req.get(f"indexes/{index_name}/status"))
+        while current_status.indexStatus != status:
+            await asyncio.sleep(
+                _next_delay(intervals, deadline, {index_name: current_status.indexStatus}, status, timeout)
+            )
+            current_status = IndexStatusResponse(**await req.get(f"indexes/{index_name}/status"))
+            mq_logger.info(f"Current index status: {current_status.indexStatus}")
+        mq_logger.info(f"Index achieved status {status} successfully")
+        return True
+
+
+async def async_cloud_wait_for_indexes_status(req, index_names: Iterable[str], status: IndexStatus,
+                                              timeout: Optional[float] = None,
+                                              initial_interval: float = DEFAULT_INITIAL_POLL_INTERVAL,
+                                              max_interval: float = DEFAULT_MAX_POLL_INTERVAL):
+    """Asyncio version of cloud_wait_for_indexes_status(), for an AsyncHttpRequests."""
+    pending = set(index_names)
+    with tracing.start_span("marqo.wait_for_index_status", {
+        tracing.INDEX_NAMES: sorted(pending), tracing.INDEX_STATUS: IndexStatus(status).value
+    }):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        intervals = poll_intervals(initial_interval, max_interval)
+        while True:
+            statuses = _pending_index_statuses(await req.get("indexes"), pending, status)
+            if not statuses:
+                break
+            await asyncio.sleep(_next_delay(intervals, deadline, statuses, status, timeout))
+        mq_logger.info(f"Indexes achieved status {status} successfully")
+        return True
+
+
+def _pending_index_statuses(list_indexes_response: dict, pending: set, status: IndexStatus) -> Dict[str, str]:
+    """Returns the current status of the indexes of pending that haven't reached
+    status, and removes the others from pending."""
+    current = {
+        index_info.get("indexName"): index_info.get("indexStatus")
+        for index_info in list_indexes_response["results"]
+    }
+    statuses = {}
+    for index_name in list(pending):
+        index_status = current.get(index_name, IndexStatus.DELETED)
+        if index_status == status:
+            pending.discard(index_name)
+        else:
+            statuses[index_name] = index_status
+    return statuses
+
+
+def _next_delay(intervals: Iterator[float], deadline: Optional[float], statuses: Dict[str, str],
+                status: IndexStatus, timeout: Optional[float]) -> float:
+    """Returns the delay before the next check, raising MarqoCloudIndexStatusTimeoutError
+    if the deadline has passed."""
+    delay = next(intervals)
+    if deadline is None:
+        return delay
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise MarqoCloudIndexStatusTimeoutError(statuses, status, timeout)
+    return min(delay, remaining)
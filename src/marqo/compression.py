@@ -0,0 +1,84 @@
+import gzip
+from typing import Optional, Tuple, Union
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - exercised only when the optional dependency is missing
+    zstandard = None
+
+from marqo import errors
+
+GZIP = "gzip"
+ZSTD = "zstd"
+SUPPORTED_ENCODINGS = (GZIP, ZSTD)
+
+# the first bytes of every zstd frame
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def accept_encoding() -> str:
+    """Returns the Accept-Encoding header of requests: the response encodings
+    the client can decode."""
+    if zstandard is not None:
+        return "gzip, deflate, zstd"
+    return "gzip, deflate"
+
+
+def decompress_response(content: bytes, content_encoding: Optional[str]) -> bytes:
+    """Decodes a zstd encoded response body.
+
+    gzip and deflate bodies are already decoded by the HTTP library. zstd bodies
+    are decoded here unless the HTTP library already did it, which is checked
+    with the zstd frame's magic number.
+    """
+    if content_encoding and ZSTD in content_encoding.lower() and content.startswith(_ZSTD_MAGIC) \
+            and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj().decompress(content)
+    return content
+
+
+class BodyCompressor:
+    """
+    Compresses request bodies larger than a threshold, for Marqo endpoints
+    that accept Content-Encoding compressed requests.
+    """
+
+    def __init__(self, encoding: str = GZIP, threshold: int = 64 * 1024, level: Optional[int] = None) -> None:
+        """
+        Args:
+            encoding: "gzip" or "zstd". zstd requires the zstandard package.
+            threshold: bodies smaller than this number of bytes are sent uncompressed
+            level: the compression level. Defaults to a level favouring speed
+                (gzip 6, zstd 3).
+        """
+        if encoding not in SUPPORTED_ENCODINGS:
+            raise errors.InvalidArgError(
+                f"Unsupported compression `{encoding}`. Supported compressions are {SUPPORTED_ENCODINGS}"
+            )
+        if encoding == ZSTD and zstandard is None:
+            raise ImportError(
+                "zstd compression requires the `zstandard` package. "
+                "Install it with `pip install marqo[zstd]` or `pip install zstandard`."
+            )
+        if not isinstance(threshold, int) or threshold < 0:
+            raise errors.InvalidArgError("compression_threshold must be a non-negative integer")
+        self.encoding = encoding
+        self.threshold = threshold
+        self.level = level
+
+    def compress(self, body: Union[bytes, str]) -> Tuple[Union[bytes, str], Optional[str]]:
+        """Compresses body if it is at least threshold bytes long.
+
+        Returns:
+            A tuple of (body, content_encoding). content_encoding is None if the
+            body was left uncompressed.
+        """
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        if len(body) < self.threshold:
+            return body, None
+        if self.encoding == ZSTD:
+            level = self.level if self.level is not None else 3
+            return zstandard.ZstdCompressor(level=level).compress(body), ZSTD
+        level = self.level if self.level is not None else 6
+        return gzip.compress(body, compresslevel=level, mtime=0), GZIP
@@ -1,6 +1,15 @@
 from typing import Optional
 
+from marqo.compression import BodyCompressor
+from marqo.connection_pool import SessionPool
+from marqo.errors import InvalidArgError
 from marqo.instance_mappings import InstanceMappings
+from marqo.metrics import MetricsRegistry
+from marqo.retry import RetryPolicy
+from marqo.disk_cache import DiskCache
+from marqo.request_coalescing import DocumentLoader, SearchBatcher, SingleFlight
+from marqo.search_cache import SearchResultCache
+from marqo.serializers import JsonSerializer, default_serializer
 
 
 class Config:
@@ -14,18 +23,82 @@ class Config:
             is_marqo_cloud: bool = False,
             use_telemetry: bool = False,
             timeout: Optional[int] = None,
-            api_key: str = None
+            api_key: str = None,
+            pool_connections: int = 10,
+            pool_maxsize: int = 10,
+            pool_block: bool = False,
+            keep_alive: bool = True,
+            retry_policy: Optional[RetryPolicy] = None,
+            search_cache: Optional[SearchResultCache] = None,
+            serializer: Optional[JsonSerializer] = None,
+            compression: Optional[str] = None,
+            compression_threshold: int = 64 * 1024,
+            bulk_search_chunk_size: int = 100,
+            get_documents_chunk_size: int = 10000,
+            disk_cache: Optional[DiskCache] = None,
+            search_coalescer: Optional[SingleFlight] = None,
+            search_batcher: Optional[SearchBatcher] = None,
+            document_loader: Optional[DocumentLoader] = None,
+            metrics_registry: Optional[MetricsRegistry] = None
     ) -> None:
         """
         Parameters
         ----------
         url:
             The url to the Marqo instance (ex: http://localhost:8882)
+        pool_connections, pool_maxsize, pool_block, keep_alive:
+            Connection pool settings of the per-endpoint sessions. See SessionPool.
+        retry_policy:
+            How requests that are safe to repeat are retried. If None, requests are not retried.
+        search_cache:
+            Cache of search responses. If None, search responses are not cached.
+        serializer:
+            Encodes request bodies and decodes response bodies. If None, orjson is
+            used when it is installed, and the json module otherwise.
+        compression, compression_threshold:
+            Request body compression settings. See BodyCompressor. If compression
+            is None, request bodies are sent uncompressed.
+        bulk_search_chunk_size, get_documents_chunk_size:
+            The maximum number of queries per bulk search request and of ids per
+            get_documents request. Larger calls are split into requests of this size.
+        disk_cache:
+            On-disk cache of the Marqo version of each endpoint, shared across
+            processes. If None, versions are only cached in memory.
+        search_coalescer:
+            Collapses identical concurrent searches into one request. If None,
+            every search sends its own request.
+        search_batcher:
+            Sends concurrent searches as bulk searches. If None, searches are
+            sent one by one.
+        document_loader:
+            Fetches concurrent get_document calls with get_documents requests. If
+            None, every get_document call sends its own request.
+        metrics_registry:
+            Records the requests sent to Marqo. If None, a new MetricsRegistry is used.
         """
         self.instance_mapping = instance_mappings
         self.is_marqo_cloud = is_marqo_cloud
         self.use_telemetry = use_telemetry
         self.timeout = timeout
         self.api_key = api_key
+        self.session_pool = SessionPool(
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block, keep_alive=keep_alive
+        )
+        self.retry_policy = retry_policy
+        self.search_cache = search_cache
+        self.disk_cache = disk_cache
+        self.search_coalescer = search_coalescer
+        self.search_batcher = search_batcher
+        self.document_loader = document_loader
+        self.metrics_registry = metrics_registry if metrics_registry is not None else MetricsRegistry()
+        self.serializer = serializer if serializer is not None else default_serializer()
+        self.compressor = BodyCompressor(encoding=compression, threshold=compression_threshold) \
+            if compression is not None else None
+        for name, chunk_size in (("bulk_search_chunk_size", bulk_search_chunk_size),
+                                 ("get_documents_chunk_size", get_documents_chunk_size)):
+            if not isinstance(chunk_size, int) or chunk_size <= 0:
+                raise InvalidArgError(f"{name} must be a positive integer")
+        self.bulk_search_chunk_size = bulk_search_chunk_size
+        self.get_documents_chunk_size = get_documents_chunk_size
         # suppress warnings until we figure out the dependency issues:
         # warnings.filterwarnings("ignore")
@@ -0,0 +1,75 @@
+import threading
+from typing import Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class SessionPool:
+    """
+    Holds one requests.Session per Marqo base URL, so that every Marqo endpoint
+    gets its own pool of warm, kept-alive connections.
+
+    A SessionPool belongs to a single Config, so sessions are never shared
+    between clients. Sessions are created lazily, the first time a request is
+    sent to a base URL, and are safe to share between threads.
+    """
+
+    def __init__(
+            self,
+            pool_connections: int = 10,
+            pool_maxsize: int = 10,
+            pool_block: bool = False,
+            keep_alive: bool = True
+    ) -> None:
+        """
+        Args:
+            pool_connections: the number of per-host connection pools to cache in each session
+            pool_maxsize: the maximum number of connections kept per host. Increase this
+                to at least the number of threads sending requests concurrently.
+            pool_block: if True, a request blocks until a connection is available once
+                pool_maxsize connections are in use. If False, an extra connection is
+                opened and discarded after use.
+            keep_alive: if False, connections are closed after each request.
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def get_session(self, base_url: str) -> requests.Session:
+        """Returns the session for base_url, creating it if needed."""
+        session = self._sessions.get(base_url)
+        if session is not None:
+            return session
+        with self._lock:
+            if base_url not in self._sessions:
+                self._sessions[base_url] = self._new_session()
+            return self._sessions[base_url]
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize, pool_block=self.pool_block
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        if not self.keep_alive:
+            session.headers["Connection"] = "close"
+        return session
+
+    def close(self) -> None:
+        """Closes all the sessions and their connections."""
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            session.close()
+
+    def __deepcopy__(self, memo) -> "SessionPool":
+        # Connections can't be copied; the copy starts with no open sessions.
+        return SessionPool(
+            pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block, keep_alive=self.keep_alive
+        )
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+from marqo import errors
+from marqo.marqo_logging import mq_logger
+
+
+class DiskCache:
+    """
+    Small JSON file caching what a client learns on start-up, so that new
+    processes (e.g. serverless invocations or web server workers) can skip the
+    round trips: the Marqo Cloud index endpoints of MarqoCloudInstanceMappings
+    and the Marqo version found at each endpoint by the version check.
+
+    The file can be shared by any number of processes. It is rewritten through
+    a temporary file and os.replace(), so readers always see a complete file.
+    Concurrent writers don't block each other, and the last one wins; at worst
+    an entry is dropped and fetched again.
+
+    Keys are hashed before being written, as they may hold credentials (API keys,
+    or users and passwords in endpoint URLs).
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = 3600) -> None:
+        """
+        Args:
+            path: the path of the cache file. Its directory must exist.
+            ttl: the number of seconds an entry stays valid. None means no expiry.
+        """
+        if ttl is not None and ttl <= 0:
+            raise errors.InvalidArgError("ttl must be positive")
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Builds the key of an entry. The parts are hashed, so secrets never reach the file."""
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the entry stored under key, or None if there is none or it has expired.
+
+        Returns:
+            A dict with the stored `value` and the time it was saved at, `savedAt`
+        """
+        entry = self._read().get(key)
+        if entry is None:
+            return None
+        if self.ttl is not None and time.time() - entry["savedAt"] > self.ttl:
+            return None
+        return entry
+
+    def put(self, key: str, value: Any) -> None:
+        """Stores value, which must be JSON serialisable, under key. Expired entries are dropped.
+
+        Failures to write the file are logged and otherwise ignored, the cache
+        being an optimisation only.
+        """
+        now = time.time()
+        entries = {
+            k: entry for k, entry in self._read().items()
+            if self.ttl is None or now - entry["savedAt"] <= self.ttl
+        }
+        entries[key] = {"savedAt": now, "value": value}
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=".marqo-cache-")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(entries, f)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            mq_logger.debug(f"Could not write the Marqo client cache file {self.path}: {e!r}")
+
+    def clear(self) -> None:
+        """Deletes the cache file."""
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            mq_logger.debug(f"Ignoring unreadable Marqo client cache file {self.path}: {e!r}")
+            return {}
+        if not isinstance(entries, dict):
+            return {}
+        return {k: entry for k, entry in entries.items() if isinstance(entry, dict) and "savedAt" in entry}
+
+    def __repr__(self) -> str:
+        return f"DiskCache(path={self.path!r}, ttl={self.ttl!r})"
@@ -195,3 +195,16 @@ class MarqoCloudIndexNotFoundError(MarqoError):
         self.message = f"The index name {index_name} does not exist in the Marqo cloud or client's cache" \
                        f" has not yet been updated. Please check the index name and try again.\n" \
                        f"- If the problem persists, please contact marqo support at support@marqo.ai"
+
+
+class MarqoCloudIndexStatusTimeoutError(MarqoError):
+    """Error when Marqo Cloud indexes don't reach a status before a deadline"""
+    code = "index_status_timeout_cloud"
+    status_code = HTTPStatus.REQUEST_TIMEOUT
+
+    def __init__(self, index_statuses: dict, status: str, timeout: float) -> None:
+        self.index_statuses = {name: getattr(current, "value", current) for name, current in index_statuses.items()}
+        pending = ", ".join(f"{name} ({current})" for name, current in sorted(self.index_statuses.items()))
+        self.message = f"Indexes did not reach status {getattr(status, 'value', status)} within {timeout}s. " \
+                       f"Current statuses: {pending}"
+
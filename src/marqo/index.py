@@ -1,15 +1,17 @@
-import functools
+import contextlib
+import itertools
 from datetime import datetime
 from timeit import default_timer as timer
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sized, Tuple, Union
 
 from packaging import version as versioning_helpers
 from requests import RequestException
 
-from marqo import errors, utils
+from marqo import batching, errors, serializers, tracing, utils
 from marqo._httprequests import HttpRequests
 from marqo.cloud_helpers import cloud_wait_for_index_status
 from marqo.config import Config
+from marqo.disk_cache import DiskCache
 from marqo.enums import IndexStatus
 from marqo.enums import SearchMethods
 from marqo.errors import MarqoWebError, UnsupportedOperationError, MarqoCloudIndexNotFoundError
@@ -17,6 +19,8 @@ from marqo.marqo_logging import mq_logger
 from marqo.models import marqo_index
 from marqo.models.create_index_settings import IndexSettings
 from marqo.models.marqo_cloud import CloudIndexSettings
+from marqo.results import ColumnarSearchResult, SearchResult, wrap_search_response
+from marqo.search_cache import SearchResultCache
 from marqo.version import minimum_supported_marqo_version
 
 marqo_url_and_version_cache: Dict[str, str] = {}
@@ -70,6 +74,7 @@ class Index:
                 won't do anything if config.is_marqo_cloud=False
         """
         response = self.http.delete(path=f"indexes/{self.index_name}")
+        self._invalidate_search_cache()
         if self.config.is_marqo_cloud and wait_for_readiness:
             cloud_wait_for_index_status(self.http, self.index_name, IndexStatus.DELETED)
         return response
@@ -200,8 +205,9 @@ class Index:
                show_highlights=True, reranker=None, image_download_headers: Optional[Dict] = None,
                attributes_to_retrieve: Optional[List[str]] = None, boost: Optional[Dict[str,List[Union[float, int]]]] = None,
                context: Optional[dict] = None, score_modifiers: Optional[dict] = None, model_auth: Optional[dict] = None,
-               ef_search: Optional[int] = None, approximate: Optional[bool] = None
-               ) -> Dict[str, Any]:
+               ef_search: Optional[int] = None, approximate: Optional[bool] = None,
+               as_search_result: bool = False, as_columnar: bool = False
+               ) -> Union[Dict[str, Any], SearchResult, ColumnarSearchResult]:
         """Search the index.
 
         Args:
@@ -228,22 +234,246 @@ class Index:
                 retrieved. If left as None, then all attributes will be
                 retrieved.
             context: a dictionary to allow you to bring your own vectors and more into search.
+                Vectors can be given as numpy arrays.
             score_modifiers: a dictionary to modify the score based on field values, for tensor search only
             model_auth: authorisation that lets Marqo download a private model, if required
             ef_search: the size of the list of candidates during graph traversal, for tensor search only
             approximate: whether to use approximate nearest neighbors search or not, for tensor search only
+            as_search_result: if True, the response is wrapped in a SearchResult,
+                a read-only view whose hits are exposed as lightweight Hit objects
+                created on access. If pysimdjson is installed, the response is
+                decoded lazily, so only the fields read are converted to Python
+                objects.
+            as_columnar: if True, the hits are returned as a ColumnarSearchResult
+                holding numpy arrays of their ids, scores and, when the hits carry
+                tensor facets, embeddings. Requires numpy.
         Returns:
-            Dictionary with hits and other metadata
+            Dictionary with hits and other metadata, a SearchResult if
+            as_search_result is True, or a ColumnarSearchResult if as_columnar is True
         """
+        if as_search_result and as_columnar:
+            raise errors.InvalidArgError("as_search_result and as_columnar can't both be set")
 
         start_time_client_request = timer()
+        path_with_query_str, body = self._build_search_request(
+            index_name=self.index_name, q=q, searchable_attributes=searchable_attributes, limit=limit,
+            offset=offset, search_method=search_method, highlights=highlights, device=device,
+            filter_string=filter_string, show_highlights=show_highlights, reranker=reranker,
+            image_download_headers=image_download_headers, attributes_to_retrieve=attributes_to_retrieve,
+            boost=boost, context=context, score_modifiers=score_modifiers, model_auth=model_auth,
+            ef_search=ef_search, approximate=approximate
+        )
+        search_cache = self.config.search_cache
+        search_coalescer = self.config.search_coalescer
+        if search_cache is not None or search_coalescer is not None:
+            request_key = SearchResultCache.make_key(self.index_name, path_with_query_str, body)
+        if search_cache is not None:
+            cached_res = search_cache.get(request_key)
+            if cached_res is not None:
+                mq_logger.debug(f"search ({search_method.lower()}): served from the client-side search cache.")
+                return wrap_search_response(cached_res, as_search_result, as_columnar)
+            cache_generation = search_cache.generation(self.index_name)
+
+        search_batcher = self.config.search_batcher
+        # a SearchResult reads the hits it's asked for from a lazily decoded response,
+        # unless the response may be shared with other searches
+        decoder = serializers.lazy_loads if (
+            as_search_result and serializers.simdjson is not None
+            and search_cache is None and search_coalescer is None and search_batcher is None
+        ) else None
+
+        def send_search() -> Dict[str, Any]:
+            return self.http.post(
+                path=path_with_query_str,
+                body=body,
+                index_name=self.index_name,
+                retryable=True,
+                decoder=decoder
+            )
+
+        if search_batcher is not None:
+            def send() -> Dict[str, Any]:
+                return search_batcher.search(self.http, self.index_name, body, device, send_search)
+        else:
+            send = send_search
+
+        with tracing.start_span("marqo.search", {
+            tracing.INDEX_NAME: self.index_name, tracing.SEARCH_METHOD: search_method.upper()
+        }) as span:
+            if search_coalescer is not None:
+                res = search_coalescer.do(request_key, send)
+            else:
+                res = send()
+            if span.is_recording():
+                span.set_attribute(tracing.HIT_COUNT, len(res["hits"]))
+                tracing.set_processing_time(span, res)
+        if search_cache is not None:
+            search_cache.put(request_key, res, generation=cache_generation)
+
+        num_results = len(res["hits"])
+        end_time_client_request = timer()
+        total_client_request_time = end_time_client_request - start_time_client_request
+
+        search_time_log = (f"search ({search_method.lower()}): took {(total_client_request_time):.3f}s to send query "
+                           f"and received {num_results} results from Marqo (roundtrip).")
+        if 'processingTimeMs' in res:
+            search_time_log += f" Marqo itself took {(res['processingTimeMs'] * 0.001):.3f}s to execute the search."
+
+        mq_logger.debug(search_time_log)
+        return wrap_search_response(res, as_search_result, as_columnar)
+
+    def search_many(self, queries: Iterable[Dict[str, Any]],
+                    max_concurrency: Optional[int] = 4) -> Iterator[Dict[str, Any]]:
+        """Runs a search for each set of search() arguments in queries, keeping
+        up to max_concurrency searches in flight.
+
+        Queries are pulled from the iterable lazily, so it can be a generator
+        over a large file of queries. Each search goes through search(), so it is
+        built, validated, cached and retried exactly like a single search.
+
+        Args:
+            queries: an iterable of dicts of keyword arguments for search(),
+                e.g. {"q": "shoes", "limit": 20, "filter_string": "in_stock:true"}
+            max_concurrency: the maximum number of searches in flight
+
+        Returns:
+            An iterator over the search responses, in the order of queries. If a
+            search fails, its error is raised when its response is reached.
+        """
+        max_concurrency = batching.validate_max_concurrency(max_concurrency)
+        return batching.map_in_order(lambda search_kwargs: self.search(**search_kwargs), queries, max_concurrency)
+
+    def iter_search(self, q: Optional[Union[str, dict]] = None, page_size: int = 100, limit: Optional[int] = None,
+                    max_offset: int = 10000, **search_kwargs) -> Iterator[Dict[str, Any]]:
+        """Iterates over the hits of a search, fetching them page by page.
+
+        While the caller processes a page, the next one is fetched in the
+        background, so only about two pages are held in memory. Iteration stops
+        at the first page with fewer hits than requested, after limit hits, or
+        once the offset would exceed max_offset.
+
+        Args:
+            q: the query, as for search()
+            page_size: the number of hits requested per search call. Must not
+                exceed the server's search limit (MARQO_MAX_SEARCH_LIMIT).
+            limit: the maximum number of hits to return. None means all the hits
+                the server lets us page through.
+            max_offset: the largest offset requested. Should match the server's
+                MARQO_MAX_SEARCH_OFFSET.
+            search_kwargs: the other arguments of search(), except limit and offset
+
+        Returns:
+            An iterator over the hits, in ranking order
+        """
+        pages = self._iter_search_pages(q, page_size, limit, max_offset, search_kwargs)
+
+        def hits() -> Iterator[Dict[str, Any]]:
+            with contextlib.closing(pages):
+                for page in pages:
+                    yield from page
+
+        return hits()
+
+    def export_documents(self, q: Optional[Union[str, dict]] = None, page_size: int = 100,
+                         expose_facets=None, max_offset: int = 10000,
+                         **search_kwargs) -> Iterator[Dict[str, Any]]:
+        """Iterates over the full documents matched by a search.
+
+        The IDs of the matching documents are paged through with iter_search(),
+        and each page of IDs is fetched with get_documents(). The search of the
+        next page and the fetch of the current one run concurrently with the
+        caller's processing, so only a few pages are held in memory.
+
+        Marqo has no scroll API, so only the documents the search can reach are
+        exported: at most max_offset + page_size of them.
+
+        Args:
+            q: the query used to enumerate the documents, as for search()
+            page_size: the number of documents per search and get_documents call
+            expose_facets: passed to get_documents()
+            max_offset: as for iter_search()
+            search_kwargs: the other arguments of search(), except limit, offset
+                and attributes_to_retrieve
+
+        Returns:
+            An iterator over the documents, in search ranking order
+        """
+        if "attributes_to_retrieve" in search_kwargs:
+            raise errors.InvalidArgError("export_documents() retrieves whole documents; "
+                                         "attributes_to_retrieve can't be set")
+        search_pages = self._iter_search_pages(
+            q, page_size, None, max_offset, {**search_kwargs, "attributes_to_retrieve": ["_id"]}
+        )
+
+        def documents() -> Iterator[Dict[str, Any]]:
+            id_pages = ([hit["_id"] for hit in hits] for hits in search_pages)
+            with contextlib.closing(search_pages), contextlib.closing(batching.map_in_order(
+                    lambda ids: self.get_documents(ids, expose_facets=expose_facets), id_pages, 2
+            )) as document_pages:
+                for res in document_pages:
+                    yield from res["results"]
+
+        return documents()
+
+    def _iter_search_pages(
+            self, q: Optional[Union[str, dict]], page_size: int, limit: Optional[int], max_offset: int,
+            search_kwargs: Dict[str, Any]
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Returns an iterator over the pages of hits of a search, prefetching the
+        next page. The arguments are validated eagerly. See iter_search()."""
+        if not isinstance(page_size, int) or page_size <= 0:
+            raise errors.InvalidArgError("page_size must be a positive integer")
+        if limit is not None and (not isinstance(limit, int) or limit < 0):
+            raise errors.InvalidArgError("limit must be a non-negative integer")
+        if "limit" in search_kwargs or "offset" in search_kwargs:
+            raise errors.InvalidArgError("limit and offset are set by the iterator; use page_size and limit instead")
+
+        def offsets() -> Iterator[int]:
+            offset = 0
+            while offset <= max_offset and (limit is None or offset < limit):
+                yield offset
+                offset += page_size
+
+        def fetch_page(offset: int) -> Tuple[List[Dict[str, Any]], int]:
+            page_limit = page_size if limit is None else min(page_size, limit - offset)
+            return self.search(q, limit=page_limit, offset=offset, **search_kwargs)["hits"], page_limit
+
+        def pages() -> Iterator[List[Dict[str, Any]]]:
+            # a window of 2 keeps the next page in flight while the current one is processed
+            with contextlib.closing(batching.map_in_order(fetch_page, offsets(), 2)) as fetched_pages:
+                for hits, page_limit in fetched_pages:
+                    if hits:
+                        yield hits
+                    if len(hits) < page_limit:
+                        return
+
+        return pages()
+
+    @staticmethod
+    def _build_search_request(
+            index_name: str, q: Optional[Union[str, dict]] = None, searchable_attributes: Optional[List[str]] = None,
+            limit: int = 10, offset: int = 0, search_method: Union[SearchMethods.TENSOR, str] = SearchMethods.TENSOR,
+            highlights=None, device: Optional[str] = None, filter_string: str = None,
+            show_highlights=True, reranker=None, image_download_headers: Optional[Dict] = None,
+            attributes_to_retrieve: Optional[List[str]] = None, boost: Optional[Dict[str, List[Union[float, int]]]] = None,
+            context: Optional[dict] = None, score_modifiers: Optional[dict] = None, model_auth: Optional[dict] = None,
+            ef_search: Optional[int] = None, approximate: Optional[bool] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Builds the path (with query string) and the body of a search request.
+
+        Shared by Index.search() and AsyncIndex.search() so that both send
+        exactly the same request for the same arguments.
+
+        Returns:
+            A tuple of (path_with_query_str, body)
+        """
         if highlights is not None:
             mq_logger.warning("Deprecation warning for parameter 'highlights'. "
                               "Please use the 'showHighlights' instead. ")
             show_highlights = highlights if show_highlights is True else show_highlights
 
         path_with_query_str = (
-            f"indexes/{self.index_name}/search"
+            f"indexes/{index_name}/search"
             f"{f'?&device={utils.translate_device_string_for_url(device)}' if device is not None else ''}"
         )
         body = {
@@ -273,25 +503,9 @@ class Index:
             body["efSearch"] = ef_search
         if approximate is not None:
             body["approximate"] = approximate
-        res = self.http.post(
-            path=path_with_query_str,
-            body=body,
-            index_name=self.index_name,
-        )
-
-        num_results = len(res["hits"])
-        end_time_client_request = timer()
-        total_client_request_time = end_time_client_request - start_time_client_request
-
-        search_time_log = (f"search ({search_method.lower()}): took {(total_client_request_time):.3f}s to send query "
-                           f"and received {num_results} results from Marqo (roundtrip).")
-        if 'processingTimeMs' in res:
-            search_time_log += f" Marqo itself took {(res['processingTimeMs'] * 0.001):.3f}s to execute the search."
+        return path_with_query_str, body
 
-        mq_logger.debug(search_time_log)
-        return res
-
-    def get_document(self, document_id: str, expose_facets=None) -> Dict[str, Any]:
+    def get_document(self, document_id: str, expose_facets=None, embeddings_as_numpy: bool = False) -> Dict[str, Any]:
         """Get one document with given an ID.
 
         Args:
@@ -299,6 +513,8 @@ class Index:
             expose_facets: If True, tensor facets will be returned for the the
                 document. Each facets' embedding is accessible via the
                 _embedding field.
+            embeddings_as_numpy: If True, each facet's _embedding is returned as
+                a float32 numpy array instead of a list. Requires numpy.
 
         Returns:
             Dictionary containing the documents information.
@@ -306,16 +522,38 @@ class Index:
         url_string = f"indexes/{self.index_name}/documents/{document_id}"
         if expose_facets is not None:
             url_string += f"?expose_facets={expose_facets}"
-        return self.http.get(url_string, index_name=self.index_name,)
 
-    def get_documents(self, document_ids: List[str], expose_facets=None) -> Dict[str, Any]:
+        def send_get_document() -> Dict[str, Any]:
+            return self.http.get(url_string, index_name=self.index_name,)
+
+        if self.config.document_loader is not None:
+            res = self.config.document_loader.load(
+                self.http, self.index_name, document_id, expose_facets, send_get_document
+            )
+        else:
+            res = send_get_document()
+        if embeddings_as_numpy:
+            serializers.facet_embeddings_to_numpy(res)
+        return res
+
+    def get_documents(self, document_ids: List[str], expose_facets=None,
+                      embeddings_as_numpy: bool = False, max_concurrency: Optional[int] = None) -> Dict[str, Any]:
         """Gets a selection of documents based on their IDs.
 
+        If there are more IDs than the client's get_documents_chunk_size, they
+        are fetched in concurrent requests of that size, and the results are
+        returned in the order of document_ids.
+
         Args:
             document_ids: IDs to be searched
             expose_facets: If True, tensor facets will be returned for the the
                 document. Each facets' embedding is accessible via the
                 _embedding field.
+            embeddings_as_numpy: If True, each facet's _embedding is returned as
+                a float32 numpy array instead of a list. Requires numpy.
+            max_concurrency: the maximum number of requests in flight when the IDs
+                are split. Defaults to the number of requests, capped at the
+                client's pool_maxsize.
 
         Returns:
             Dictionary containing the documents information.
@@ -323,28 +561,50 @@ class Index:
         url_string = f"indexes/{self.index_name}/documents"
         if expose_facets is not None:
             url_string += f"?expose_facets={expose_facets}"
-        return self.http.get(
-            url_string,
-            body=document_ids,
-            index_name=self.index_name,
-        )
+
+        chunk_size = self.config.get_documents_chunk_size
+        if len(document_ids) <= chunk_size:
+            res = self.http.get(
+                url_string,
+                body=document_ids,
+                index_name=self.index_name,
+            )
+        else:
+            chunks = list(batching.iter_batches(document_ids, chunk_size))
+            responses = batching.map_in_order(
+                lambda chunk: self.http.get(url_string, body=chunk, index_name=self.index_name),
+                chunks,
+                batching.validate_max_concurrency(
+                    max_concurrency or min(len(chunks), self.config.session_pool.pool_maxsize)
+                )
+            )
+            res = {"results": [document for chunk_res in responses for document in chunk_res["results"]]}
+        if embeddings_as_numpy:
+            for document in res["results"]:
+                serializers.facet_embeddings_to_numpy(document)
+        return res
 
     def add_documents(
         self,
-        documents: List[Dict[str, Any]],
+        documents: Iterable[Dict[str, Any]],
         client_batch_size: int = None,
         device: str = None,
         tensor_fields: List[str] = None,
         use_existing_tensors: bool = False,
         image_download_headers: dict = None,
         mappings: dict = None,
-        model_auth: dict = None
+        model_auth: dict = None,
+        max_concurrency: Optional[int] = None,
+        adaptive_batching: Optional[batching.AdaptiveBatchSizer] = None
     ) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
         """Add documents to this index. Does a partial update on existing documents,
         based on their ID. Adds unseen documents to the index.
 
         Args:
             documents: List of documents. Each document should be a dictionary.
+                If client_batch_size is set, this can be any iterable of documents;
+                batches are pulled from it lazily. Custom vectors can be given as
+                numpy arrays; they are serialized without converting them to lists.
             client_batch_size: if it is set, documents will be indexed into batches
                 in the client, before being sent off. Otherwise documents are unbatched
                 client-side.
@@ -356,8 +616,23 @@ class Index:
                 for URLs found in documents
             mappings: a dictionary to help handle the object fields. e.g., multimodal_combination field
             model_auth: used to authorise a private model
+            max_concurrency: the maximum number of client batches sent to Marqo
+                concurrently. Only used if client_batch_size is set. Results are
+                returned in batch order. Defaults to sending batches one at a time.
+            adaptive_batching: if it is set, documents are sent in client batches
+                whose size is chosen by this AdaptiveBatchSizer, instead of a fixed
+                client_batch_size. Each batch result reports the number of
+                documents it was sent with as `clientBatchSize`.
         Returns:
-            Response body outlining indexing result
+            Response body outlining indexing result, or a list of them if
+            documents are sent in client batches
+
+        Raises:
+            MarqoWebError: if a client batch failed. No further batches are
+                sent after a failure. The error of the first failed batch is
+                raised, with the responses of the batches sent as its
+                `batch_results` and the error of each failed batch, by batch
+                number, as its `batch_failures`.
         """
 
         if image_download_headers is None:
@@ -365,57 +640,104 @@ class Index:
         return self._add_docs_organiser(
             documents=documents,
             client_batch_size=client_batch_size, device=device, tensor_fields=tensor_fields, use_existing_tensors=use_existing_tensors,
-            image_download_headers=image_download_headers, mappings=mappings, model_auth=model_auth
+            image_download_headers=image_download_headers, mappings=mappings, model_auth=model_auth,
+            max_concurrency=max_concurrency, adaptive_batching=adaptive_batching
+        )
+
+    def add_documents_stream(
+        self,
+        documents: Iterable[Dict[str, Any]],
+        client_batch_size: Optional[int] = None,
+        device: str = None,
+        tensor_fields: List[str] = None,
+        use_existing_tensors: bool = False,
+        image_download_headers: dict = None,
+        mappings: dict = None,
+        model_auth: dict = None,
+        max_concurrency: Optional[int] = None,
+        adaptive_batching: Optional[batching.AdaptiveBatchSizer] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Add documents from any iterable, such as a generator over the rows of a
+        JSONL or Parquet file, without materialising them in memory.
+
+        Documents are pulled lazily into batches of client_batch_size, and each
+        batch is sent as soon as it is filled. Only the batches in flight are held
+        in memory, so memory use doesn't grow with the size of the corpus.
+
+        The returned iterator must be consumed for the documents to be sent.
+
+        Args:
+            documents: Iterable of documents. Each document should be a dictionary.
+            client_batch_size: the number of documents sent in each request.
+                Required unless adaptive_batching is set.
+            max_concurrency: the maximum number of batches sent to Marqo concurrently.
+                Defaults to sending batches one at a time.
+            The remaining arguments are the same as for add_documents().
+
+        Returns:
+            An iterator over the response body of each batch, in batch order
+        """
+        self._validate_batching_args(client_batch_size, adaptive_batching)
+        if adaptive_batching is None and (not isinstance(client_batch_size, int) or client_batch_size <= 0):
+            raise errors.InvalidArgError("Batch size must be a positive integer")
+        if image_download_headers is None:
+            image_download_headers = dict()
+        base_path, query_str_params, base_body = self._build_add_documents_request(
+            index_name=self.index_name, device=device, tensor_fields=tensor_fields,
+            use_existing_tensors=use_existing_tensors, image_download_headers=image_download_headers,
+            mappings=mappings, model_auth=model_auth
+        )
+        return self._iter_batch_request(
+            docs=documents, base_path=base_path, query_str_params=query_str_params, base_body=base_body,
+            verbose=False, batch_size=client_batch_size,
+            max_concurrency=batching.validate_max_concurrency(max_concurrency), batch_sizer=adaptive_batching
         )
 
     def _add_docs_organiser(
         self,
-        documents: List[Dict[str, Any]],
+        documents: Iterable[Dict[str, Any]],
         client_batch_size: int = None,
         device: str = None,
         tensor_fields: List = None,
         use_existing_tensors: bool = False,
         image_download_headers: dict = None,
         mappings: dict = None,
-        model_auth: dict = None
+        model_auth: dict = None,
+        max_concurrency: Optional[int] = None,
+        adaptive_batching: Optional[batching.AdaptiveBatchSizer] = None
     ) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
         error_detected_message = ('Errors detected in add documents call. '
                                   'Please examine the returned result object for more information.')
 
-        num_docs = len(documents)
+        self._validate_batching_args(client_batch_size, adaptive_batching)
+        if client_batch_size is None and adaptive_batching is None and not isinstance(documents, Sized):
+            # an unbatched request needs all the documents at once
+            documents = list(documents)
+        num_docs = len(documents) if isinstance(documents, Sized) else "streamed"
 
         # ADD DOCS TIMER-LOGGER (1)
         t0 = timer()
         start_time_client_process = timer()
-        base_path = f"indexes/{self.index_name}/documents"
-        # Note: refresh is not included here since if the request is client batched, the refresh is explicity called after all batches are added.
-        # telemetry is not included here since it is implemented at the client level, not the request level.
-        query_str_params = (
-            f"{f'device={utils.translate_device_string_for_url(device)}' if device is not None else ''}"
+        base_path, query_str_params, base_body = self._build_add_documents_request(
+            index_name=self.index_name, device=device, tensor_fields=tensor_fields,
+            use_existing_tensors=use_existing_tensors, image_download_headers=image_download_headers,
+            mappings=mappings, model_auth=model_auth
         )
 
-        base_body = {
-            "useExistingTensors" : use_existing_tensors,
-            "imageDownloadHeaders" : image_download_headers,
-            "mappings" : mappings,
-            "modelAuth": model_auth,
-        }
-
-        if tensor_fields is not None:
-            base_body['tensorFields'] = tensor_fields
-
         end_time_client_process = timer()
         total_client_process_time = end_time_client_process - start_time_client_process
         mq_logger.debug(f"add_documents pre-processing: took {(total_client_process_time):.3f}s for {num_docs} docs.")
 
-        if client_batch_size is not None:
-            if client_batch_size <= 0:
+        if client_batch_size is not None or adaptive_batching is not None:
+            if client_batch_size is not None and client_batch_size <= 0:
                 raise errors.InvalidArgError("Batch size can't be less than 1!")
-            res = self._batch_request(
-                base_path=base_path,
-                docs=documents, verbose=False,
-                query_str_params=query_str_params, batch_size=client_batch_size, base_body = base_body
-            )
+            with tracing.start_span("marqo.add_documents", {tracing.INDEX_NAME: self.index_name}):
+                res = self._batch_request(
+                    base_path=base_path,
+                    docs=documents, verbose=False,
+                    query_str_params=query_str_params, batch_size=client_batch_size, base_body = base_body,
+                    max_concurrency=batching.validate_max_concurrency(max_concurrency), batch_sizer=adaptive_batching
+                )
 
         else:
             # no Client Batching
@@ -430,9 +752,15 @@ class Index:
             start_time_client_request = timer()
 
             body = {"documents": documents, **base_body}
-            res = self.http.post(
-                path=path_with_query_str, body=body, index_name=self.index_name,
-            )
+            with tracing.start_span("marqo.add_documents", {
+                tracing.INDEX_NAME: self.index_name, tracing.DOCUMENT_COUNT: len(documents)
+            }) as span:
+                res = self.http.post(
+                    path=path_with_query_str, body=body, index_name=self.index_name, retryable=True,
+                    retry_errors=self._can_resend_documents(documents)
+                )
+                tracing.set_processing_time(span, res)
+            self._invalidate_search_cache()
             end_time_client_request = timer()
             total_client_request_time = end_time_client_request - start_time_client_request
 
@@ -451,9 +779,77 @@ class Index:
         mq_logger.debug(f"add_documents completed. total time taken: {(total_add_docs_time):.3f}s.")
         return res
 
-    def update_documents(self, documents: List[Dict], client_batch_size: Optional[int]= None) \
+    @staticmethod
+    def _validate_batching_args(
+        client_batch_size: Optional[int], adaptive_batching: Optional[batching.AdaptiveBatchSizer]
+    ) -> None:
+        if adaptive_batching is not None and client_batch_size is not None:
+            raise errors.InvalidArgError(
+                "client_batch_size and adaptive_batching can't be used together. With adaptive_batching, "
+                "set the initial batch size with AdaptiveBatchSizer(initial_batch_size=...)"
+            )
+
+    @staticmethod
+    def _can_resend_documents(documents: List[Dict[str, Any]]) -> bool:
+        """Returns whether an add_documents request for documents can be sent again
+        after a timeout or a connection error, when Marqo may have processed it.
+
+        Documents without an _id get a new id each time they are added, so they
+        would be indexed twice.
+        """
+        return all(isinstance(document, dict) and "_id" in document for document in documents)
+
+    @staticmethod
+    def _build_add_documents_request(
+        index_name: str,
+        device: str = None,
+        tensor_fields: List = None,
+        use_existing_tensors: bool = False,
+        image_download_headers: dict = None,
+        mappings: dict = None,
+        model_auth: dict = None
+    ) -> Tuple[str, str, Dict[str, Any]]:
+        """Builds the pieces of an add_documents request that are shared by every batch.
+
+        Returns:
+            A tuple of (base_path, query_str_params, base_body). The documents
+            themselves are added to base_body by the caller.
+        """
+        base_path = f"indexes/{index_name}/documents"
+        # Note: refresh is not included here since if the request is client batched, the refresh is explicity called after all batches are added.
+        # telemetry is not included here since it is implemented at the client level, not the request level.
+        query_str_params = (
+            f"{f'device={utils.translate_device_string_for_url(device)}' if device is not None else ''}"
+        )
+
+        base_body = {
+            "useExistingTensors" : use_existing_tensors,
+            "imageDownloadHeaders" : image_download_headers,
+            "mappings" : mappings,
+            "modelAuth": model_auth,
+        }
+
+        if tensor_fields is not None:
+            base_body['tensorFields'] = tensor_fields
+        return base_path, query_str_params, base_body
+
+    def update_documents(self, documents: List[Dict], client_batch_size: Optional[int]= None,
+                         max_concurrency: Optional[int] = None) \
             -> Union[Dict[str, Any], List[Dict[str, Any]]]:
-        """Update documents in this index. Does a partial update on existing documents."""
+        """Update documents in this index. Does a partial update on existing documents.
+
+        Args:
+            documents: List of documents. Each document should be a dictionary.
+            client_batch_size: if it is set, documents will be sent in batches of this size.
+            max_concurrency: the maximum number of client batches sent to Marqo
+                concurrently. Only used if client_batch_size is set. Results are
+                returned in batch order. Defaults to sending batches one at a time.
+
+        Raises:
+            MarqoWebError: if a client batch failed, with the responses of the
+                batches sent as `batch_results` and the error of each failed
+                batch as `batch_failures` (see add_documents())
+        """
 
         t0 = timer()
 
@@ -463,7 +859,9 @@ class Index:
         if client_batch_size is not None:
             if (not isinstance(client_batch_size, int)) or client_batch_size <= 0:
                 raise errors.InvalidArgError("Batch size must be a positive integer")
-            res = self._batch_update_documents(documents, client_batch_size)
+            res = self._batch_update_documents(
+                documents, client_batch_size, max_concurrency=batching.validate_max_concurrency(max_concurrency)
+            )
         else:
             start_time_client_request = timer()
             num_docs = len(documents)
@@ -472,8 +870,9 @@ class Index:
             body = {"documents": documents}
 
             res = self.http.patch(
-                path=base_path, body=body, index_name=self.index_name,
+                path=base_path, body=body, index_name=self.index_name, retryable=True
             )
+            self._invalidate_search_cache()
             end_time_client_request = timer()
             total_client_request_time = end_time_client_request - start_time_client_request
 
@@ -496,33 +895,27 @@ class Index:
     def _update_documents(self, documents: List[Dict]) -> Dict[str, Any]:
         """Update documents in this index. Does a partial update on existing documents."""
         base_path = f"indexes/{self.index_name}/documents/update"
-        return self.http.post(path=base_path, body=documents, index_name=self.index_name,)
+        res = self.http.post(path=base_path, body=documents, index_name=self.index_name,)
+        self._invalidate_search_cache()
+        return res
 
-    def _batch_update_documents(self, documents, client_batch_size) -> List[Dict[str, Any]]:
+    def _batch_update_documents(self, documents, client_batch_size, max_concurrency: int = 1) -> List[Dict[str, Any]]:
         """Update documents in this index with batched requests. Does a partial update on existing documents."""
 
-        deeper = ((doc, i, client_batch_size) for i, doc in enumerate(documents))
         base_path = f"indexes/{self.index_name}/documents"
 
         error_detected_message = ('Errors detected in update_documents call. '
                                   'Please examine the returned result object for more information.')
 
-        def batch_requests(gathered, doc_tuple):
-            doc, i, the_batch_size = doc_tuple
-            if i % the_batch_size == 0:
-                gathered.append([doc, ])
-            else:
-                gathered[-1].append(doc)
-            return gathered
-
-        batched = functools.reduce(lambda x, y: batch_requests(x, y), deeper, [])
+        batched = batching.iter_batches(documents, client_batch_size)
         def update_batch_documents(batch_number, docs):
             errors_detected = False
 
             t0 = timer()
 
             body = {"documents": docs}
-            res = self.http.patch(path=base_path, body=body, index_name=self.index_name)
+            res = self.http.patch(path=base_path, body=body, index_name=self.index_name, retryable=True)
+            self._invalidate_search_cache()
 
             total_batch_time = timer() - t0
             num_docs = len(docs)
@@ -538,7 +931,11 @@ class Index:
                 mq_logger.info(f"    update_documents batch {batch_number}: {error_detected_message}")
             return res
 
-        results = [update_batch_documents(batch_number, docs) for batch_number, docs in enumerate(batched)]
+        results = batching.map_all_in_order(
+            "update_documents", lambda numbered_batch: update_batch_documents(*numbered_batch), enumerate(batched),
+            max_concurrency
+        )
+        batching.log_batches_with_errors("update_documents", results)
         mq_logger.debug('completed batch ingestion.')
         return results
 
@@ -553,7 +950,19 @@ class Index:
         """
         base_path = f"indexes/{self.index_name}/documents/delete-batch"
 
-        return self.http.post(path=base_path, body=ids, index_name=self.index_name,)
+        res = self.http.post(path=base_path, body=ids, index_name=self.index_name, retryable=True)
+        self._invalidate_search_cache()
+        return res
+
+    def _invalidate_search_cache(self) -> None:
+        """Drops the cached search responses of this index, after its documents changed.
+
+        Searches in flight are also detached from the search coalescer, so that
+        later searches don't share responses computed before the change."""
+        if self.config.search_cache is not None:
+            self.config.search_cache.invalidate_index(self.index_name)
+        if self.config.search_coalescer is not None:
+            self.config.search_coalescer.forget(lambda key: key[0] == self.index_name)
 
     def get_stats(self) -> Dict[str, Any]:
         """Get stats about the index"""
@@ -573,51 +982,84 @@ class Index:
             return parsed_date
 
     def _batch_request(
-            self, docs: List[Dict],  base_path: str,
+            self, docs: Iterable[Dict],  base_path: str,
             query_str_params: str, base_body: dict, verbose: bool = True, batch_size: int = 50,
+            max_concurrency: int = 1, batch_sizer: Optional[batching.AdaptiveBatchSizer] = None
     ) -> List[Dict[str, Any]]:
         """Batches a large chunk of documents to be sent as multiple
         add_documents invocations
 
         Args:
-            docs: A list of documents
+            docs: An iterable of documents
             batch_size: Size of a batch passed into a single add_documents
                 call
             base_path: The base path for the add_documents call
             query_str_params: The query string parameters for the add_documents call
             base_body: The base body for the add_documents call
             verbose: If true, prints out info about the documents
+            max_concurrency: The maximum number of batches sent concurrently
+            batch_sizer: If set, chooses the size of each batch instead of batch_size
 
         Returns:
             A list of responses, which have information about the batch
             operation
+
+        Raises:
+            MarqoWebError: if a batch failed, with the responses of the others
+                (see batching.raise_for_failed_batches())
+        """
+        results = list(self._iter_batch_request(
+            docs=docs, base_path=base_path, query_str_params=query_str_params, base_body=base_body,
+            verbose=verbose, batch_size=batch_size, max_concurrency=max_concurrency, batch_sizer=batch_sizer,
+            aggregate_errors=True
+        ))
+        batching.log_batches_with_errors("add_documents", results)
+        mq_logger.debug('completed batch ingestion.')
+        return results
+
+    def _iter_batch_request(
+            self, docs: Iterable[Dict],  base_path: str,
+            query_str_params: str, base_body: dict, verbose: bool = True, batch_size: int = 50,
+            max_concurrency: int = 1, batch_sizer: Optional[batching.AdaptiveBatchSizer] = None,
+            aggregate_errors: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        """Lazily batches documents and sends each batch as an add_documents
+        invocation as soon as it is filled. See _batch_request() for the arguments.
+
+        With aggregate_errors, all the batches are sent before the iterator is
+        returned, and the first failure is raised with the outcomes of the
+        other batches (see batching.map_all_in_order()).
+
+        Returns:
+            An iterator over the batch responses, in batch order
         """
         path_with_query_str = f"{base_path}?refresh=false"
         if query_str_params:
             # Only add device if it has been user-specified
             path_with_query_str += f"&{query_str_params}"
 
-        mq_logger.debug(f"starting batch ingestion with batch size {batch_size}")
+        if batch_sizer is None:
+            mq_logger.debug(f"starting batch ingestion with batch size {batch_size}")
+        else:
+            mq_logger.debug(f"starting adaptive batch ingestion with initial batch size {batch_sizer.batch_size}")
         error_detected_message = ('Errors detected in add documents call. '
                                   'Please examine the returned result object for more information.')
 
-        deeper = ((doc, i, batch_size) for i, doc in enumerate(docs))
-        def batch_requests(gathered, doc_tuple):
-            doc, i, the_batch_size = doc_tuple
-            if i % the_batch_size == 0:
-                gathered.append([doc, ])
-            else:
-                gathered[-1].append(doc)
-            return gathered
-
-        batched = functools.reduce(lambda x, y: batch_requests(x, y), deeper, [])
-
-        def verbosely_add_docs(i, docs):
+        def verbosely_add_docs(i, docs, body=None):
             errors_detected = False
 
             t0 = timer()
-            body = {"documents": docs, **base_body}
-            res = self.http.post(path=path_with_query_str, body=body, index_name=self.index_name)
+            if body is None:
+                body = {"documents": docs, **base_body}
+            with tracing.start_span("marqo.add_documents.batch", {
+                tracing.INDEX_NAME: self.index_name, tracing.BATCH_NUMBER: i, tracing.DOCUMENT_COUNT: len(docs)
+            }) as span:
+                res = self.http.post(
+                    path=path_with_query_str, body=body, index_name=self.index_name, retryable=True,
+                    retry_errors=self._can_resend_documents(docs)
+                )
+                tracing.set_processing_time(span, res)
+            self._invalidate_search_cache()
 
             total_batch_time = timer() - t0
             num_docs = len(docs)
@@ -662,9 +1104,45 @@ class Index:
                 mq_logger.info(f"results from indexing batch {i}: {res}")
             return res
 
-        results = [verbosely_add_docs(i, docs) for i, docs in enumerate(batched)]
-        mq_logger.debug('completed batch ingestion.')
-        return results
+        def map_batches(fn, numbered_batches):
+            if aggregate_errors:
+                return batching.map_all_in_order("add_documents", fn, numbered_batches, max_concurrency)
+            return batching.map_in_order(fn, numbered_batches, max_concurrency)
+
+        if batch_sizer is None:
+            batched = batching.iter_batches(docs, batch_size)
+            return map_batches(lambda numbered_batch: verbosely_add_docs(*numbered_batch), enumerate(batched))
+
+        # each document is serialized once: its size caps the batch bytes, and the
+        # encoded documents are joined into the body of the batch they end up in
+        encoded_docs = ((doc, self.config.serializer.dumps(doc)) for doc in docs)
+        batched = batch_sizer.batches(encoded_docs, size_fn=lambda encoded_doc: len(encoded_doc[1]))
+
+        def add_encoded_docs(i, batch):
+            body = self._join_encoded_documents([encoded for _, encoded in batch], base_body)
+            return verbosely_add_docs(i, [doc for doc, _ in batch], body)
+
+        # a batch the sizer splits after an error yields one result per request sent
+        return itertools.chain.from_iterable(map_batches(
+            lambda numbered_batch: batch_sizer.send(
+                numbered_batch[1], lambda batch: add_encoded_docs(numbered_batch[0], batch)
+            ),
+            enumerate(batched)
+        ))
+
+    def _join_encoded_documents(self, encoded_docs: List[Union[bytes, str]], base_body: dict) -> bytes:
+        """Builds the body of an add_documents request from documents that are
+        already serialized, the same as serializing {"documents": docs, **base_body}."""
+        encoded_docs = [encoded.encode("utf-8") if isinstance(encoded, str) else encoded
+                        for encoded in encoded_docs]
+        body = b'{"documents":[' + b",".join(encoded_docs) + b"]"
+        if not base_body:
+            return body + b"}"
+        encoded_base_body = self.config.serializer.dumps(base_body)
+        if isinstance(encoded_base_body, str):
+            encoded_base_body = encoded_base_body.encode("utf-8")
+        # drop the opening brace of the base body to append its keys
+        return body + b"," + encoded_base_body.lstrip()[1:]
 
     def get_settings(self) -> dict:
         """Get all settings of the index"""
@@ -709,8 +1187,16 @@ class Index:
                 f"If you are sure your Marqo version is compatible with this client, you can ignore this message. ")
 
             if url not in marqo_url_and_version_cache:
-                # self.get_marqo() uses get_index_base_url(), so it should be available
-                marqo_url_and_version_cache[url] = self.get_marqo()["version"]
+                disk_cache = self.config.disk_cache
+                disk_cache_key = DiskCache.make_key("marqo-version", url)
+                entry = disk_cache.get(disk_cache_key) if disk_cache is not None else None
+                if entry is not None:
+                    marqo_url_and_version_cache[url] = entry["value"]
+                else:
+                    # self.get_marqo() uses get_index_base_url(), so it should be available
+                    marqo_url_and_version_cache[url] = self.get_marqo()["version"]
+                    if disk_cache is not None:
+                        disk_cache.put(disk_cache_key, marqo_url_and_version_cache[url])
             else:
                 # we already have the version cached, and therefor also logged a warning if needed
                 return
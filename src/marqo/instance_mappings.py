@@ -56,3 +56,10 @@ class InstanceMappings(ABC):
             http_status: The HTTP status code
         """
         pass
+
+    def close(self) -> None:
+        """
+        Releases any resources held by the mappings, e.g. background threads.
+        Called by Client.close().
+        """
+        pass
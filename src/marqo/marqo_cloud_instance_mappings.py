@@ -1,9 +1,12 @@
+import threading
 import time
-from typing import Optional
+import weakref
+from typing import Dict, Optional
 
 import requests
 from requests.exceptions import Timeout
 
+from marqo.disk_cache import DiskCache
 from marqo.errors import (
     MarqoCloudIndexNotFoundError,
     MarqoCloudIndexNotReadyError,
@@ -15,13 +18,113 @@ from marqo.models.marqo_cloud import ListIndexesResponse
 
 
 class MarqoCloudInstanceMappings(InstanceMappings):
-
-    def __init__(self, control_base_url, api_key=None, url_cache_duration: int = 15):
+    """
+    Maps the index names of a Marqo Cloud account to their endpoints, using the
+    list-indexes endpoint of the control plane.
+
+    With background_refresh, a daemon thread renews the mappings before
+    url_cache_duration runs out, and requests on known indexes are served from
+    the cached mappings without ever waiting for the control plane (stale while
+    revalidate). Only an index missing from the mappings triggers a refresh on
+    the request path.
+
+    Mappings can be shared by many threads. Refreshes are single-flight: while
+    one thread refreshes, the others looking for an unknown index wait for that
+    refresh instead of starting their own, and the others are served the
+    current mappings.
+
+    With a disk_cache, the mappings are saved after every refresh and loaded on
+    creation, so a new process can resolve known indexes without calling the
+    control plane.
+    """
+
+    # with background_refresh, the mappings are renewed when this fraction of url_cache_duration has passed
+    REFRESH_AHEAD_FRACTION = 0.8
+    MIN_BACKGROUND_REFRESH_INTERVAL = 1.0
+
+    def __init__(self, control_base_url, api_key=None, url_cache_duration: int = 15,
+                 background_refresh: bool = False, disk_cache: Optional[DiskCache] = None):
         self.latest_index_mappings_refresh_timestamp = time.time() - url_cache_duration - 1
         self._urls_mapping = {IndexStatus.READY: {}, IndexStatus.CREATING: {}}
         self.api_key = api_key
         self.url_cache_duration = url_cache_duration
         self._control_base_url = control_base_url
+        self.background_refresh = background_refresh
+        self._refresh_wanted = threading.Event()
+        self._stopped = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+        self._refresh_lock = threading.Lock()
+        # incremented after every refresh attempt, successful or not
+        self._refresh_attempts = 0
+        self.disk_cache = disk_cache
+        if disk_cache is not None:
+            self._load_from_disk_cache()
+        if background_refresh:
+            self._start_background_refresh()
+
+    def __deepcopy__(self, memo) -> "MarqoCloudInstanceMappings":
+        # threads and events can't be copied; the copy gets its own refresher
+        copied = MarqoCloudInstanceMappings(
+            self._control_base_url, api_key=self.api_key, url_cache_duration=self.url_cache_duration,
+            background_refresh=self.background_refresh, disk_cache=self.disk_cache
+        )
+        copied._urls_mapping = {status: dict(indexes) for status, indexes in self._urls_mapping.items()}
+        copied.latest_index_mappings_refresh_timestamp = self.latest_index_mappings_refresh_timestamp
+        return copied
+
+    def close(self) -> None:
+        """Stops the background refresh thread, if any."""
+        self._stopped.set()
+        self._refresh_wanted.set()
+
+    def _start_background_refresh(self) -> None:
+        interval = max(self.url_cache_duration * self.REFRESH_AHEAD_FRACTION, self.MIN_BACKGROUND_REFRESH_INTERVAL)
+        self._refresher = threading.Thread(
+            target=self._background_refresh_loop,
+            # the thread only holds a weak reference, so that unused mappings can be garbage collected
+            args=(weakref.ref(self), self._refresh_wanted, self._stopped, interval),
+            name="marqo-cloud-url-refresh",
+            daemon=True
+        )
+        self._refresher.start()
+
+    @staticmethod
+    def _background_refresh_loop(mappings_ref: "weakref.ref[MarqoCloudInstanceMappings]",
+                                 refresh_wanted: threading.Event, stopped: threading.Event,
+                                 interval: float) -> None:
+        while True:
+            refresh_wanted.wait(interval)
+            refresh_wanted.clear()
+            mappings = mappings_ref()
+            if mappings is None or stopped.is_set():
+                return
+            try:
+                mappings._single_flight_refresh(wait=True, only_if_expired=False)
+            except Exception as e:
+                mq_logger.debug(f"Background refresh of the Marqo Cloud index URL cache failed: {e!r}")
+            # requests made while the refresh was in flight are served by it
+            refresh_wanted.clear()
+            del mappings
+
+    def _disk_cache_key(self) -> str:
+        return DiskCache.make_key("cloud-index-endpoints", self._control_base_url, self.api_key or "")
+
+    def _load_from_disk_cache(self) -> None:
+        entry = self.disk_cache.get(self._disk_cache_key())
+        if entry is None:
+            return
+        self._urls_mapping = {
+            IndexStatus.READY: dict(entry["value"].get(IndexStatus.READY, {})),
+            IndexStatus.CREATING: dict(entry["value"].get(IndexStatus.CREATING, {})),
+        }
+        self.latest_index_mappings_refresh_timestamp = entry["savedAt"]
+        mq_logger.debug("Loaded the Marqo Cloud index URL cache from disk")
+
+    def _is_cache_expired(self) -> bool:
+        return time.time() - self.latest_index_mappings_refresh_timestamp > self.url_cache_duration
+
+    def _is_index_known(self, index_name: str) -> bool:
+        return any(index_name in indexes for indexes in self._urls_mapping.values())
 
     def get_control_base_url(self, path: str = "") -> str:
         if path.startswith('indexes'):
@@ -48,9 +151,41 @@ class MarqoCloudInstanceMappings(InstanceMappings):
         return True
 
     def _refresh_urls_if_needed(self, index_name: Optional[str] = None):
+        if self.background_refresh and (index_name is None or self._is_index_known(index_name)):
+            # serve the cached mappings, and let the background thread renew them if they are stale
+            if self._is_cache_expired():
+                self._refresh_wanted.set()
+            return
         if index_name is None or index_name not in self._urls_mapping[IndexStatus.READY]:
-            if time.time() - self.latest_index_mappings_refresh_timestamp > self.url_cache_duration:
+            if self._is_cache_expired():
+                # a caller that knows the index (e.g. as CREATING) can go on with the
+                # current mappings if another thread is already refreshing them
+                self._single_flight_refresh(wait=index_name is None or not self._is_index_known(index_name))
+
+    def _single_flight_refresh(self, wait: bool, only_if_expired: bool = True) -> None:
+        """Refreshes the mappings, unless another thread is already doing so.
+
+        Args:
+            wait: if another thread is refreshing, whether to wait for its refresh
+                to finish (and not refresh again) or to return right away
+            only_if_expired: whether to skip the refresh if the mappings are
+                fresh, e.g. because another thread has just refreshed them
+        """
+        attempts_seen = self._refresh_attempts
+        if not self._refresh_lock.acquire(blocking=wait):
+            return
+        try:
+            if self._refresh_attempts != attempts_seen:
+                # another thread refreshed while we waited; its result holds for this stale window
+                return
+            if only_if_expired and not self._is_cache_expired():
+                return
+            try:
                 self._refresh_urls(timeout=15)
+            finally:
+                self._refresh_attempts += 1
+        finally:
+            self._refresh_lock.release()
 
     def _refresh_urls(self, timeout=None):
         mq_logger.debug("Refreshing Marqo Cloud index URL cache")
@@ -71,15 +206,19 @@ class MarqoCloudInstanceMappings(InstanceMappings):
             mq_logger.warning(response.text)
             return None
         response_json = response.json()
-        self._urls_mapping = {IndexStatus.READY: {}, IndexStatus.CREATING: {}}
+        # the new mappings are built aside and swapped in at once, so that readers
+        # (e.g. while the background thread refreshes) never see them half-built
+        urls_mapping: Dict[str, Dict[str, str]] = {IndexStatus.READY: {}, IndexStatus.CREATING: {}}
         for raw_response in response_json['results']:
             index_response = ListIndexesResponse(**raw_response)
             if index_response.indexStatus in [IndexStatus.READY, IndexStatus.MODIFYING]:
-                self._urls_mapping[IndexStatus.READY][index_response.indexName] = index_response.marqoEndpoint
+                urls_mapping[IndexStatus.READY][index_response.indexName] = index_response.marqoEndpoint
             elif index_response.indexStatus == IndexStatus.CREATING:
-                self._urls_mapping[IndexStatus.CREATING][index_response.indexName] = index_response.marqoEndpoint
-        if self._urls_mapping:
-            self.latest_index_mappings_refresh_timestamp = time.time()
+                urls_mapping[IndexStatus.CREATING][index_response.indexName] = index_response.marqoEndpoint
+        self._urls_mapping = urls_mapping
+        self.latest_index_mappings_refresh_timestamp = time.time()
+        if self.disk_cache is not None:
+            self.disk_cache.put(self._disk_cache_key(), urls_mapping)
 
     def index_http_error_handler(self, index_name: str, http_status: Optional[int] = None) -> None:
         mq_logger.debug(f'Triggering cache refresh due to error on index {index_name}')
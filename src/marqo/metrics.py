@@ -0,0 +1,337 @@
+import bisect
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from marqo import errors, serializers
+
+# in seconds, for both the roundtrip and the server processing time
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0, 30.0, 60.0
+)
+
+# operations whose index label is meaningless, as a single request spans several indexes
+_CROSS_INDEX_OPERATIONS = {"bulk_search"}
+
+
+def request_labels(http_operation: str, path: str, index_name: str = "") -> Tuple[str, str]:
+    """Returns the operation and index labels of a request to Marqo.
+
+    The operation is named after the client method sending the request, e.g.
+    "search" or "add_documents". Requests to paths unknown to the client are
+    named after their method and path, with the index name replaced by {index}.
+
+    Args:
+        http_operation: the HTTP method of the request
+        path: the request path, as passed to HttpRequests.send_request
+        index_name: the index the request is sent to, if any
+    """
+    method = http_operation.lower()
+    segments = [segment for segment in path.split("?", 1)[0].strip("/").split("/") if segment]
+    if len(segments) >= 2 and segments[0] == "indexes" and segments[1:3] != ["bulk", "search"]:
+        index_name = index_name or segments[1]
+    operation = _operation_name(method, segments)
+    if operation is None:
+        templated = ["{index}" if i == 1 and segments[0] == "indexes" else segment
+                     for i, segment in enumerate(segments)]
+        operation = f"{method} /{'/'.join(templated)}"
+    if operation in _CROSS_INDEX_OPERATIONS:
+        index_name = ""
+    return operation, index_name
+
+
+def _operation_name(method: str, segments: List[str]) -> Optional[str]:
+    if not segments:
+        return "get_marqo" if method == "get" else None
+    if segments == ["indexes"]:
+        return "get_indexes" if method == "get" else None
+    if segments == ["indexes", "bulk", "search"]:
+        return "bulk_search"
+    if segments[0] == "models":
+        return {"get": "get_loaded_models", "delete": "eject_model"}.get(method)
+    if segments[0] == "device" and len(segments) == 2:
+        return f"get_{segments[1]}_info" if method == "get" else None
+    if segments[0] != "indexes":
+        return None
+
+    tail = segments[2:]
+    if not tail:
+        return {"post": "create_index", "delete": "delete_index"}.get(method)
+    if tail == ["search"]:
+        return "search"
+    if tail[0] == "documents":
+        if len(tail) == 1:
+            return {"post": "add_documents", "patch": "update_documents", "get": "get_documents"}.get(method)
+        if method == "post":
+            return {"update": "update_documents", "delete-batch": "delete_documents"}.get(tail[1])
+        if method == "get":
+            return "get_document"
+        return None
+    if len(tail) == 1 and method == "get":
+        # stats, settings, health, status
+        return f"get_{tail[0]}"
+    return None
+
+
+class _Histogram:
+    """Counts of observed values per bucket, Prometheus-style."""
+
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        # the last count is of the values above every bound
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_buckets(self) -> Iterator[Tuple[float, int]]:
+        """Yields each upper bound, +Inf last, with the number of values at or below it."""
+        total = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"count": self.count, "sum": self.sum, "buckets": dict(self.cumulative_buckets())}
+
+
+class _Series:
+    """The metrics of one operation on one index."""
+
+    __slots__ = ("requests", "errors", "bytes_sent", "bytes_received", "documents_ingested", "roundtrip",
+                 "processing_time")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.requests = 0
+        self.errors: Dict[str, int] = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.documents_ingested = 0
+        self.roundtrip = _Histogram(buckets)
+        self.processing_time = _Histogram(buckets)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": dict(self.errors),
+            "bytesSent": self.bytes_sent,
+            "bytesReceived": self.bytes_received,
+            "documentsIngested": self.documents_ingested,
+            "roundtripSeconds": self.roundtrip.snapshot(),
+            "processingTimeSeconds": self.processing_time.snapshot(),
+        }
+
+
+class MetricsRegistry:
+    """
+    Metrics of the requests a client sends to Marqo.
+
+    Every request sent through the client is recorded under its operation
+    (e.g. "search", see request_labels()) and index: the number of requests,
+    the number of errors by MarqoWebError code, histograms of the roundtrip
+    time, retries included, and of the processingTimeMs reported by Marqo,
+    the request and response body sizes, and the number of documents
+    successfully added or updated.
+
+    Searches served by a SearchResultCache, or collapsed by a SingleFlight,
+    send no request and are not recorded.
+
+    Each Client has its own registry, unless one is passed to it as
+    metrics_registry, e.g. to aggregate the metrics of several clients.
+    Client.metrics() returns its snapshot().
+    to_prometheus() renders the metrics in the Prometheus text format, and
+    prometheus_collector() exposes them to the prometheus_client package.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        """
+        Args:
+            buckets: the upper bounds, in seconds, of the buckets of the roundtrip
+                and processing time histograms
+        """
+        bounds = tuple(sorted(float(bound) for bound in buckets))
+        if not bounds or bounds[0] <= 0 or len(set(bounds)) != len(bounds):
+            raise errors.InvalidArgError("buckets must be distinct positive numbers")
+        self.buckets = bounds
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self._lock = threading.Lock()
+
+    def record_request(self, http_operation: str, path: str, index_name: str, roundtrip: float,
+                       bytes_sent: int = 0, bytes_received: int = 0, response: Any = None,
+                       error: Optional[BaseException] = None) -> None:
+        """Records a request sent by HttpRequests.
+
+        Args:
+            http_operation: the HTTP method of the request
+            path: the request path
+            index_name: the index the request was sent to, if any
+            roundtrip: the number of seconds the request took, retries included
+            bytes_sent: the size of the request body, as sent
+            bytes_received: the size of the response body, as received
+            response: the decoded response, for successful requests
+            error: the exception raised, for failed requests
+        """
+        operation, index_name = request_labels(http_operation, path, index_name)
+        processing_time_ms = None
+        documents_ingested = 0
+        if serializers.is_json_object(response):
+            processing_time_ms = response.get("processingTimeMs")
+            if operation in ("add_documents", "update_documents") and isinstance(response.get("items"), list):
+                documents_ingested = sum(
+                    1 for item in response["items"]
+                    if isinstance(item, dict) and "error" not in item and item.get("status", 200) < 400
+                )
+
+        with self._lock:
+            series = self._series.get((operation, index_name))
+            if series is None:
+                series = self._series[(operation, index_name)] = _Series(self.buckets)
+            series.requests += 1
+            series.bytes_sent += bytes_sent
+            series.bytes_received += bytes_received
+            series.roundtrip.observe(roundtrip)
+            if error is not None:
+                code = str(getattr(error, "code", None) or type(error).__name__)
+                series.errors[code] = series.errors.get(code, 0) + 1
+            if isinstance(processing_time_ms, (int, float)):
+                series.processing_time.observe(processing_time_ms / 1000)
+            series.documents_ingested += documents_ingested
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Returns the metrics recorded so far, by operation and then by index.
+
+        Requests that don't target an index, e.g. get_indexes or bulk_search,
+        are under the index "". Histograms are given as their count, sum and
+        cumulative count per bucket upper bound, in seconds.
+        """
+        with self._lock:
+            snapshot: Dict[str, Dict[str, Dict[str, Any]]] = {}
+            for (operation, index_name), series in sorted(self._series.items()):
+                snapshot.setdefault(operation, {})[index_name] = series.snapshot()
+            return snapshot
+
+    def reset(self) -> None:
+        """Drops the metrics recorded so far."""
+        with self._lock:
+            self._series.clear()
+
+    def to_prometheus(self) -> str:
+        """Returns the metrics in the Prometheus text exposition format."""
+        lines = []
+        for name, metric_type, documentation, samples in self._metric_families():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for sample_name, labels, value in samples:
+                label_str = ",".join(f'{key}="{_escape_label_value(val)}"' for key, val in labels.items())
+                lines.append(f"{sample_name}{{{label_str}}} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def prometheus_collector(self) -> "_PrometheusCollector":
+        """Returns a prometheus_client collector of these metrics.
+
+        Register it with prometheus_client.REGISTRY.register() to expose the
+        metrics with prometheus_client, e.g. through its start_http_server().
+
+        Raises:
+            ImportError: if prometheus_client isn't installed
+        """
+        _import_prometheus_client()
+        return _PrometheusCollector(self)
+
+    def _metric_families(self) -> List[Tuple[str, str, str, List[Tuple[str, Dict[str, str], float]]]]:
+        """Returns the name, type, help and samples of each metric family, for the Prometheus exporters."""
+        with self._lock:
+            series_items = sorted(
+                (key, series.snapshot()) for key, series in self._series.items()
+            )
+
+        def counter(key: str) -> List[Tuple[str, Dict[str, str], float]]:
+            return [(None, {"operation": operation, "index": index_name}, snapshot[key])
+                    for (operation, index_name), snapshot in series_items]
+
+        def histogram(key: str) -> List[Tuple[str, Dict[str, str], float]]:
+            samples = []
+            for (operation, index_name), snapshot in series_items:
+                labels = {"operation": operation, "index": index_name}
+                for bound, count in snapshot[key]["buckets"].items():
+                    samples.append(("_bucket", {**labels, "le": _format_value(bound)}, count))
+                samples.append(("_count", labels, snapshot[key]["count"]))
+                samples.append(("_sum", labels, snapshot[key]["sum"]))
+            return samples
+
+        errors_samples = [
+            (None, {"operation": operation, "index": index_name, "code": code}, count)
+            for (operation, index_name), snapshot in series_items
+            for code, count in sorted(snapshot["errors"].items())
+        ]
+        families = [
+            ("marqo_client_requests_total", "counter", "Requests sent to Marqo.", counter("requests")),
+            ("marqo_client_errors_total", "counter", "Requests to Marqo that failed, by error code.",
+             errors_samples),
+            ("marqo_client_request_duration_seconds", "histogram",
+             "Roundtrip time of requests to Marqo, retries included.", histogram("roundtripSeconds")),
+            ("marqo_client_processing_time_seconds", "histogram",
+             "Processing time reported by Marqo in processingTimeMs.", histogram("processingTimeSeconds")),
+            ("marqo_client_sent_bytes_total", "counter", "Request body bytes sent to Marqo.",
+             counter("bytesSent")),
+            ("marqo_client_received_bytes_total", "counter", "Response body bytes received from Marqo.",
+             counter("bytesReceived")),
+            ("marqo_client_documents_ingested_total", "counter",
+             "Documents successfully added or updated in Marqo.", counter("documentsIngested")),
+        ]
+        return [
+            (name, metric_type, documentation,
+             [(name + (suffix or ""), labels, value) for suffix, labels, value in samples])
+            for name, metric_type, documentation, samples in families
+        ]
+
+    def __deepcopy__(self, memo) -> "MetricsRegistry":
+        # locks can't be copied; the copy starts with no metrics
+        return MetricsRegistry(buckets=self.buckets)
+
+
+class _PrometheusCollector:
+    """Exposes a MetricsRegistry to prometheus_client."""
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.registry = registry
+
+    def collect(self):
+        prometheus_client = _import_prometheus_client()
+        for name, metric_type, documentation, samples in self.registry._metric_families():
+            # prometheus_client adds the _total suffix of counters itself
+            family_name = name[:-len("_total")] if metric_type == "counter" else name
+            family = prometheus_client.metrics_core.Metric(family_name, documentation, metric_type)
+            for sample_name, labels, value in samples:
+                family.add_sample(sample_name, labels, value)
+            yield family
+
+    def describe(self):
+        return []
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return repr(value)
+    return str(value)
+
+
+def _import_prometheus_client():
+    try:
+        import prometheus_client
+        import prometheus_client.metrics_core
+    except ImportError:
+        raise ImportError("The Prometheus collector requires the `prometheus_client` package. "
+                          "Install it with `pip install prometheus_client`.") from None
+    return prometheus_client
@@ -0,0 +1,343 @@
+import copy
+import threading
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, List, Optional, TypeVar
+
+from pydantic import error_wrappers
+
+from marqo import batching, errors, utils
+from marqo.models.search_models import BulkSearchBody, BulkSearchQuery
+
+if TYPE_CHECKING:
+    from marqo._httprequests import HttpRequests
+
+T = TypeVar("T")
+
+
+class _Flight:
+    """A call in flight, whose outcome is shared by every caller of its key."""
+
+    __slots__ = ("done", "result", "error", "followers")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into a single call.
+
+    The first caller of a key runs the call; callers of the same key arriving
+    while it is in flight wait for it and get its outcome instead of making
+    their own. Once the call returns, the next caller of the key starts a new
+    one: results are not cached (see SearchResultCache for that).
+
+    Callers get independent copies of the result, so they can mutate it freely,
+    and an exception raised by the call is raised to every caller.
+
+    Passed to Client as search_coalescer, it coalesces identical concurrent
+    Index.search calls (same index and normalised search body) into one request.
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.executed = 0
+        self.collapsed = 0
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Returns fn(), or the outcome of the in-flight call of key if there is one."""
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.collapsed += 1
+                flight.followers += 1
+                is_leader = False
+            else:
+                self.executed += 1
+                flight = self._flights[key] = _Flight()
+                is_leader = True
+
+        if not is_leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            self._land(key, flight)
+            # followers get a copy, as the leader may mutate its result
+            if flight.followers:
+                flight.result = copy.deepcopy(result)
+            return result
+        finally:
+            if flight.error is not None:
+                self._land(key, flight)
+            flight.done.set()
+
+    def _land(self, key: Hashable, flight: _Flight) -> None:
+        """Removes flight from the calls in flight. No follower can join it afterwards."""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def forget(self, predicate: Callable[[Hashable], bool]) -> None:
+        """Detaches the in-flight calls whose key matches predicate, so that later
+        callers of those keys start new calls. Used to keep searches sent after a
+        write from sharing the response of a search sent before it."""
+        with self._lock:
+            for key in [key for key in self._flights if predicate(key)]:
+                del self._flights[key]
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the number of calls, of calls actually executed, of calls
+        collapsed into another one, and of calls currently in flight."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executed": self.executed,
+                "collapsed": self.collapsed,
+                "inFlight": len(self._flights),
+            }
+
+    def __deepcopy__(self, memo) -> "SingleFlight":
+        # locks can't be copied; the copy starts with no calls in flight
+        return SingleFlight()
+
+
+class _Batch:
+    """Calls gathered in one window, sent together by the first of them."""
+
+    __slots__ = ("items", "results", "error", "closed", "done")
+
+    def __init__(self) -> None:
+        self.items: List[Any] = []
+        self.results: List[Any] = []
+        self.error: Optional[BaseException] = None
+        self.closed = threading.Event()
+        self.done = threading.Event()
+
+
+class MicroBatcher(ABC):
+    """
+    Gathers calls made concurrently from several threads into batches.
+
+    The first call of a group opens a batch and waits up to window_ms for more
+    calls of the same group to join it, or until max_batch_size calls have
+    joined. It then sends the whole batch with _send_batch() and hands each
+    caller its own result. A call therefore waits at most window_ms longer
+    than the request it ends up in.
+
+    Subclasses define how a batch is sent.
+    """
+
+    def __init__(self, window_ms: float = 2, max_batch_size: int = 16) -> None:
+        """
+        Args:
+            window_ms: how long the first call of a batch waits for others to join it
+            max_batch_size: the maximum number of calls in a batch. A full batch
+                is sent without waiting for the end of its window.
+        """
+        if window_ms < 0:
+            raise errors.InvalidArgError("window_ms must not be negative")
+        if not isinstance(max_batch_size, int) or max_batch_size <= 0:
+            raise errors.InvalidArgError("max_batch_size must be a positive integer")
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self.calls = 0
+        self.batches = 0
+        self._pending: Dict[Hashable, _Batch] = {}
+        self._lock = threading.Lock()
+
+    def _submit(self, group: Hashable, item: Any) -> Any:
+        """Adds item to the open batch of group and returns its result once the batch is sent.
+
+        If the result for item is an exception, it is raised.
+        """
+        with self._lock:
+            self.calls += 1
+            batch = self._pending.get(group)
+            is_leader = batch is None
+            if is_leader:
+                batch = self._pending[group] = _Batch()
+                self.batches += 1
+            position = len(batch.items)
+            batch.items.append(item)
+            if len(batch.items) >= self.max_batch_size:
+                del self._pending[group]
+                batch.closed.set()
+
+        if is_leader:
+            batch.closed.wait(self.window_ms / 1000)
+            with self._lock:
+                if self._pending.get(group) is batch:
+                    del self._pending[group]
+            try:
+                batch.results = self._send_batch(group, batch.items)
+            except BaseException as e:
+                batch.error = e
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        result = batch.results[position]
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    @abstractmethod
+    def _send_batch(self, group: Hashable, items: List[Any]) -> List[Any]:
+        """Sends a batch. Returns one result, or exception, per item, in order."""
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the number of calls and of batches they were sent in."""
+        with self._lock:
+            return {"calls": self.calls, "batches": self.batches}
+
+    def __deepcopy__(self, memo) -> "MicroBatcher":
+        # locks can't be copied; the copy gets the same settings and no pending batches
+        return type(self)(window_ms=self.window_ms, max_batch_size=self.max_batch_size)
+
+
+class SearchBatcher(MicroBatcher):
+    """
+    Sends concurrent Index.search calls as bulk searches.
+
+    Passed to Client as search_batcher, searches made concurrently from several
+    threads on indexes of the same Marqo cluster, with the same device, are
+    gathered for up to window_ms and sent as one bulk search request, letting
+    Marqo amortise inference across them. A search alone in its window is sent
+    as a regular search.
+
+    Searches using parameters that bulk search doesn't support (ef_search,
+    approximate) are never batched. If Marqo rejects a bulk search as invalid
+    (a 4xx status other than 429), its searches are sent again one by one, so
+    that an invalid search only fails its own call. The results of batched searches come from
+    the bulk search response, which has no per-query processingTimeMs or
+    telemetry.
+    """
+
+    def search(self, http: "HttpRequests", index_name: str, body: Dict[str, Any], device: Optional[str],
+               send_single: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Sends the search of index_name with body, batched with concurrent ones if possible.
+
+        Args:
+            http: the HttpRequests of the Index searched
+            index_name: the index searched
+            body: the search request body, as built by Index.search
+            device: the device the search runs on
+            send_single: sends the search on its own, as Index.search would
+        """
+        try:
+            query = BulkSearchBody(index=index_name, **body)
+        except error_wrappers.ValidationError:
+            # e.g. efSearch or approximate, which bulk search doesn't take
+            return send_single()
+        # every Index has its own HttpRequests, but the searches of a client share its config
+        base_url = http.config.instance_mapping.get_index_base_url(index_name)
+        return self._submit((http.config, base_url, device), (http, query, send_single))
+
+    def _send_batch(self, group: Hashable, items: List[Any]) -> List[Any]:
+        if len(items) == 1:
+            _, _, send_single = items[0]
+            return [send_single()]
+        _, _, device = group
+        http = items[0][0]
+        translated_device_param = \
+            f"?&device={utils.translate_device_string_for_url(device)}" if device is not None else ""
+        queries = [query for _, query, _ in items]
+        try:
+            res = http.post(
+                path=f"indexes/bulk/search{translated_device_param}",
+                body=BulkSearchQuery(queries=queries).dict(),
+                index_name=queries[0].index,
+                retryable=True
+            )
+        except errors.MarqoWebError as e:
+            status_code = getattr(e, "status_code", None)
+            if not isinstance(status_code, int) or not 400 <= status_code < 500 or status_code == 429:
+                raise
+            # Marqo rejects the whole bulk search if any query is invalid: send each on its own,
+            # so that only the callers of invalid queries get an error
+            return list(batching.map_in_order(
+                _outcome, [send_single for _, _, send_single in items],
+                min(len(items), http.config.session_pool.pool_maxsize)
+            ))
+        return res["result"]
+
+
+def _outcome(fn: Callable[[], T]) -> Any:
+    """Returns fn(), or the exception it raised."""
+    try:
+        return fn()
+    except Exception as e:
+        return e
+
+
+class DocumentLoader(MicroBatcher):
+    """
+    Fetches concurrent Index.get_document calls with get_documents requests.
+
+    Passed to Client as document_loader, get_document calls made concurrently
+    from several threads on the same index, with the same expose_facets, are
+    gathered for up to window_ms and fetched with one get_documents request.
+    Each ID is requested once however many callers ask for it, and each caller
+    gets its own copy of its document, or a DocumentNotFoundError. A call alone
+    in its window is sent as a regular get_document request.
+    """
+
+    def __init__(self, window_ms: float = 2, max_batch_size: int = 100) -> None:
+        super().__init__(window_ms=window_ms, max_batch_size=max_batch_size)
+
+    def load(self, http: "HttpRequests", index_name: str, document_id: str, expose_facets: Any,
+             send_single: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Gets the document document_id of index_name, batched with concurrent calls.
+
+        Args:
+            http: the HttpRequests of the Index
+            index_name: the index of the document
+            document_id: the ID of the document
+            expose_facets: as for Index.get_document()
+            send_single: gets the document on its own, as Index.get_document would
+        """
+        return self._submit((http.config, index_name, expose_facets), (http, document_id, send_single))
+
+    def _send_batch(self, group: Hashable, items: List[Any]) -> List[Any]:
+        if len(items) == 1:
+            _, _, send_single = items[0]
+            return [send_single()]
+        _, index_name, expose_facets = group
+        http = items[0][0]
+        url_string = f"indexes/{index_name}/documents"
+        if expose_facets is not None:
+            url_string += f"?expose_facets={expose_facets}"
+        document_ids = list(dict.fromkeys(document_id for _, document_id, _ in items))
+        res = http.get(url_string, body=document_ids, index_name=index_name)
+        documents = {document.get("_id"): document for document in res["results"]}
+
+        results = []
+        handed_out = set()
+        for _, document_id, _ in items:
+            document = documents.get(document_id)
+            if document is None or document.get("_found") is False:
+                message = (document or {}).get("message") or f"Document does not exist with _id `{document_id}`"
+                results.append(errors.DocumentNotFoundError(message))
+                continue
+            document = {k: v for k, v in document.items() if k != "_found"}
+            # callers asking for the same ID get their own copies
+            results.append(copy.deepcopy(document) if document_id in handed_out else document)
+            handed_out.add(document_id)
+        return results
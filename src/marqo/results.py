@@ -0,0 +1,253 @@
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union, overload
+
+from marqo.serializers import materialize
+
+
+class Hit:
+    """
+    Read-only view of one search hit.
+
+    A Hit only holds a reference to the hit in the response, so creating one
+    copies nothing. `_id`, `_score` and `_highlights` are exposed as attributes,
+    and any document field can be read with hit["field"] or hit.get("field").
+
+    When the response was decoded lazily (see SearchResult), only the fields
+    read are converted to Python objects.
+    """
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        self._data = data
+
+    @property
+    def id(self) -> str:
+        return self._data["_id"]
+
+    @property
+    def score(self) -> Optional[float]:
+        return self._data.get("_score")
+
+    @property
+    def highlights(self) -> Any:
+        return materialize(self._data.get("_highlights"))
+
+    def __getitem__(self, field: str) -> Any:
+        return materialize(self._data[field])
+
+    def __contains__(self, field: str) -> bool:
+        return field in self._data
+
+    def get(self, field: str, default: Any = None) -> Any:
+        return materialize(self._data.get(field, default))
+
+    def fields(self, *field_names: str) -> Dict[str, Any]:
+        """Returns the given fields of the hit. Missing fields are left out."""
+        return {name: materialize(self._data[name]) for name in field_names if name in self._data}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the hit's dict, as found in the response."""
+        return materialize(self._data)
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, Hit) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"Hit(id={self._data.get('_id')!r}, score={self._data.get('_score')!r})"
+
+
+class SearchResult(Sequence[Hit]):
+    """
+    Read-only view of a search response, as returned by
+    Index.search(..., as_search_result=True).
+
+    Indexing or iterating a SearchResult gives Hit views, which are only
+    created for the hits that are accessed. ids() and scores() read the two
+    fields directly, without creating any Hit. The underlying response is
+    available as `raw`.
+
+    If the `pysimdjson` package is installed, search() decodes the response
+    lazily: the hits stay in pysimdjson's parsed form and only the fields that
+    are read are converted to Python objects, so e.g. ids() on a response with
+    a thousand highlighted hits doesn't build a dict for any of them.
+    """
+
+    __slots__ = ("_response", "_hits")
+
+    def __init__(self, response: Dict[str, Any]) -> None:
+        self._response = response
+        self._hits: Sequence[Dict[str, Any]] = response.get("hits", [])
+
+    @property
+    def raw(self) -> Dict[str, Any]:
+        """The search response, as returned by Marqo."""
+        if not isinstance(self._response, dict):
+            # the response was decoded lazily; it is converted once, on first use
+            self._response = materialize(self._response)
+            self._hits = self._response.get("hits", [])
+        return self._response
+
+    @property
+    def query(self) -> Any:
+        return materialize(self._response.get("query"))
+
+    @property
+    def limit(self) -> Optional[int]:
+        return self._response.get("limit")
+
+    @property
+    def offset(self) -> Optional[int]:
+        return self._response.get("offset")
+
+    @property
+    def processing_time_ms(self) -> Optional[float]:
+        return self._response.get("processingTimeMs")
+
+    def ids(self) -> List[str]:
+        return [hit["_id"] for hit in self._hits]
+
+    def scores(self) -> List[Optional[float]]:
+        return [hit.get("_score") for hit in self._hits]
+
+    def to_arrays(self) -> "ColumnarSearchResult":
+        """Returns the hits as contiguous numpy arrays. Requires numpy."""
+        return ColumnarSearchResult(self.raw)
+
+    def __len__(self) -> int:
+        return len(self._hits)
+
+    @overload
+    def __getitem__(self, index: int) -> Hit: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Hit]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Hit, List[Hit]]:
+        if isinstance(index, slice):
+            # slicing a lazily decoded array would convert its items
+            return [Hit(self._hits[i]) for i in range(*index.indices(len(self._hits)))]
+        return Hit(self._hits[index])
+
+    def __iter__(self) -> Iterator[Hit]:
+        for hit in self._hits:
+            yield Hit(hit)
+
+    def __repr__(self) -> str:
+        return f"SearchResult(hits={len(self._hits)}, processing_time_ms={self.processing_time_ms!r})"
+
+
+class ColumnarSearchResult:
+    """
+    The hits of a search response as contiguous arrays, as returned by
+    Index.search(..., as_columnar=True) or SearchResult.to_arrays().
+
+    Attributes:
+        ids: the hits' _id, as a numpy unicode array
+        scores: the hits' _score, as a float64 array (NaN where missing)
+        embeddings: a (hits, dimensions) float32 array of the _embedding of each
+            hit's first tensor facet, if every hit has one, else None
+        processing_time_ms: the response's processingTimeMs
+    """
+
+    __slots__ = ("ids", "scores", "embeddings", "processing_time_ms")
+
+    def __init__(self, response: Dict[str, Any]) -> None:
+        np = _import_numpy()
+        hits = response.get("hits", [])
+        self.ids = np.array([hit["_id"] for hit in hits], dtype=str)
+        self.scores = np.array([hit.get("_score", np.nan) for hit in hits], dtype=np.float64)
+        self.embeddings = None
+        if hits and all(hit.get("_tensor_facets") and "_embedding" in hit["_tensor_facets"][0] for hit in hits):
+            self.embeddings = np.array([hit["_tensor_facets"][0]["_embedding"] for hit in hits], dtype=np.float32)
+        self.processing_time_ms = response.get("processingTimeMs")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def to_arrow(self) -> "pyarrow.Table":
+        """Returns the hits as a pyarrow Table with `rank`, `_id` and `_score`
+        columns, and an `_embedding` column if embeddings are available.
+
+        Requires pyarrow.
+        """
+        pa = _import_pyarrow()
+        columns = {
+            "rank": pa.array(range(len(self.ids)), type=pa.int32()),
+            "_id": pa.array(self.ids.tolist(), type=pa.string()),
+            "_score": pa.array(self.scores, type=pa.float64()),
+        }
+        if self.embeddings is not None:
+            columns["_embedding"] = pa.FixedSizeListArray.from_arrays(
+                pa.array(self.embeddings.ravel(), type=pa.float32()), self.embeddings.shape[1]
+            )
+        return pa.table(columns)
+
+    def __repr__(self) -> str:
+        return f"ColumnarSearchResult(hits={len(self.ids)}, embeddings={self.embeddings is not None})"
+
+
+class ColumnarBulkSearchResult(Sequence[ColumnarSearchResult]):
+    """
+    The results of a bulk search in columnar form, as returned by
+    Client.bulk_search(..., as_columnar=True): one ColumnarSearchResult per
+    query, in query order.
+    """
+
+    __slots__ = ("_results", "raw")
+
+    def __init__(self, response: Dict[str, Any]) -> None:
+        self.raw = response
+        self._results = [ColumnarSearchResult(result) for result in response["result"]]
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def __getitem__(self, index):
+        return self._results[index]
+
+    def to_arrow(self) -> "pyarrow.Table":
+        """Returns the hits of all the queries as a single pyarrow Table, with a
+        `query` column holding the position of each hit's query.
+
+        Requires pyarrow.
+        """
+        pa = _import_pyarrow()
+        tables = []
+        for query_position, result in enumerate(self._results):
+            table = result.to_arrow()
+            tables.append(table.add_column(0, "query", pa.array([query_position] * len(result), type=pa.int32())))
+        if not tables:
+            return pa.table({"query": pa.array([], type=pa.int32())})
+        return pa.concat_tables(tables, promote_options="default")
+
+    def __repr__(self) -> str:
+        return f"ColumnarBulkSearchResult(queries={len(self._results)})"
+
+
+def wrap_search_response(
+        response: Dict[str, Any], as_search_result: bool = False, as_columnar: bool = False
+) -> Union[Dict[str, Any], SearchResult, ColumnarSearchResult]:
+    """Returns the search response in the format requested by search()."""
+    if as_columnar:
+        return ColumnarSearchResult(response)
+    if as_search_result:
+        return SearchResult(response)
+    return response
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("Columnar search results require the `numpy` package. "
+                          "Install it with `pip install numpy`.") from None
+    return numpy
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Arrow conversion requires the `pyarrow` package. "
+                          "Install it with `pip install pyarrow`.") from None
+    return pyarrow
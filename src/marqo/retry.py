@@ -0,0 +1,104 @@
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Iterable, Mapping, Optional
+
+from marqo import errors
+
+
+class RetryPolicy:
+    """
+    Describes how requests that are safe to repeat (searches, gets and document
+    upserts) are retried when Marqo is temporarily unavailable.
+
+    add_documents requests with documents lacking an _id are only retried on
+    the status codes of retry_on_status_codes, which Marqo returns without
+    processing the request: after a timeout or a connection error, Marqo may
+    have indexed the documents already, and would index them again under new ids.
+
+    The delay before retry n (starting at 1) is backoff_factor * 2 ** (n - 1)
+    seconds, capped at max_backoff. With jitter, the delay is drawn uniformly
+    between 0 and that value, so that many clients don't retry in lockstep.
+    If the response carries a Retry-After header, it is used instead (also
+    capped at max_backoff).
+    """
+
+    def __init__(
+            self,
+            max_attempts: int = 3,
+            retry_on_status_codes: Iterable[int] = (429, 502, 503, 504),
+            backoff_factor: float = 0.5,
+            max_backoff: float = 30.0,
+            jitter: bool = True,
+            respect_retry_after: bool = True,
+            retry_on_timeout: bool = True,
+            retry_on_connection_error: bool = True
+    ) -> None:
+        """
+        Args:
+            max_attempts: the maximum number of attempts, including the first one
+            retry_on_status_codes: HTTP status codes that are retried
+            backoff_factor: the base delay, in seconds
+            max_backoff: the maximum delay between two attempts, in seconds
+            jitter: whether to randomise the delay
+            respect_retry_after: whether to use the Retry-After header of responses, if present
+            retry_on_timeout: whether to retry requests that timed out
+            retry_on_connection_error: whether to retry requests that failed to connect
+        """
+        if not isinstance(max_attempts, int) or max_attempts < 1:
+            raise errors.InvalidArgError("max_attempts must be a positive integer")
+        if backoff_factor < 0 or max_backoff < 0:
+            raise errors.InvalidArgError("backoff_factor and max_backoff can't be negative")
+        self.max_attempts = max_attempts
+        self.retry_on_status_codes = frozenset(retry_on_status_codes)
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.respect_retry_after = respect_retry_after
+        self.retry_on_timeout = retry_on_timeout
+        self.retry_on_connection_error = retry_on_connection_error
+
+    def delay_for_status(self, status_code: int, headers: Mapping[str, str], attempt: int) -> Optional[float]:
+        """Returns how long to wait before retrying a request that got status_code,
+        or None if it shouldn't be retried.
+
+        Args:
+            status_code: the HTTP status code of the response
+            headers: the headers of the response
+            attempt: the number of the attempt that got the response, starting at 1
+        """
+        if status_code not in self.retry_on_status_codes or attempt >= self.max_attempts:
+            return None
+        if self.respect_retry_after:
+            retry_after = self._parse_retry_after(headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, self.max_backoff)
+        return self._backoff(attempt)
+
+    def delay_for_error(self, is_timeout: bool, attempt: int) -> Optional[float]:
+        """Returns how long to wait before retrying a request that timed out or
+        couldn't connect, or None if it shouldn't be retried."""
+        retry = self.retry_on_timeout if is_timeout else self.retry_on_connection_error
+        if not retry or attempt >= self.max_attempts:
+            return None
+        return self._backoff(attempt)
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_factor * 2 ** (attempt - 1), self.max_backoff)
+        if self.jitter:
+            return random.uniform(0, delay)
+        return delay
+
+    @staticmethod
+    def _parse_retry_after(retry_after: Optional[str]) -> Optional[float]:
+        """Parses a Retry-After header, given either in seconds or as an HTTP date."""
+        if not retry_after:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
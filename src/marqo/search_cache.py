@@ -0,0 +1,142 @@
+import collections
+import json
+import threading
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+
+from marqo import errors
+from marqo.serializers import json_default
+
+CacheKey = Tuple[str, str, str]
+
+
+class SearchResultCache:
+    """
+    In-process cache of search responses, keyed on the index name and the
+    normalised search request.
+
+    Entries expire after ttl seconds. When the cache holds more than
+    max_entries entries, or more than max_bytes bytes of responses, the least
+    recently used entries are evicted. Responses are stored encoded and decoded
+    on every hit, so callers are free to mutate the results they get.
+
+    The cache of an index is invalidated whenever documents of that index are
+    added, updated or deleted through a client using this cache. Writes made
+    by other clients are only picked up once entries expire.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = 60, max_bytes: Optional[int] = None) -> None:
+        """
+        Args:
+            max_entries: the maximum number of cached responses
+            ttl: the number of seconds a response stays cached. None means no expiry.
+            max_bytes: the maximum total size of the cached responses, in bytes.
+                None means no limit.
+        """
+        if not isinstance(max_entries, int) or max_entries <= 0:
+            raise errors.InvalidArgError("max_entries must be a positive integer")
+        if ttl is not None and ttl <= 0:
+            raise errors.InvalidArgError("ttl must be positive")
+        if max_bytes is not None and max_bytes <= 0:
+            raise errors.InvalidArgError("max_bytes must be positive")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries: "collections.OrderedDict[CacheKey, Tuple[Optional[float], bytes]]" = collections.OrderedDict()
+        self._keys_by_index: Dict[str, Set[CacheKey]] = collections.defaultdict(set)
+        self._generations: Dict[str, int] = collections.defaultdict(int)
+        self._size_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(index_name: str, path: str, body: Dict[str, Any]) -> CacheKey:
+        """Builds the cache key of a search request. Bodies that only differ in key order share a key."""
+        return index_name, path, json.dumps(body, sort_keys=True, separators=(",", ":"), default=json_default)
+
+    def generation(self, index_name: str) -> int:
+        """Returns a counter that changes every time the cache of index_name is invalidated.
+
+        Read it before sending a search, and pass it to put(), so that a response
+        fetched before an invalidation is not cached after it.
+        """
+        return self._generations[index_name]
+
+    def get(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        """Returns a fresh copy of the cached response for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not None and entry[0] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            encoded = entry[1]
+        return json.loads(encoded)
+
+    def put(self, key: CacheKey, response: Dict[str, Any], generation: Optional[int] = None) -> None:
+        """Caches response under key, evicting least recently used entries if needed."""
+        encoded = json.dumps(response).encode("utf-8")
+        if self.max_bytes is not None and len(encoded) > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        index_name = key[0]
+        with self._lock:
+            if generation is not None and generation != self._generations[index_name]:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, encoded)
+            self._keys_by_index[index_name].add(key)
+            self._size_bytes += len(encoded)
+            while len(self._entries) > self.max_entries or \
+                    (self.max_bytes is not None and self._size_bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_index(self, index_name: str) -> None:
+        """Drops all the cached responses of index_name."""
+        with self._lock:
+            self._generations[index_name] += 1
+            for key in list(self._keys_by_index.pop(index_name, ())):
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Drops all the cached responses."""
+        with self._lock:
+            for index_name in list(self._keys_by_index):
+                self._generations[index_name] += 1
+            self._entries.clear()
+            self._keys_by_index.clear()
+            self._size_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the hit, miss and eviction counters and the current size of the cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._size_bytes,
+            }
+
+    def _remove(self, key: CacheKey) -> None:
+        _, encoded = self._entries.pop(key)
+        self._size_bytes -= len(encoded)
+        keys = self._keys_by_index.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_index[key[0]]
+
+    def __deepcopy__(self, memo) -> "SearchResultCache":
+        # the copy gets the same settings but starts empty
+        return SearchResultCache(max_entries=self.max_entries, ttl=self.ttl, max_bytes=self.max_bytes)
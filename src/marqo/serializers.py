@@ -0,0 +1,140 @@
+import json
+from typing import Any, Dict, Union
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is only needed for array support
+    np = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only when the optional dependency is missing
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:  # pragma: no cover - exercised only when the optional dependency is missing
+    simdjson = None
+
+
+def json_default(obj: Any) -> Any:
+    """Encodes the objects the json module doesn't support natively. Use it as
+    the `default` argument of json.dumps()."""
+    if np is not None:
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        if isinstance(obj, np.generic):
+            return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class JsonSerializer:
+    """
+    Encodes request bodies and decodes response bodies with the standard
+    library's json module. numpy arrays and scalars are encoded as JSON
+    arrays and numbers.
+
+    Subclass it and override dumps() and loads() to plug in another JSON
+    library, then pass an instance to the Client as `serializer`.
+    """
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> Union[bytes, str]:
+        return json.dumps(obj, default=json_default)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+
+class OrjsonSerializer(JsonSerializer):
+    """
+    Encodes and decodes with orjson, which is several times faster than the
+    json module on vector-heavy payloads and encodes numpy arrays without
+    converting them to lists first.
+
+    Payloads orjson rejects (e.g. integers over 64 bits, or NaN in responses)
+    are handled by the json module instead. The output is the same as
+    JsonSerializer's up to whitespace, except for NaN and infinite floats,
+    which orjson encodes as null where the json module writes NaN and Infinity.
+    """
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        if orjson is None:
+            raise ImportError(
+                "OrjsonSerializer requires the `orjson` package. "
+                "Install it with `pip install marqo[orjson]` or `pip install orjson`."
+            )
+        self._options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj: Any) -> Union[bytes, str]:
+        try:
+            return orjson.dumps(obj, default=json_default, option=self._options)
+        except TypeError:
+            return super().dumps(obj)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return super().loads(data)
+
+
+def default_serializer() -> JsonSerializer:
+    """Returns the fastest serializer available: OrjsonSerializer if orjson
+    is installed, JsonSerializer otherwise."""
+    if orjson is not None:
+        return OrjsonSerializer()
+    return JsonSerializer()
+
+
+def lazy_loads(data: Union[bytes, str]) -> Any:
+    """Parses a JSON document with pysimdjson, without building Python objects for it.
+
+    JSON objects and arrays are returned as read-only pysimdjson proxies, whose
+    values are only converted to Python objects when they are accessed, so
+    reading a few fields of a large response costs a fraction of decoding it.
+    Use materialize() to convert a proxy to plain dicts and lists.
+
+    Requires the `pysimdjson` package.
+    """
+    if simdjson is None:
+        raise ImportError("Lazy decoding requires the `pysimdjson` package. "
+                          "Install it with `pip install marqo[simdjson]` or `pip install pysimdjson`.")
+    # a parser can't be reused while proxies into its last document are alive, so each document gets its own
+    return simdjson.Parser().parse(data)
+
+
+def is_json_object(value: Any) -> bool:
+    """Returns whether value is a decoded JSON object: a dict, or an object proxy
+    returned by lazy_loads()."""
+    return isinstance(value, dict) or (simdjson is not None and isinstance(value, simdjson.Object))
+
+
+def materialize(value: Any) -> Any:
+    """Converts a value returned by lazy_loads() to plain dicts and lists. Other
+    values are returned as they are."""
+    if simdjson is not None:
+        if isinstance(value, simdjson.Object):
+            return value.as_dict()
+        if isinstance(value, simdjson.Array):
+            return value.as_list()
+    return value
+
+
+def facet_embeddings_to_numpy(document: Dict[str, Any], dtype: str = "float32") -> Dict[str, Any]:
+    """Replaces, in place, the `_embedding` of each tensor facet of a document
+    returned with expose_facets=True with a numpy array.
+
+    Returns:
+        The document
+    """
+    if np is None:
+        raise ImportError("Returning embeddings as arrays requires the `numpy` package. "
+                          "Install it with `pip install numpy`.")
+    for facet in document.get("_tensor_facets", ()):
+        if "_embedding" in facet:
+            facet["_embedding"] = np.asarray(facet["_embedding"], dtype=dtype)
+    return document
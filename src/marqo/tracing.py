@@ -0,0 +1,85 @@
+from typing import Any, Dict, MutableMapping, Optional
+
+from marqo import serializers
+
+try:
+    from opentelemetry import propagate, trace
+except ImportError:  # pragma: no cover - exercised only when the optional dependency is missing
+    propagate = None
+    trace = None
+
+TRACER_NAME = "marqo"
+
+# span attributes, following the OpenTelemetry semantic conventions where there is one
+HTTP_REQUEST_METHOD = "http.request.method"
+HTTP_RESPONSE_STATUS_CODE = "http.response.status_code"
+HTTP_REQUEST_BODY_SIZE = "http.request.body.size"
+HTTP_RESPONSE_BODY_SIZE = "http.response.body.size"
+OPERATION = "marqo.operation"
+INDEX_NAME = "marqo.index_name"
+INDEX_NAMES = "marqo.index_names"
+INDEX_STATUS = "marqo.index_status"
+BATCH_NUMBER = "marqo.batch.number"
+DOCUMENT_COUNT = "marqo.document.count"
+QUERY_COUNT = "marqo.query.count"
+HIT_COUNT = "marqo.hit.count"
+PROCESSING_TIME_MS = "marqo.processing_time_ms"
+SEARCH_METHOD = "marqo.search_method"
+
+
+class _NoOpSpan:
+    """Stands in for spans and their context managers when OpenTelemetry isn't installed."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoOpSpan":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        return None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def is_recording(self) -> bool:
+        return False
+
+
+_NO_OP_SPAN = _NoOpSpan()
+
+
+def start_span(name: str, attributes: Optional[Dict[str, Any]] = None, client: bool = False):
+    """Starts an OpenTelemetry span, to be used as a context manager.
+
+    The span is the current span within the with block, so spans started in it,
+    including those of the requests sent to Marqo, are its children. Exceptions
+    raised in the block are recorded on the span.
+
+    Spans are created with the tracer provider configured globally with
+    OpenTelemetry. If the opentelemetry-api package isn't installed, a shared
+    no-op span is returned and nothing is recorded.
+
+    Args:
+        name: the span name, e.g. "marqo.search"
+        attributes: the span attributes. None values are dropped.
+        client: whether the span is that of a request to Marqo (SpanKind.CLIENT)
+    """
+    if trace is None:
+        return _NO_OP_SPAN
+    if attributes is not None:
+        attributes = {key: value for key, value in attributes.items() if value is not None}
+    return trace.get_tracer(TRACER_NAME).start_as_current_span(
+        name, kind=trace.SpanKind.CLIENT if client else trace.SpanKind.INTERNAL, attributes=attributes
+    )
+
+
+def inject_context(headers: MutableMapping[str, str]) -> None:
+    """Adds the headers propagating the current trace context (e.g. traceparent) to headers."""
+    if propagate is not None:
+        propagate.inject(headers)
+
+
+def set_processing_time(span, response: Any) -> None:
+    """Sets the processingTimeMs reported by Marqo in response, if any, on span."""
+    if span.is_recording() and serializers.is_json_object(response) and "processingTimeMs" in response:
+        span.set_attribute(PROCESSING_TIME_MS, response["processingTimeMs"])
@@ -1,3 +1,4 @@
+import copy
 import os
 import unittest
 from unittest.mock import patch, MagicMock
@@ -6,7 +7,9 @@ import pytest
 import requests.exceptions
 
 from marqo._httprequests import HttpRequests
+from marqo.client import Client
 from marqo.config import Config
+from marqo.connection_pool import SessionPool
 from marqo.default_instance_mappings import DefaultInstanceMappings
 from marqo.marqo_cloud_instance_mappings import MarqoCloudInstanceMappings
 from marqo.errors import MarqoWebError
@@ -123,4 +126,70 @@ class TestConstructCloudPath(unittest.TestCase):
             for path in test_cases:
                 with self.subTest(f"base_url={custom_cloud_url}, path={path}"):
                     result=self.construct_path_helper(custom_cloud_url, path)
-                    self.assertEqual(f"{custom_cloud_url}/api/v2/{path}", result)
\ No newline at end of file
+                    self.assertEqual(f"{custom_cloud_url}/api/v2/{path}", result)
+
+@pytest.mark.fixed
+class TestSessionPool(unittest.TestCase):
+
+    def test_sessions_are_per_config_and_base_url(self):
+        config_1 = Config(instance_mappings=DefaultInstanceMappings("http://localhost:8882"))
+        config_2 = Config(instance_mappings=DefaultInstanceMappings("http://localhost:8882"))
+
+        session_a = config_1.session_pool.get_session("http://a:8882")
+        self.assertIs(session_a, config_1.session_pool.get_session("http://a:8882"))
+        self.assertIsNot(session_a, config_1.session_pool.get_session("http://b:8882"))
+        self.assertIsNot(session_a, config_2.session_pool.get_session("http://a:8882"))
+
+    def test_pool_settings_are_applied(self):
+        pool = SessionPool(pool_connections=3, pool_maxsize=50, pool_block=True, keep_alive=False)
+        session = pool.get_session("https://my-index.marqo.ai")
+        adapter = session.get_adapter("https://my-index.marqo.ai/indexes")
+
+        self.assertEqual(3, adapter._pool_connections)
+        self.assertEqual(50, adapter._pool_maxsize)
+        self.assertTrue(adapter._pool_block)
+        self.assertEqual("close", session.headers["Connection"])
+
+    def test_keep_alive_by_default(self):
+        session = SessionPool().get_session("http://localhost:8882")
+        self.assertNotEqual("close", session.headers.get("Connection"))
+
+    @patch("requests.sessions.Session.request")
+    def test_send_request_uses_session_of_index_endpoint(self, mock_request: MagicMock):
+        mock_request.return_value.content = b''
+        mapping = MarqoCloudInstanceMappings("https://api.marqo.ai")
+        config = Config(instance_mappings=mapping)
+        endpoints = {"index1": "https://index1.marqo.ai", "index2": "https://index2.marqo.ai"}
+        used_sessions = []
+
+        original_get_session = config.session_pool.get_session
+
+        def get_session(base_url):
+            session = original_get_session(base_url)
+            used_sessions.append((base_url, session))
+            return session
+
+        with patch.object(mapping, "get_index_base_url", side_effect=lambda index_name: endpoints[index_name]), \
+                patch.object(config.session_pool, "get_session", side_effect=get_session):
+            http_requests = HttpRequests(config)
+            http_requests.get("indexes/index1/stats", index_name="index1")
+            http_requests.get("indexes/index2/stats", index_name="index2")
+            http_requests.get("indexes/index1/stats", index_name="index1")
+
+        self.assertEqual(["https://index1.marqo.ai", "https://index2.marqo.ai", "https://index1.marqo.ai"],
+                         [base_url for base_url, _ in used_sessions])
+        self.assertIs(used_sessions[0][1], used_sessions[2][1])
+        self.assertIsNot(used_sessions[0][1], used_sessions[1][1])
+
+    def test_client_pool_settings_and_deepcopy(self):
+        client = Client("http://localhost:8882", pool_maxsize=64, pool_block=True)
+        client.config.session_pool.get_session("http://localhost:8882")
+        self.assertEqual(64, client.config.session_pool.pool_maxsize)
+
+        client_copy = copy.deepcopy(client)
+        self.assertEqual(64, client_copy.config.session_pool.pool_maxsize)
+        self.assertTrue(client_copy.config.session_pool.pool_block)
+        self.assertIsNot(client.config.session_pool.get_session("http://localhost:8882"),
+                         client_copy.config.session_pool.get_session("http://localhost:8882"))
+        client.close()
+        client_copy.close()
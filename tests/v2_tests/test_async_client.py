@@ -0,0 +1,178 @@
+import asyncio
+import json
+import time
+import unittest
+from unittest import mock
+
+import httpx
+from pytest import mark
+
+from marqo.async_client import AsyncClient
+from marqo.async_index import AsyncIndex
+from marqo.errors import BackendCommunicationError, BackendTimeoutError, InvalidArgError, MarqoWebError
+from marqo.retry import RetryPolicy
+
+
+@mark.fixed
+class TestAsyncClient(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.base_url = "http://localhost:8882"
+        self.requests = []
+        self.responses = {}
+        self.client = AsyncClient(self.base_url)
+        self.client.http.transport = httpx.AsyncClient(transport=httpx.MockTransport(self._handler))
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    def _handler(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content) if request.content else None
+        self.requests.append((request.method, str(request.url), body))
+        status_code, response = self.responses.get((request.method, request.url.path), (200, {}))
+        if isinstance(response, Exception):
+            raise response
+        return httpx.Response(status_code, json=response)
+
+    async def test_search_sends_same_request_as_sync_index(self):
+        self.responses[("POST", "/indexes/my-index/search")] = (200, {"hits": [{"_id": "1"}]})
+        res = await self.client.index("my-index").search("hello", limit=5, filter_string="a:b", device="cuda:1")
+
+        self.assertEqual([{"_id": "1"}], res["hits"])
+        method, url, body = self.requests[0]
+        self.assertEqual("POST", method)
+        self.assertEqual(f"{self.base_url}/indexes/my-index/search?&device=cuda1", url)
+        self.assertEqual("hello", body["q"])
+        self.assertEqual(5, body["limit"])
+        self.assertEqual("a:b", body["filter"])
+
+    async def test_add_documents_batched(self):
+        docs = [{"_id": str(i), "text": "blah"} for i in range(5)]
+        res = await self.client.index("my-index").add_documents(docs, client_batch_size=2, tensor_fields=["text"])
+
+        self.assertEqual(3, len(res))
+        self.assertEqual([2, 2, 1], [len(body["documents"]) for _, _, body in self.requests])
+        for _, url, body in self.requests:
+            self.assertIn("refresh=false", url)
+            self.assertEqual(["text"], body["tensorFields"])
+
+    async def test_add_documents_batch_errors_are_aggregated(self):
+        def handler(request):
+            documents = json.loads(request.content)["documents"]
+            if documents[0]["_id"] == "2":
+                return httpx.Response(400, json={"message": "bad", "code": "bad_request", "type": "invalid_request"})
+            return httpx.Response(200, json={"errors": False, "items": [{"_id": d["_id"]} for d in documents]})
+
+        self.client.http.transport = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        docs = [{"_id": str(i), "text": "blah"} for i in range(6)]
+        with self.assertRaises(MarqoWebError) as cm:
+            await self.client.index("my-index").add_documents(docs, client_batch_size=2, tensor_fields=["text"])
+
+        self.assertEqual([["0", "1"], None, ["4", "5"]],
+                         [res and [item["_id"] for item in res["items"]] for res in cm.exception.batch_results])
+        self.assertEqual(400, cm.exception.status_code)
+        self.assertEqual([1], list(cm.exception.batch_failures))
+
+    async def test_get_documents_and_delete_documents(self):
+        await self.client.index("my-index").get_documents(["1", "2"], expose_facets=True)
+        await self.client.index("my-index").delete_documents(["1"])
+
+        self.assertEqual(
+            ("GET", f"{self.base_url}/indexes/my-index/documents?expose_facets=True", ["1", "2"]), self.requests[0]
+        )
+        self.assertEqual(
+            ("POST", f"{self.base_url}/indexes/my-index/documents/delete-batch", ["1"]), self.requests[1]
+        )
+
+    async def test_bulk_search(self):
+        self.responses[("POST", "/indexes/bulk/search")] = (200, {"result": []})
+        await self.client.bulk_search([{"index": "my-index", "q": "a"}, {"index": "my-index", "q": "b"}])
+
+        _, url, body = self.requests[0]
+        self.assertEqual(f"{self.base_url}/indexes/bulk/search", url)
+        self.assertEqual(["a", "b"], [q["q"] for q in body["queries"]])
+
+    async def test_bulk_search_invalid_query(self):
+        with self.assertRaises(InvalidArgError):
+            await self.client.bulk_search([{"index": "my-index", "not_a_param": "a"}])
+
+    async def test_http_error_is_converted(self):
+        self.responses[("GET", "/indexes/my-index/stats")] = (
+            404, {"message": "not found", "code": "index_not_found", "type": "invalid_request"}
+        )
+        with self.assertRaises(MarqoWebError) as cm:
+            await self.client.index("my-index").get_stats()
+        self.assertEqual("index_not_found", cm.exception.code)
+        self.assertEqual(404, cm.exception.status_code)
+
+    async def test_connection_error_is_converted(self):
+        self.responses[("GET", "/indexes/my-index/settings")] = (0, httpx.ConnectError("refused"))
+        with self.assertRaises(BackendCommunicationError):
+            await self.client.index("my-index").get_settings()
+
+    async def test_context_manager_closes_transport(self):
+        async with AsyncClient(self.base_url) as client:
+            self.assertIsInstance(client.index("my-index"), AsyncIndex)
+        self.assertTrue(client.http.transport.is_closed)
+
+    async def test_retryable_request_is_retried(self):
+        self.client.config.retry_policy = RetryPolicy(max_attempts=3, jitter=False)
+        statuses = [503, 200]
+
+        def handler(request):
+            self.requests.append(request)
+            return httpx.Response(statuses.pop(0), json={"hits": []})
+
+        self.client.http.transport = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with mock.patch("marqo._async_httprequests.asyncio.sleep") as mock_sleep:
+            res = await self.client.index("my-index").search("hello")
+
+        self.assertEqual({"hits": []}, res)
+        self.assertEqual(2, len(self.requests))
+        mock_sleep.assert_called_once_with(0.5)
+
+    async def test_documents_without_ids_are_not_resent_after_a_timeout(self):
+        self.client.config.retry_policy = RetryPolicy(max_attempts=3, jitter=False)
+
+        def handler(request):
+            self.requests.append(request)
+            raise httpx.ReadTimeout("timed out", request=request)
+
+        self.client.http.transport = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with mock.patch("marqo._async_httprequests.asyncio.sleep"):
+            with self.assertRaises(BackendTimeoutError):
+                await self.client.index("my-index").add_documents([{"title": "a"}], tensor_fields=["title"])
+            self.assertEqual(1, len(self.requests))
+            with self.assertRaises(BackendTimeoutError):
+                await self.client.index("my-index").add_documents([{"_id": "1", "title": "a"}], tensor_fields=["title"])
+            self.assertEqual(4, len(self.requests))
+
+    async def test_remote_index_urls_are_resolved_off_the_event_loop(self):
+        mapping = self.client.config.instance_mapping
+
+        def get_index_base_url(index_name):
+            # e.g. a refresh of the Marqo Cloud mappings
+            time.sleep(0.2)
+            return self.base_url
+
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        self.responses[("POST", "/indexes/my-index/search")] = (200, {"hits": []})
+        self.responses[("POST", "/indexes/bulk/search")] = (200, {"result": [{"hits": []}]})
+        with mock.patch.object(mapping, "is_remote", return_value=True), \
+                mock.patch.object(mapping, "get_index_base_url", side_effect=get_index_base_url):
+            ticker = asyncio.ensure_future(tick())
+            try:
+                await self.client.index("my-index").search("hello")
+                self.assertGreater(ticks, 5)
+                ticks = 0
+                await self.client.bulk_search([{"index": "my-index", "q": "a"}])
+                self.assertGreater(ticks, 5)
+            finally:
+                ticker.cancel()
@@ -0,0 +1,383 @@
+import json
+import threading
+import time
+import unittest
+from unittest import mock
+
+from pytest import mark
+
+from marqo import batching
+from marqo.client import Client
+from marqo.errors import BackendTimeoutError, InvalidArgError, MarqoWebError
+from marqo.index import marqo_url_and_version_cache
+
+
+@mark.fixed
+class TestMapInOrder(unittest.TestCase):
+
+    def test_iter_batches(self):
+        self.assertEqual([[0, 1, 2], [3, 4, 5], [6]], list(batching.iter_batches(iter(range(7)), 3)))
+        self.assertEqual([], list(batching.iter_batches([], 3)))
+
+    def test_results_are_in_input_order(self):
+        def slow_for_small_numbers(x):
+            time.sleep(0.01 * (5 - x))
+            return x * 2
+
+        self.assertEqual([0, 2, 4, 6, 8], list(batching.map_in_order(slow_for_small_numbers, range(5), 3)))
+
+    def test_in_flight_window_is_bounded(self):
+        lock = threading.Lock()
+        in_flight = [0]
+        max_seen = [0]
+
+        def track(x):
+            with lock:
+                in_flight[0] += 1
+                max_seen[0] = max(max_seen[0], in_flight[0])
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+            return x
+
+        self.assertEqual(list(range(20)), list(batching.map_in_order(track, range(20), 4)))
+        self.assertLessEqual(max_seen[0], 4)
+        self.assertGreater(max_seen[0], 1)
+
+    def test_items_are_pulled_lazily(self):
+        pulled = []
+
+        def items():
+            for i in range(100):
+                pulled.append(i)
+                yield i
+
+        results = batching.map_in_order(lambda x: x, items(), 2)
+        self.assertEqual(0, next(results))
+        self.assertLessEqual(len(pulled), 3)
+        results.close()
+
+    def test_first_error_is_raised_and_dispatch_stops(self):
+        called = []
+
+        def fail_on_two(x):
+            called.append(x)
+            if x == 2:
+                raise ValueError("boom")
+            return x
+
+        with self.assertRaises(ValueError):
+            list(batching.map_in_order(fail_on_two, range(50), 2))
+        self.assertLess(len(called), 50)
+
+    def test_map_all_in_order_keeps_the_results_of_in_flight_items(self):
+        def fn(x):
+            if x == 1:
+                # once the first three items are in flight
+                time.sleep(0.02)
+                raise ValueError("boom")
+            time.sleep(0.1)
+            if x == 2:
+                raise KeyError("bang")
+            return x
+
+        with self.assertRaises(ValueError) as cm:
+            batching.map_all_in_order("things", fn, range(50), 3)
+
+        self.assertEqual([0, None, None], cm.exception.batch_results)
+        self.assertEqual([1, 2], sorted(cm.exception.batch_failures))
+        self.assertIsInstance(cm.exception.batch_failures[2], KeyError)
+        self.assertEqual([0, 1, 2], batching.map_all_in_order("things", lambda x: x, range(3), 2))
+
+    def test_validate_max_concurrency(self):
+        self.assertEqual(1, batching.validate_max_concurrency(None))
+        self.assertEqual(8, batching.validate_max_concurrency(8))
+        for bad_value in [0, -1, 1.5, "2", True]:
+            with self.subTest(bad_value):
+                with self.assertRaises(InvalidArgError):
+                    batching.validate_max_concurrency(bad_value)
+
+
+@mark.fixed
+class TestConcurrentClientBatching(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client("http://localhost:8882")
+        marqo_url_and_version_cache["http://localhost:8882"] = "_skipped"
+
+    def tearDown(self):
+        marqo_url_and_version_cache.clear()
+
+    def test_add_documents_with_max_concurrency(self):
+        def post(path, body, index_name, **kwargs):
+            time.sleep(0.01 * (5 - len(body["documents"])))
+            return {"errors": False, "items": [{"_id": d["_id"]} for d in body["documents"]]}
+
+        docs = [{"_id": str(i), "text": "blah"} for i in range(10)]
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=post) as mock_post:
+            res = self.client.index("my-index").add_documents(
+                docs, client_batch_size=3, max_concurrency=4, tensor_fields=["text"]
+            )
+
+        self.assertEqual(4, mock_post.call_count)
+        self.assertEqual([d["_id"] for d in docs], [item["_id"] for batch in res for item in batch["items"]])
+
+    def test_update_documents_with_max_concurrency(self):
+        def patch(path, body, index_name, **kwargs):
+            return {"errors": False, "items": [{"_id": d["_id"]} for d in body["documents"]]}
+
+        docs = [{"_id": str(i), "text": "blah"} for i in range(7)]
+        with mock.patch("marqo._httprequests.HttpRequests.patch", side_effect=patch) as mock_patch:
+            res = self.client.index("my-index").update_documents(docs, client_batch_size=2, max_concurrency=3)
+
+        self.assertEqual(4, mock_patch.call_count)
+        self.assertEqual([d["_id"] for d in docs], [item["_id"] for batch in res for item in batch["items"]])
+
+    def test_add_documents_batch_error_is_raised(self):
+        def post(path, body, index_name, **kwargs):
+            if body["documents"][0]["_id"] == "2":
+                raise MarqoWebError(message="bad batch", status_code=400, code="bad_request")
+            # the first batch finishes after the second one failed
+            time.sleep(0.05)
+            return {"errors": False, "items": [{"_id": d["_id"]} for d in body["documents"]]}
+
+        docs = [{"_id": str(i)} for i in range(6)]
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=post) as mock_post:
+            with self.assertRaises(MarqoWebError) as cm:
+                self.client.index("my-index").add_documents(
+                    docs, client_batch_size=2, max_concurrency=2, tensor_fields=[]
+                )
+
+        self.assertEqual(2, mock_post.call_count)
+        self.assertEqual(400, cm.exception.status_code)
+        self.assertEqual([[{"_id": "0"}, {"_id": "1"}], None],
+                         [res and res["items"] for res in cm.exception.batch_results])
+        self.assertEqual({1: cm.exception}, cm.exception.batch_failures)
+
+    def test_failed_batch_is_caught_as_marqo_web_error(self):
+        def post(path, body, index_name, **kwargs):
+            raise MarqoWebError(message="bad batch", status_code=400, code="bad_request")
+
+        try:
+            with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=post):
+                self.client.index("my-index").add_documents([{"_id": "1"}], client_batch_size=1, tensor_fields=[])
+        except MarqoWebError as e:
+            self.assertEqual("bad_request", e.code)
+            self.assertEqual([None], e.batch_results)
+        else:
+            self.fail("the failed batch wasn't raised")
+
+    def test_update_documents_batch_error_is_raised(self):
+        def patch(path, body, index_name, **kwargs):
+            if body["documents"][0]["_id"] == "0":
+                raise BackendTimeoutError("timed out")
+            return {"errors": False, "items": []}
+
+        with mock.patch("marqo._httprequests.HttpRequests.patch", side_effect=patch):
+            with self.assertRaises(BackendTimeoutError) as cm:
+                self.client.index("my-index").update_documents([{"_id": str(i)} for i in range(4)], client_batch_size=2)
+
+        # batches are sent one at a time, so none is sent after the failure
+        self.assertEqual([None], cm.exception.batch_results)
+        self.assertEqual([0], list(cm.exception.batch_failures))
+
+    def test_invalid_max_concurrency(self):
+        with self.assertRaises(InvalidArgError):
+            self.client.index("my-index").add_documents(
+                [{"_id": "1"}], client_batch_size=1, max_concurrency=0, tensor_fields=[]
+            )
+
+
+@mark.fixed
+class TestStreamingIngestion(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client("http://localhost:8882")
+        marqo_url_and_version_cache["http://localhost:8882"] = "_skipped"
+        self.pulled = []
+
+    def tearDown(self):
+        marqo_url_and_version_cache.clear()
+
+    def _documents(self, n):
+        for i in range(n):
+            self.pulled.append(i)
+            yield {"_id": str(i), "text": "blah"}
+
+    @staticmethod
+    def _post(path, body, index_name, **kwargs):
+        return {"errors": False, "items": [{"_id": d["_id"]} for d in body["documents"]]}
+
+    def test_add_documents_stream_sends_batches_lazily(self):
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=self._post) as mock_post:
+            results = self.client.index("my-index").add_documents_stream(
+                self._documents(10), client_batch_size=4, tensor_fields=["text"]
+            )
+            mock_post.assert_not_called()
+
+            first = next(results)
+            self.assertEqual(["0", "1", "2", "3"], [item["_id"] for item in first["items"]])
+            self.assertEqual(4, len(self.pulled))
+
+            rest = list(results)
+        self.assertEqual([4, 2], [len(res["items"]) for res in rest])
+        self.assertEqual(3, mock_post.call_count)
+        for _, kwargs in mock_post.call_args_list:
+            self.assertIn("refresh=false", kwargs["path"])
+
+    def test_add_documents_stream_with_max_concurrency(self):
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=self._post):
+            results = list(self.client.index("my-index").add_documents_stream(
+                self._documents(25), client_batch_size=2, max_concurrency=3, tensor_fields=["text"]
+            ))
+        self.assertEqual([str(i) for i in range(25)], [item["_id"] for res in results for item in res["items"]])
+
+    def test_add_documents_stream_invalid_batch_size(self):
+        for batch_size in [0, -1, None]:
+            with self.subTest(batch_size):
+                with self.assertRaises(InvalidArgError):
+                    self.client.index("my-index").add_documents_stream(self._documents(1), batch_size)
+
+    def test_add_documents_accepts_generator(self):
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=self._post) as mock_post:
+            batched = self.client.index("my-index").add_documents(
+                self._documents(5), client_batch_size=2, tensor_fields=["text"]
+            )
+            unbatched = self.client.index("my-index").add_documents(self._documents(3), tensor_fields=["text"])
+        self.assertEqual(3, len(batched))
+        self.assertEqual(3, len(unbatched["items"]))
+        self.assertEqual(4, mock_post.call_count)
+
+
+@mark.fixed
+class TestAdaptiveBatchSizer(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client("http://localhost:8882")
+        marqo_url_and_version_cache["http://localhost:8882"] = "_skipped"
+
+    def tearDown(self):
+        marqo_url_and_version_cache.clear()
+
+    def _send_all(self, sizer, items, processing_time_ms_per_doc):
+        sizes = []
+
+        def send(batch):
+            sizes.append(len(batch))
+            return {"errors": False, "processingTimeMs": processing_time_ms_per_doc * len(batch)}
+
+        for batch in sizer.batches(items, size_fn=lambda item: 1):
+            sizer.send(batch, send)
+        return sizes
+
+    def test_grows_towards_target_latency(self):
+        sizer = batching.AdaptiveBatchSizer(target_latency_ms=1000, initial_batch_size=4, max_batch_size=100)
+        sizes = self._send_all(sizer, range(500), processing_time_ms_per_doc=10)
+        self.assertEqual([4, 8, 16, 32, 64, 100], sizes[:6])
+        self.assertEqual(100, sizer.batch_size)
+
+    def test_shrinks_when_batches_are_slow(self):
+        sizer = batching.AdaptiveBatchSizer(target_latency_ms=100, initial_batch_size=64)
+        sizes = self._send_all(sizer, range(200), processing_time_ms_per_doc=10)
+        self.assertEqual([64, 32, 16, 10, 10], sizes[:5])
+
+    def test_partial_batch_does_not_grow_batch_size(self):
+        sizer = batching.AdaptiveBatchSizer(target_latency_ms=1000, initial_batch_size=8)
+        self._send_all(sizer, range(3), processing_time_ms_per_doc=1)
+        self.assertEqual(8, sizer.batch_size)
+
+    def test_batches_are_capped_at_max_batch_bytes(self):
+        sizer = batching.AdaptiveBatchSizer(initial_batch_size=10, max_batch_bytes=100)
+        batches = list(sizer.batches([30, 30, 30, 30, 200, 10], size_fn=lambda item: item))
+        self.assertEqual([[30, 30, 30], [30], [200], [10]], batches)
+
+    def test_splits_batch_and_backs_off_on_413(self):
+        sizer = batching.AdaptiveBatchSizer(initial_batch_size=8)
+        sent = []
+
+        def send(batch):
+            if len(batch) > 2:
+                raise MarqoWebError(message="too large", code="request_too_large", error_type="invalid_request",
+                                    status_code=413)
+            sent.append(batch)
+            return {"errors": False, "processingTimeMs": 1}
+
+        results = sizer.send(list(range(8)), send)
+        self.assertEqual([[0, 1], [2, 3], [4, 5], [6, 7]], sent)
+        self.assertEqual([2, 2, 2, 2], [res["clientBatchSize"] for res in results])
+
+    def test_single_document_failure_is_raised(self):
+        sizer = batching.AdaptiveBatchSizer(initial_batch_size=4)
+
+        def send(batch):
+            raise BackendTimeoutError("timed out")
+
+        with self.assertRaises(BackendTimeoutError):
+            sizer.send([1, 2, 3, 4], send)
+        self.assertEqual(1, sizer.batch_size)
+
+    def test_other_errors_are_not_retried(self):
+        sizer = batching.AdaptiveBatchSizer(initial_batch_size=4)
+        send = mock.MagicMock(side_effect=MarqoWebError(message="bad", code="bad", error_type="bad", status_code=400))
+        with self.assertRaises(MarqoWebError):
+            sizer.send([1, 2, 3, 4], send)
+        self.assertEqual(1, send.call_count)
+
+    def test_invalid_args(self):
+        for kwargs in [{"target_latency_ms": 0}, {"initial_batch_size": 0}, {"min_batch_size": 10, "initial_batch_size": 5},
+                       {"max_batch_bytes": 0}]:
+            with self.assertRaises(InvalidArgError):
+                batching.AdaptiveBatchSizer(**kwargs)
+
+    def test_add_documents_with_adaptive_batching(self):
+        def post(path, body, index_name, **kwargs):
+            body = json.loads(body)
+            self.assertEqual(["text"], body["tensorFields"])
+            return {"errors": False, "processingTimeMs": 100 * len(body["documents"]),
+                    "items": [{"_id": d["_id"]} for d in body["documents"]]}
+
+        docs = [{"_id": str(i), "text": "blah"} for i in range(30)]
+        sizer = batching.AdaptiveBatchSizer(target_latency_ms=400, initial_batch_size=2)
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=post):
+            res = self.client.index("my-index").add_documents(docs, adaptive_batching=sizer, tensor_fields=["text"])
+
+        self.assertEqual([2, 4, 4, 4, 4, 4, 4, 4], [batch["clientBatchSize"] for batch in res])
+        self.assertEqual([d["_id"] for d in docs], [item["_id"] for batch in res for item in batch["items"]])
+
+    def test_documents_are_serialized_once_with_adaptive_batching(self):
+        serializer = self.client.config.serializer
+        bodies = []
+
+        def post(path, body, index_name, **kwargs):
+            bodies.append(body)
+            return {"errors": False, "processingTimeMs": 1}
+
+        docs = [{"_id": str(i), "text": "blah", "vector": [0.5, i]} for i in range(6)]
+        sizer = batching.AdaptiveBatchSizer(initial_batch_size=2, max_batch_size=2, max_batch_bytes=1024)
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=post), \
+                mock.patch.object(serializer, "dumps", wraps=serializer.dumps) as dumps:
+            self.client.index("my-index").add_documents(docs, adaptive_batching=sizer, tensor_fields=["text"])
+
+        serialized_docs = [call.args[0] for call in dumps.call_args_list if "_id" in call.args[0]]
+        self.assertEqual(docs, serialized_docs)
+        self.assertEqual(
+            [{"documents": docs[i:i + 2], "tensorFields": ["text"], "useExistingTensors": False,
+              "imageDownloadHeaders": {}} for i in range(0, 6, 2)],
+            [{key: value for key, value in json.loads(body).items() if value is not None} for body in bodies]
+        )
+
+    def test_add_documents_stream_with_adaptive_batching(self):
+        def post(path, body, index_name, **kwargs):
+            return {"errors": False, "processingTimeMs": 1}
+
+        sizer = batching.AdaptiveBatchSizer(initial_batch_size=4, max_batch_size=4)
+        docs = ({"_id": str(i)} for i in range(10))
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=post):
+            res = list(self.client.index("my-index").add_documents_stream(docs, adaptive_batching=sizer))
+        self.assertEqual([4, 4, 2], [batch["clientBatchSize"] for batch in res])
+
+    def test_client_batch_size_and_adaptive_batching_are_exclusive(self):
+        with self.assertRaises(InvalidArgError):
+            self.client.index("my-index").add_documents(
+                [{"_id": "1"}], client_batch_size=2, adaptive_batching=batching.AdaptiveBatchSizer()
+            )
@@ -0,0 +1,161 @@
+import json
+import threading
+import unittest
+from typing import Optional
+from unittest import mock
+
+import httpx
+from pytest import mark
+
+from marqo.async_client import AsyncClient
+from marqo.client import Client
+from marqo.errors import InvalidArgError
+from marqo.index import marqo_url_and_version_cache
+from marqo.instance_mappings import InstanceMappings
+
+
+class RegionalInstanceMappings(InstanceMappings):
+    """Maps indexes named `<region>-...` to the cluster of that region."""
+
+    def get_index_base_url(self, index_name: str) -> str:
+        return f"http://user:secret@{index_name.split('-')[0]}.marqo.test"
+
+    def get_control_base_url(self, path: str = "") -> str:
+        return "http://control.marqo.test"
+
+    def is_remote(self):
+        return True
+
+    def is_index_usage_allowed(self, index_name: str) -> bool:
+        return False
+
+    def index_http_error_handler(self, index_name: str, http_status: Optional[int] = None) -> None:
+        pass
+
+
+def bulk_search_response(queries, processing_time_ms):
+    return {
+        "result": [{"hits": [{"_id": f"{q['index']}:{q['q']}"}]} for q in queries],
+        "processingTimeMs": processing_time_ms,
+    }
+
+
+@mark.fixed
+class TestBulkSearchFanOut(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client(url=None, instance_mappings=RegionalInstanceMappings())
+        marqo_url_and_version_cache.clear()
+
+    def test_queries_are_sent_to_each_cluster_and_merged_in_order(self):
+        lock = threading.Lock()
+        calls = []
+
+        def post(path, body, index_name, **kwargs):
+            with lock:
+                calls.append((index_name, [q["q"] for q in body["queries"]]))
+            return bulk_search_response(body["queries"], 10 if index_name.startswith("eu") else 30)
+
+        queries = [
+            {"index": "eu-products", "q": "a"},
+            {"index": "us-products", "q": "b"},
+            {"index": "eu-articles", "q": "c"},
+            {"index": "us-products", "q": "d"},
+        ]
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=post):
+            res = self.client.bulk_search(queries, include_cluster_details=True)
+
+        self.assertEqual(2, len(calls))
+        self.assertIn(("eu-products", ["a", "c"]), calls)
+        self.assertIn(("us-products", ["b", "d"]), calls)
+        self.assertEqual(
+            ["eu-products:a", "us-products:b", "eu-articles:c", "us-products:d"],
+            [r["hits"][0]["_id"] for r in res["result"]]
+        )
+        self.assertEqual(30, res["processingTimeMs"])
+        self.assertEqual([["eu-articles", "eu-products"], ["us-products"]], [c["indexes"] for c in res["clusters"]])
+        self.assertEqual([[0, 2], [1, 3]], [c["queries"] for c in res["clusters"]])
+        self.assertEqual([10, 30], [c["processingTimeMs"] for c in res["clusters"]])
+        self.assertTrue(all(c["roundtripMs"] >= 0 for c in res["clusters"]))
+        self.assertNotIn("secret", json.dumps(res))
+
+    def test_response_has_the_shape_of_a_single_request_response(self):
+        def post(path, body, index_name, **kwargs):
+            res = bulk_search_response(body["queries"], 10 if index_name.startswith("eu") else 30)
+            res["telemetry"] = {"index": index_name}
+            return res
+
+        queries = [{"index": "eu-products", "q": "a"}, {"index": "us-products", "q": "b"}]
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=post):
+            res = self.client.bulk_search(queries)
+
+        self.assertEqual({"result", "processingTimeMs", "telemetry"}, set(res))
+        self.assertEqual(30, res["processingTimeMs"])
+        self.assertEqual({"index": "us-products"}, res["telemetry"])
+
+    def test_single_cluster_response_is_unchanged(self):
+        queries = [{"index": "eu-products", "q": "a"}, {"index": "eu-articles", "q": "b"}]
+        response = bulk_search_response(queries, 10)
+        with mock.patch("marqo._httprequests.HttpRequests.post", return_value=response) as mock_post:
+            res = self.client.bulk_search(queries, device="cuda")
+
+        self.assertEqual(response, res)
+        mock_post.assert_called_once()
+        self.assertEqual("indexes/bulk/search?&device=cuda", mock_post.call_args.args[0])
+
+
+@mark.fixed
+class TestAsyncBulkSearchFanOut(unittest.IsolatedAsyncioTestCase):
+
+    async def test_queries_are_sent_to_each_cluster_and_merged_in_order(self):
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            body = json.loads(request.content)
+            requests.append((request.url.host, [q["q"] for q in body["queries"]]))
+            return httpx.Response(200, json=bulk_search_response(body["queries"], 5))
+
+        client = AsyncClient(url=None, instance_mappings=RegionalInstanceMappings())
+        client.http.transport = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with client:
+            res = await client.bulk_search([
+                {"index": "eu-products", "q": "a"}, {"index": "us-products", "q": "b"},
+                {"index": "eu-products", "q": "c"},
+            ], include_cluster_details=True)
+
+        self.assertEqual([("eu.marqo.test", ["a", "c"]), ("us.marqo.test", ["b"])], sorted(requests))
+        self.assertEqual(
+            ["eu-products:a", "us-products:b", "eu-products:c"], [r["hits"][0]["_id"] for r in res["result"]]
+        )
+        self.assertEqual(2, len(res["clusters"]))
+
+
+@mark.fixed
+class TestBulkSearchChunking(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client(url=None, instance_mappings=RegionalInstanceMappings(), bulk_search_chunk_size=2)
+        marqo_url_and_version_cache.clear()
+
+    def test_large_bulk_search_is_chunked_per_cluster(self):
+        lock = threading.Lock()
+        calls = []
+
+        def post(path, body, index_name, **kwargs):
+            with lock:
+                calls.append([q["q"] for q in body["queries"]])
+            return bulk_search_response(body["queries"], len(body["queries"]))
+
+        queries = [{"index": "eu-products" if i % 3 else "us-products", "q": str(i)} for i in range(7)]
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=post):
+            res = self.client.bulk_search(queries, max_concurrency=3, include_cluster_details=True)
+
+        self.assertEqual(sorted([["1", "2"], ["4", "5"], ["0", "3"], ["6"]]), sorted(calls))
+        self.assertEqual([f"{q['index']}:{q['q']}" for q in queries], [r["hits"][0]["_id"] for r in res["result"]])
+        self.assertEqual([2, 2], [c["requests"] for c in res["clusters"]])
+        self.assertEqual([[0, 3, 6], [1, 2, 4, 5]], [c["queries"] for c in res["clusters"]])
+        self.assertEqual(2, res["processingTimeMs"])
+
+    def test_invalid_chunk_size(self):
+        with self.assertRaises(InvalidArgError):
+            Client("http://localhost:8882", bulk_search_chunk_size=0)
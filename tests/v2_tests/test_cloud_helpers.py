@@ -0,0 +1,87 @@
+import itertools
+import unittest
+from unittest import mock
+
+from pytest import mark
+
+from marqo.client import Client
+from marqo.cloud_helpers import (
+    async_cloud_wait_for_indexes_status, cloud_wait_for_index_status, cloud_wait_for_indexes_status,
+    poll_intervals
+)
+from marqo.enums import IndexStatus
+from marqo.errors import MarqoCloudIndexStatusTimeoutError, UnsupportedOperationError
+
+
+def list_indexes_response(**statuses):
+    return {"results": [{"indexName": name, "indexStatus": status} for name, status in statuses.items()]}
+
+
+@mark.fixed
+@mock.patch("marqo.cloud_helpers.time.sleep")
+class TestCloudWaitForIndexStatus(unittest.TestCase):
+
+    def test_poll_intervals_back_off(self, mock_sleep):
+        self.assertEqual([1, 2, 4, 8, 10, 10], list(itertools.islice(poll_intervals(), 6)))
+
+    def test_status_is_polled_with_increasing_intervals(self, mock_sleep):
+        req = mock.Mock()
+        req.get.side_effect = [{"indexStatus": "CREATING"}] * 5 + [{"indexStatus": "READY"}]
+
+        self.assertTrue(cloud_wait_for_index_status(req, "my-index", IndexStatus.READY))
+
+        self.assertEqual([mock.call("indexes/my-index/status")] * 6, req.get.call_args_list)
+        self.assertEqual([mock.call(i) for i in [1, 2, 4, 8, 10]], mock_sleep.call_args_list)
+
+    def test_many_indexes_are_polled_with_one_request_per_check(self, mock_sleep):
+        req = mock.Mock()
+        req.get.side_effect = [
+            list_indexes_response(a="CREATING", b="CREATING", other="READY"),
+            list_indexes_response(a="READY", b="CREATING", other="READY"),
+            list_indexes_response(a="MODIFYING", b="READY", other="READY"),
+        ]
+
+        self.assertTrue(cloud_wait_for_indexes_status(req, ["a", "b"], IndexStatus.READY))
+
+        self.assertEqual([mock.call("indexes")] * 3, req.get.call_args_list)
+        self.assertEqual(2, mock_sleep.call_count)
+
+    def test_missing_indexes_are_deleted(self, mock_sleep):
+        req = mock.Mock()
+        req.get.side_effect = [list_indexes_response(a="DELETING"), list_indexes_response()]
+
+        self.assertTrue(cloud_wait_for_indexes_status(req, ["a", "b"], IndexStatus.DELETED))
+        self.assertEqual(2, req.get.call_count)
+
+    def test_timeout(self, mock_sleep):
+        req = mock.Mock()
+        req.get.return_value = list_indexes_response(a="CREATING", b="READY")
+
+        with mock.patch("marqo.cloud_helpers.time.monotonic", side_effect=[0, 0, 3.5, 6]):
+            with self.assertRaises(MarqoCloudIndexStatusTimeoutError) as cm:
+                cloud_wait_for_indexes_status(req, ["a", "b"], IndexStatus.READY, timeout=5)
+
+        self.assertEqual({"a": "CREATING"}, cm.exception.index_statuses)
+        # the last sleep is cut short by the deadline
+        self.assertEqual([mock.call(1), mock.call(1.5)], mock_sleep.call_args_list)
+
+    def test_wait_for_indexes_is_cloud_only(self, mock_sleep):
+        with self.assertRaises(UnsupportedOperationError):
+            Client("http://localhost:8882").wait_for_indexes(["a"])
+
+
+@mark.fixed
+class TestAsyncCloudWaitForIndexesStatus(unittest.IsolatedAsyncioTestCase):
+
+    async def test_many_indexes_are_polled_without_blocking(self):
+        req = mock.Mock()
+        req.get = mock.AsyncMock(side_effect=[
+            list_indexes_response(a="CREATING", b="READY"),
+            list_indexes_response(a="READY", b="READY"),
+        ])
+
+        with mock.patch("marqo.cloud_helpers.asyncio.sleep") as mock_sleep:
+            self.assertTrue(await async_cloud_wait_for_indexes_status(req, ["a", "b"], IndexStatus.READY))
+
+        mock_sleep.assert_awaited_once_with(1.0)
+        self.assertEqual([mock.call("indexes")] * 2, req.get.call_args_list)
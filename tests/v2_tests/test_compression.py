@@ -0,0 +1,110 @@
+import gzip
+import json
+import unittest
+from unittest import mock
+
+import requests
+import zstandard
+from pytest import mark
+
+from marqo import compression
+from marqo.client import Client
+from marqo.compression import BodyCompressor
+from marqo.errors import InvalidArgError
+from marqo.index import marqo_url_and_version_cache
+
+
+def mock_response(content: bytes, headers=None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response._content = content
+    response.headers.update(headers or {})
+    return response
+
+
+@mark.fixed
+class TestBodyCompressor(unittest.TestCase):
+
+    def test_small_bodies_are_not_compressed(self):
+        body, content_encoding = BodyCompressor(threshold=100).compress('{"a": 1}')
+        self.assertEqual(b'{"a": 1}', body)
+        self.assertIsNone(content_encoding)
+
+    def test_gzip(self):
+        payload = json.dumps({"text": "blah " * 1000}).encode()
+        body, content_encoding = BodyCompressor(threshold=100).compress(payload)
+        self.assertEqual("gzip", content_encoding)
+        self.assertLess(len(body), len(payload))
+        self.assertEqual(payload, gzip.decompress(body))
+
+    def test_zstd(self):
+        payload = json.dumps({"text": "blah " * 1000}).encode()
+        body, content_encoding = BodyCompressor(encoding="zstd", threshold=0).compress(payload)
+        self.assertEqual("zstd", content_encoding)
+        self.assertEqual(payload, zstandard.ZstdDecompressor().decompress(body))
+
+    def test_invalid_args(self):
+        with self.assertRaises(InvalidArgError):
+            BodyCompressor(encoding="brotli")
+        with self.assertRaises(InvalidArgError):
+            BodyCompressor(threshold=-1)
+
+    def test_zstd_without_zstandard(self):
+        with mock.patch("marqo.compression.zstandard", None):
+            with self.assertRaises(ImportError):
+                BodyCompressor(encoding="zstd")
+            self.assertEqual("gzip, deflate", compression.accept_encoding())
+
+    def test_decompress_response(self):
+        payload = b'{"hits": []}'
+        compressed = zstandard.ZstdCompressor().compress(payload)
+        self.assertEqual(payload, compression.decompress_response(compressed, "zstd"))
+        # already decoded by the HTTP library
+        self.assertEqual(payload, compression.decompress_response(payload, "zstd"))
+        self.assertEqual(payload, compression.decompress_response(payload, None))
+
+
+@mark.fixed
+class TestRequestCompression(unittest.TestCase):
+
+    def setUp(self):
+        marqo_url_and_version_cache["http://localhost:8882"] = "_skipped"
+
+    def tearDown(self):
+        marqo_url_and_version_cache.clear()
+
+    def test_large_add_documents_batches_are_compressed(self):
+        client = Client("http://localhost:8882", compression="gzip", compression_threshold=1024)
+        docs = [{"_id": str(i), "text": "blah " * 100} for i in range(10)]
+        with mock.patch("requests.sessions.Session.post",
+                        return_value=mock_response(b'{"errors": false, "items": []}')) as mock_post:
+            client.index("my-index").add_documents(docs, tensor_fields=["text"])
+
+        kwargs = mock_post.call_args.kwargs
+        self.assertEqual("gzip", kwargs["headers"]["Content-Encoding"])
+        self.assertEqual(docs, json.loads(gzip.decompress(kwargs["data"]))["documents"])
+
+    def test_small_requests_are_not_compressed(self):
+        client = Client("http://localhost:8882", compression="gzip", compression_threshold=1024)
+        with mock.patch("requests.sessions.Session.patch", return_value=mock_response(b'{}')) as mock_patch:
+            client.index("my-index").update_documents([{"_id": "1", "text": "a"}])
+
+        self.assertNotIn("Content-Encoding", mock_patch.call_args.kwargs["headers"])
+
+    def test_no_compression_by_default(self):
+        client = Client("http://localhost:8882", compression_threshold=0)
+        with mock.patch("requests.sessions.Session.post", return_value=mock_response(b'{"hits": []}')) as mock_post:
+            client.index("my-index").search("a")
+
+        self.assertNotIn("Content-Encoding", mock_post.call_args.kwargs["headers"])
+        self.assertEqual("a", json.loads(mock_post.call_args.kwargs["data"])["q"])
+
+    def test_zstd_responses_are_accepted_and_decoded(self):
+        client = Client("http://localhost:8882")
+        content = zstandard.ZstdCompressor().compress(b'{"results": []}')
+        with mock.patch("requests.sessions.Session.get",
+                        return_value=mock_response(content, {"Content-Encoding": "zstd"})) as mock_get:
+            res = client.index("my-index").get_documents(["1"], expose_facets=True)
+
+        self.assertEqual({"results": []}, res)
+        self.assertIn("zstd", mock_get.call_args.kwargs["headers"]["Accept-Encoding"])
@@ -0,0 +1,68 @@
+import json
+import threading
+import unittest
+from unittest import mock
+
+import httpx
+from pytest import mark
+
+from marqo.async_client import AsyncClient
+from marqo.client import Client
+from marqo.index import marqo_url_and_version_cache
+
+
+def get_documents_response(ids):
+    return {"results": [{"_id": _id, "_found": True} for _id in ids]}
+
+
+@mark.fixed
+class TestGetDocumentsChunking(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client("http://localhost:8882", get_documents_chunk_size=3)
+        marqo_url_and_version_cache["http://localhost:8882"] = "_skipped"
+
+    def tearDown(self):
+        marqo_url_and_version_cache.clear()
+
+    def test_large_get_documents_is_chunked_and_stitched_in_order(self):
+        lock = threading.Lock()
+        calls = []
+
+        def get(path, body, index_name, **kwargs):
+            with lock:
+                calls.append(body)
+            return get_documents_response(body)
+
+        ids = [str(i) for i in range(8)]
+        with mock.patch("marqo._httprequests.HttpRequests.get", side_effect=get):
+            res = self.client.index("my-index").get_documents(ids, expose_facets=True, max_concurrency=2)
+
+        self.assertEqual(sorted([["0", "1", "2"], ["3", "4", "5"], ["6", "7"]]), sorted(calls))
+        self.assertEqual(ids, [doc["_id"] for doc in res["results"]])
+
+    def test_small_get_documents_is_sent_as_one_request(self):
+        with mock.patch("marqo._httprequests.HttpRequests.get", return_value={"results": []}) as mock_get:
+            self.client.index("my-index").get_documents(["1", "2", "3"])
+        mock_get.assert_called_once_with("indexes/my-index/documents", body=["1", "2", "3"], index_name="my-index")
+
+
+@mark.fixed
+class TestAsyncGetDocumentsChunking(unittest.IsolatedAsyncioTestCase):
+
+    async def test_large_get_documents_is_chunked_and_stitched_in_order(self):
+        bodies = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            body = json.loads(request.content)
+            bodies.append(body)
+            return httpx.Response(200, json=get_documents_response(body))
+
+        client = AsyncClient("http://localhost:8882", get_documents_chunk_size=2)
+        client.http.transport = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        ids = [str(i) for i in range(5)]
+        async with client:
+            res = await client.index("my-index").get_documents(ids)
+
+        self.assertEqual(3, len(bodies))
+        self.assertEqual(ids, [doc["_id"] for doc in res["results"]])
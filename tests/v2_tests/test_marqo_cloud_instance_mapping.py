@@ -1,4 +1,7 @@
+import copy
+import threading
 import time
+import unittest
 from unittest import mock
 from unittest.mock import patch, MagicMock
 from marqo.enums import IndexStatus
@@ -568,3 +571,152 @@ class TestMarqoCloudInstanceMappings(MarqoTestCase):
         assert IndexStatus.DELETED == "DELETED"
 
 
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+@mark.fixed
+class TestMarqoCloudInstanceMappingsBackgroundRefresh(unittest.TestCase):
+
+    def setUp(self):
+        self.gate = threading.Event()
+        self.gate.set()
+        self.calls = 0
+        self.response = mock.MagicMock(ok=True)
+        self.response.json.return_value = {"results": [
+            {"indexName": "index1", "marqoEndpoint": "example.com", "indexStatus": "READY"},
+        ]}
+
+        def get(url, *args, **kwargs):
+            self.calls += 1
+            self.gate.wait()
+            return self.response
+
+        patcher = mock.patch("marqo.marqo_cloud_instance_mappings.requests.get", side_effect=get)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def new_mapping(self, **kwargs) -> MarqoCloudInstanceMappings:
+        mapping = MarqoCloudInstanceMappings(
+            control_base_url="https://api.marqo.ai", api_key="your-api-key", background_refresh=True, **kwargs
+        )
+        self.addCleanup(mapping.close)
+        return mapping
+
+    def test_stale_mappings_are_served_while_refreshing_in_background(self):
+        mapping = self.new_mapping(url_cache_duration=60)
+        # an unknown index is resolved on the request path
+        self.assertEqual("example.com", mapping.get_index_base_url("index1"))
+        self.assertEqual(1, self.calls)
+
+        self.gate.clear()
+        mapping.latest_index_mappings_refresh_timestamp -= 120
+        self.response.json.return_value = {"results": [
+            {"indexName": "index1", "marqoEndpoint": "new.example.com", "indexStatus": "READY"},
+        ]}
+        # the control plane is blocked, but the stale endpoint is returned right away
+        self.assertEqual("example.com", mapping.get_index_base_url("index1"))
+        wait_until(lambda: self.calls == 2)
+
+        self.gate.set()
+        wait_until(lambda: mapping.get_index_base_url("index1") == "new.example.com")
+        self.assertEqual(2, self.calls)
+
+    def test_mappings_are_renewed_before_they_expire(self):
+        with mock.patch.object(MarqoCloudInstanceMappings, "MIN_BACKGROUND_REFRESH_INTERVAL", 0.01):
+            mapping = self.new_mapping(url_cache_duration=0.1)
+        wait_until(lambda: self.calls >= 2)
+        self.assertEqual({"index1": "example.com"}, mapping._urls_mapping[IndexStatus.READY])
+
+    def test_close_stops_the_refresher(self):
+        mapping = self.new_mapping()
+        mapping.close()
+        mapping._refresher.join(timeout=5)
+        self.assertFalse(mapping._refresher.is_alive())
+
+    def test_deepcopy(self):
+        mapping = self.new_mapping(url_cache_duration=60)
+        mapping.get_index_base_url("index1")
+
+        copied = copy.deepcopy(mapping)
+        self.addCleanup(copied.close)
+
+        self.assertEqual("example.com", copied.get_index_base_url("index1"))
+        self.assertIsNot(mapping._refresher, copied._refresher)
+        self.assertEqual(1, self.calls)
+
+
+@mark.fixed
+class TestMarqoCloudInstanceMappingsConcurrency(unittest.TestCase):
+    num_threads = 100
+
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+        response = mock.MagicMock(ok=True)
+        response.json.return_value = {"results": [
+            {"indexName": "index1", "marqoEndpoint": "example.com", "indexStatus": "READY"},
+            {"indexName": "index2", "marqoEndpoint": "example2.com", "indexStatus": "CREATING"},
+        ]}
+
+        def get(url, *args, **kwargs):
+            with self.lock:
+                self.calls += 1
+            # keep the refresh in flight long enough for all the threads to pile up
+            time.sleep(0.2)
+            return response
+
+        patcher = mock.patch("marqo.marqo_cloud_instance_mappings.requests.get", side_effect=get)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mapping = MarqoCloudInstanceMappings(
+            control_base_url="https://api.marqo.ai", api_key="your-api-key", url_cache_duration=60
+        )
+
+    def run_threads(self, target):
+        barrier = threading.Barrier(self.num_threads)
+        results = [None] * self.num_threads
+
+        def run(i):
+            barrier.wait()
+            results[i] = target()
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(self.num_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_one_control_plane_request_per_stale_window(self):
+        results = self.run_threads(lambda: self.mapping.get_index_base_url("index1"))
+
+        self.assertEqual(1, self.calls)
+        self.assertEqual(["example.com"] * self.num_threads, results)
+
+        # stale again: index errors trigger refreshes from every thread
+        self.mapping.latest_index_mappings_refresh_timestamp -= 120
+        self.run_threads(lambda: self.mapping.index_http_error_handler("index1"))
+
+        self.assertEqual(2, self.calls)
+
+    def test_known_index_gets_stale_mappings_during_a_refresh(self):
+        self.mapping.get_index_base_url("index2")
+        self.mapping.latest_index_mappings_refresh_timestamp -= 120
+
+        def get_index_base_url():
+            start = time.time()
+            return self.mapping.get_index_base_url("index2"), time.time() - start
+
+        results = self.run_threads(get_index_base_url)
+
+        self.assertEqual(2, self.calls)
+        self.assertEqual({"example2.com"}, {url for url, _ in results})
+        # all but the refreshing thread returned without waiting for the control plane
+        self.assertGreaterEqual(sum(elapsed < 0.15 for _, elapsed in results), self.num_threads - 1)
@@ -0,0 +1,203 @@
+import copy
+import gzip
+import io
+import json
+import unittest
+from unittest import mock
+
+import httpx
+import requests
+import urllib3
+from pytest import mark
+
+from marqo.async_client import AsyncClient
+from marqo.client import Client
+from marqo.errors import InvalidArgError, MarqoWebError
+from marqo.index import marqo_url_and_version_cache
+from marqo.metrics import MetricsRegistry, request_labels
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+
+def make_response(status_code, body):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body).encode("utf-8")
+    return response
+
+
+@mark.fixed
+class TestRequestLabels(unittest.TestCase):
+
+    def test_operations_are_named_after_client_methods(self):
+        cases = [
+            (("post", "indexes/my-index/search?&device=cuda", "my-index"), ("search", "my-index")),
+            (("post", "indexes/bulk/search", "my-index"), ("bulk_search", "")),
+            (("post", "indexes/my-index/documents?device=cpu", "my-index"), ("add_documents", "my-index")),
+            (("patch", "indexes/my-index/documents", "my-index"), ("update_documents", "my-index")),
+            (("post", "indexes/my-index/documents/delete-batch", "my-index"), ("delete_documents", "my-index")),
+            (("get", "indexes/my-index/documents/doc1", "my-index"), ("get_document", "my-index")),
+            (("get", "indexes/my-index/documents", "my-index"), ("get_documents", "my-index")),
+            (("post", "indexes/my-index", ""), ("create_index", "my-index")),
+            (("delete", "indexes/my-index", ""), ("delete_index", "my-index")),
+            (("get", "indexes/my-index/stats", "my-index"), ("get_stats", "my-index")),
+            (("get", "indexes", ""), ("get_indexes", "")),
+            (("get", "device/cuda", "my-index"), ("get_cuda_info", "my-index")),
+            (("put", "indexes/my-index/unknown", "my-index"), ("put /indexes/{index}/unknown", "my-index")),
+        ]
+        for args, expected in cases:
+            with self.subTest(args=args):
+                self.assertEqual(expected, request_labels(*args))
+
+
+@mark.fixed
+class TestMetricsRegistry(unittest.TestCase):
+
+    def test_requests_are_recorded_by_operation_and_index(self):
+        registry = MetricsRegistry(buckets=[0.1, 1])
+        registry.record_request("post", "indexes/my-index/search", "my-index", 0.05, bytes_sent=10,
+                                bytes_received=100, response={"hits": [], "processingTimeMs": 500})
+        registry.record_request("post", "indexes/my-index/search", "my-index", 2.0, bytes_sent=10,
+                                error=MarqoWebError("boom", code="index_not_found", error_type="x", status_code=404))
+
+        series = registry.snapshot()["search"]["my-index"]
+        self.assertEqual(2, series["requests"])
+        self.assertEqual({"index_not_found": 1}, series["errors"])
+        self.assertEqual(20, series["bytesSent"])
+        self.assertEqual(100, series["bytesReceived"])
+        self.assertEqual({0.1: 1, 1.0: 1, float("inf"): 2}, series["roundtripSeconds"]["buckets"])
+        self.assertEqual(2.05, series["roundtripSeconds"]["sum"])
+        self.assertEqual({"count": 1, "sum": 0.5, "buckets": {0.1: 0, 1.0: 1, float("inf"): 1}},
+                         series["processingTimeSeconds"])
+
+    def test_successful_documents_are_counted_as_ingested(self):
+        registry = MetricsRegistry()
+        registry.record_request("post", "indexes/my-index/documents", "my-index", 0.1, response={
+            "errors": True, "items": [{"_id": "1", "status": 200}, {"_id": "2", "status": 400, "error": "bad"}]
+        })
+        self.assertEqual(1, registry.snapshot()["add_documents"]["my-index"]["documentsIngested"])
+
+    def test_to_prometheus(self):
+        registry = MetricsRegistry(buckets=[1])
+        registry.record_request("post", "indexes/my-index/search", "my-index", 0.5, bytes_sent=10)
+        registry.record_request("get", "indexes", "", 0.1, error=ValueError())
+
+        text = registry.to_prometheus()
+        self.assertIn('marqo_client_requests_total{operation="search",index="my-index"} 1\n', text)
+        self.assertIn('marqo_client_errors_total{operation="get_indexes",index="",code="ValueError"} 1\n', text)
+        self.assertIn('marqo_client_request_duration_seconds_bucket{operation="search",index="my-index",le="1.0"} 1\n',
+                      text)
+        self.assertIn('marqo_client_request_duration_seconds_bucket{operation="search",index="my-index",le="+Inf"} 1\n',
+                      text)
+        self.assertIn('marqo_client_sent_bytes_total{operation="search",index="my-index"} 10\n', text)
+        self.assertIn("# TYPE marqo_client_processing_time_seconds histogram\n", text)
+
+    @unittest.skipUnless(prometheus_client is not None, "prometheus_client is not installed")
+    def test_prometheus_collector(self):
+        registry = MetricsRegistry()
+        registry.record_request("post", "indexes/my-index/search", "my-index", 0.5)
+        prometheus_registry = prometheus_client.CollectorRegistry()
+        prometheus_registry.register(registry.prometheus_collector())
+        self.assertEqual(1, prometheus_registry.get_sample_value(
+            "marqo_client_requests_total", {"operation": "search", "index": "my-index"}
+        ))
+
+    @unittest.skipIf(prometheus_client is not None, "prometheus_client is installed")
+    def test_prometheus_collector_requires_prometheus_client(self):
+        with self.assertRaises(ImportError):
+            MetricsRegistry().prometheus_collector()
+
+    def test_invalid_buckets(self):
+        with self.assertRaises(InvalidArgError):
+            MetricsRegistry(buckets=[])
+        with self.assertRaises(InvalidArgError):
+            MetricsRegistry(buckets=[0, 1])
+
+    def test_deepcopy(self):
+        registry = MetricsRegistry(buckets=[1, 2])
+        registry.record_request("get", "indexes", "", 0.1)
+        copied = copy.deepcopy(registry)
+        self.assertEqual({}, copied.snapshot())
+        self.assertEqual((1.0, 2.0), copied.buckets)
+
+
+@mark.fixed
+class TestClientMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client("http://localhost:8882")
+        marqo_url_and_version_cache["http://localhost:8882"] = "_skipped"
+
+    def tearDown(self):
+        marqo_url_and_version_cache.clear()
+
+    def test_requests_sent_are_recorded(self):
+        responses = [
+            make_response(200, {"hits": [], "processingTimeMs": 12}),
+            make_response(404, {"message": "no index", "code": "index_not_found", "type": "invalid_request"}),
+        ]
+        with mock.patch("marqo._httprequests.HttpRequests._operation", return_value=mock.Mock(side_effect=responses)):
+            self.client.index("my-index").search("hello")
+            with self.assertRaises(MarqoWebError):
+                self.client.index("my-index").search("hello")
+
+        series = self.client.metrics()["search"]["my-index"]
+        self.assertEqual(2, series["requests"])
+        self.assertEqual({"index_not_found": 1}, series["errors"])
+        self.assertEqual(1, series["processingTimeSeconds"]["count"])
+        self.assertEqual(len(responses[0].content) + len(responses[1].content), series["bytesReceived"])
+        self.assertGreater(series["bytesSent"], 0)
+
+    def test_sizes_are_those_on_the_wire(self):
+        body = json.dumps({"hits": [{"_id": str(i)} for i in range(100)]}).encode("utf-8")
+        compressed = gzip.compress(body)
+
+        def send(url, headers, data, **kwargs):
+            response = requests.Response()
+            response.status_code = 200
+            # no Content-Length: the size is read from the connection
+            response.raw = urllib3.HTTPResponse(
+                body=io.BytesIO(compressed), headers={"Content-Encoding": "gzip"}, preload_content=False
+            )
+            response.request = requests.Request("POST", url, data=data).prepare()
+            self.sent = data
+            return response
+
+        with mock.patch("marqo._httprequests.HttpRequests._operation", return_value=mock.Mock(side_effect=send)):
+            self.client.index("my-index").search("hello")
+
+        series = self.client.metrics()["search"]["my-index"]
+        self.assertEqual(len(compressed), series["bytesReceived"])
+        self.assertEqual(len(self.sent), series["bytesSent"])
+
+    def test_registry_can_be_shared_between_clients(self):
+        registry = MetricsRegistry()
+        clients = [Client("http://localhost:8882", metrics_registry=registry) for _ in range(2)]
+        with mock.patch("marqo._httprequests.HttpRequests._operation",
+                        return_value=mock.Mock(side_effect=lambda **kwargs: make_response(200, {"results": []}))):
+            for client in clients:
+                client.get_indexes()
+
+        self.assertEqual(2, registry.snapshot()["get_indexes"][""]["requests"])
+        self.assertEqual(registry.snapshot(), clients[0].metrics())
+
+
+@mark.fixed
+class TestAsyncClientMetrics(unittest.IsolatedAsyncioTestCase):
+
+    async def test_requests_sent_are_recorded(self):
+        client = AsyncClient("http://localhost:8882")
+        client.http.transport = httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, json={"errors": False, "items": [{"_id": "1", "status": 200}]})
+        ))
+        try:
+            await client.index("my-index").add_documents([{"_id": "1", "title": "a"}], tensor_fields=["title"])
+        finally:
+            await client.close()
+
+        series = client.metrics()["add_documents"]["my-index"]
+        self.assertEqual(1, series["requests"])
+        self.assertEqual(1, series["documentsIngested"])
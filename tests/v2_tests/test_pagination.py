@@ -0,0 +1,143 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from pytest import mark
+
+from marqo.client import Client
+from marqo.errors import InvalidArgError
+from marqo.index import marqo_url_and_version_cache
+
+
+@mark.fixed
+class TestIterSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client("http://localhost:8882")
+        marqo_url_and_version_cache["http://localhost:8882"] = "_skipped"
+        self.lock = threading.Lock()
+        self.searches = []
+
+    def tearDown(self):
+        marqo_url_and_version_cache.clear()
+
+    def _post(self, num_docs):
+        def post(path, body, index_name, **kwargs):
+            with self.lock:
+                self.searches.append((body["offset"], body["limit"]))
+            ids = range(body["offset"], min(body["offset"] + body["limit"], num_docs))
+            return {"hits": [{"_id": str(i), "_score": 1.0} for i in ids]}
+        return post
+
+    def test_pages_until_short_page(self):
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=self._post(25)):
+            hits = list(self.client.index("my-index").iter_search("a", page_size=10, filter_string="x:y"))
+
+        self.assertEqual([str(i) for i in range(25)], [hit["_id"] for hit in hits])
+        self.assertEqual([(0, 10), (10, 10), (20, 10)], sorted(self.searches)[:3])
+        # at most one page is prefetched past the last one
+        self.assertLessEqual(len(self.searches), 4)
+
+    def test_limit(self):
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=self._post(100)):
+            hits = list(self.client.index("my-index").iter_search("a", page_size=10, limit=25))
+
+        self.assertEqual(25, len(hits))
+        self.assertEqual([(0, 10), (10, 10), (20, 5)], sorted(self.searches))
+
+    def test_stops_at_max_offset(self):
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=self._post(1000)):
+            hits = list(self.client.index("my-index").iter_search("a", page_size=10, max_offset=30))
+
+        self.assertEqual(40, len(hits))
+        self.assertEqual(30, max(offset for offset, _ in self.searches))
+
+    def test_stopping_early_stops_paging(self):
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=self._post(1000)):
+            hits = self.client.index("my-index").iter_search("a", page_size=10)
+            self.assertEqual("0", next(hits)["_id"])
+            hits.close()
+
+        self.assertLessEqual(len(self.searches), 3)
+
+    def test_invalid_args_are_rejected_eagerly(self):
+        index = self.client.index("my-index")
+        for kwargs in [{"page_size": 0}, {"limit": -1}, {"offset": 10}]:
+            with self.assertRaises(InvalidArgError):
+                index.iter_search("a", **kwargs)
+        with self.assertRaises(InvalidArgError):
+            index.export_documents("a", attributes_to_retrieve=["title"])
+
+
+@mark.fixed
+class TestExportDocuments(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client("http://localhost:8882")
+        marqo_url_and_version_cache["http://localhost:8882"] = "_skipped"
+
+    def tearDown(self):
+        marqo_url_and_version_cache.clear()
+
+    def test_exports_search_pages_with_get_documents(self):
+        def post(path, body, index_name, **kwargs):
+            self.assertEqual(["_id"], body["attributesToRetrieve"])
+            ids = range(body["offset"], min(body["offset"] + body["limit"], 7))
+            return {"hits": [{"_id": str(i)} for i in ids]}
+
+        def get(path, body, index_name, **kwargs):
+            self.assertEqual("indexes/my-index/documents?expose_facets=True", path)
+            return {"results": [{"_id": _id, "title": f"doc {_id}"} for _id in body]}
+
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=post), \
+                mock.patch("marqo._httprequests.HttpRequests.get", side_effect=get) as mock_get:
+            docs = list(self.client.index("my-index").export_documents("a", page_size=3, expose_facets=True))
+
+        self.assertEqual([f"doc {i}" for i in range(7)], [doc["title"] for doc in docs])
+        self.assertEqual(3, mock_get.call_count)
+
+
+@mark.fixed
+class TestSearchMany(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client("http://localhost:8882")
+        marqo_url_and_version_cache["http://localhost:8882"] = "_skipped"
+
+    def tearDown(self):
+        marqo_url_and_version_cache.clear()
+
+    def test_results_are_in_query_order(self):
+        lock = threading.Lock()
+        in_flight = [0]
+        max_in_flight = [0]
+
+        def post(path, body, index_name, **kwargs):
+            with lock:
+                in_flight[0] += 1
+                max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+            time.sleep(0.01 * (10 - int(body["q"])))
+            with lock:
+                in_flight[0] -= 1
+            return {"hits": [{"_id": body["q"]}], "limit": body["limit"], "filter": body.get("filter")}
+
+        queries = ({"q": str(i), "limit": i + 1, "filter_string": "a:b"} for i in range(10))
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=post):
+            results = list(self.client.index("my-index").search_many(queries, max_concurrency=3))
+
+        self.assertEqual([str(i) for i in range(10)], [res["hits"][0]["_id"] for res in results])
+        self.assertEqual(list(range(1, 11)), [res["limit"] for res in results])
+        self.assertTrue(all(res["filter"] == "a:b" for res in results))
+        self.assertLessEqual(max_in_flight[0], 3)
+
+    def test_search_errors_are_raised(self):
+        with mock.patch("marqo._httprequests.HttpRequests.post", return_value={"hits": []}):
+            results = self.client.index("my-index").search_many([{"q": "a"}, {"q": "b", "not_an_arg": 1}])
+            self.assertEqual({"hits": []}, next(results))
+            with self.assertRaises(TypeError):
+                next(results)
+
+    def test_invalid_concurrency(self):
+        with self.assertRaises(InvalidArgError):
+            self.client.index("my-index").search_many([], max_concurrency=0)
@@ -0,0 +1,285 @@
+import copy
+import threading
+import time
+import unittest
+from unittest import mock
+
+from pytest import mark
+
+from marqo.client import Client
+from marqo.errors import DocumentNotFoundError, InvalidArgError, MarqoWebError
+from marqo.index import marqo_url_and_version_cache
+from marqo.request_coalescing import DocumentLoader, MicroBatcher, SearchBatcher, SingleFlight
+
+
+def run_concurrently(fn, num_threads):
+    barrier = threading.Barrier(num_threads)
+    results = [None] * num_threads
+
+    def run(i):
+        barrier.wait()
+        try:
+            results[i] = fn(i)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+@mark.fixed
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_calls_are_collapsed(self):
+        single_flight = SingleFlight()
+        calls = []
+
+        def slow_call():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"hits": [{"_id": "a"}]}
+
+        results = run_concurrently(lambda i: single_flight.do("key", slow_call), 20)
+
+        self.assertEqual(1, len(calls))
+        self.assertTrue(all(res == {"hits": [{"_id": "a"}]} for res in results))
+        # every caller gets its own copy
+        self.assertEqual(20, len({id(res) for res in results}))
+        self.assertEqual({"calls": 20, "executed": 1, "collapsed": 19, "inFlight": 0}, single_flight.stats())
+
+    def test_different_keys_are_not_collapsed(self):
+        single_flight = SingleFlight()
+        results = run_concurrently(lambda i: single_flight.do(i % 2, lambda: time.sleep(0.1) or i % 2), 10)
+
+        self.assertEqual([i % 2 for i in range(10)], results)
+        self.assertEqual(2, single_flight.stats()["executed"])
+
+    def test_sequential_calls_are_not_collapsed(self):
+        single_flight = SingleFlight()
+        self.assertEqual(1, single_flight.do("key", lambda: 1))
+        self.assertEqual(2, single_flight.do("key", lambda: 2))
+        self.assertEqual(0, single_flight.stats()["collapsed"])
+
+    def test_errors_are_raised_to_every_caller(self):
+        single_flight = SingleFlight()
+
+        def failing_call():
+            time.sleep(0.2)
+            raise ValueError("boom")
+
+        results = run_concurrently(lambda i: single_flight.do("key", failing_call), 5)
+
+        self.assertTrue(all(isinstance(res, ValueError) for res in results))
+        self.assertEqual(1, single_flight.stats()["executed"])
+        self.assertEqual(0, single_flight.stats()["inFlight"])
+
+    def test_forget_detaches_calls_in_flight(self):
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocked_call():
+            started.set()
+            release.wait()
+            return "old"
+
+        leader = threading.Thread(target=single_flight.do, args=(("my-index", "q"), blocked_call))
+        leader.start()
+        started.wait()
+        single_flight.forget(lambda key: key[0] == "my-index")
+
+        self.assertEqual("new", single_flight.do(("my-index", "q"), lambda: "new"))
+        release.set()
+        leader.join()
+
+    def test_deepcopy(self):
+        single_flight = SingleFlight()
+        single_flight.do("key", lambda: 1)
+        self.assertEqual(0, copy.deepcopy(single_flight).stats()["calls"])
+
+
+@mark.fixed
+class TestSearchCoalescing(unittest.TestCase):
+
+    def setUp(self):
+        self.coalescer = SingleFlight()
+        self.client = Client("http://localhost:8882", search_coalescer=self.coalescer)
+        marqo_url_and_version_cache["http://localhost:8882"] = "_skipped"
+
+    def tearDown(self):
+        marqo_url_and_version_cache.clear()
+
+    def test_identical_concurrent_searches_share_one_request(self):
+        def post(path, body, index_name, **kwargs):
+            time.sleep(0.2)
+            return {"hits": [{"_id": body["q"]}]}
+
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=post) as mock_post:
+            results = run_concurrently(
+                lambda i: self.client.index("my-index").search("a" if i < 8 else "b", filter_string="x:y"), 10
+            )
+
+        self.assertEqual(["a"] * 8 + ["b"] * 2, [res["hits"][0]["_id"] for res in results])
+        self.assertEqual(2, mock_post.call_count)
+        self.assertEqual(8, self.coalescer.stats()["collapsed"])
+
+    def test_writes_detach_searches_in_flight(self):
+        index = self.client.index("my-index")
+        with mock.patch("marqo._httprequests.HttpRequests.post", return_value={"items": []}):
+            with mock.patch.object(self.coalescer, "forget") as mock_forget:
+                index.add_documents([{"_id": "1", "title": "a"}], tensor_fields=["title"])
+
+        predicate = mock_forget.call_args.args[0]
+        self.assertTrue(predicate(("my-index", "path", "body")))
+        self.assertFalse(predicate(("other-index", "path", "body")))
+
+
+@mark.fixed
+class TestSearchBatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.batcher = SearchBatcher(window_ms=200, max_batch_size=4)
+        self.client = Client("http://localhost:8882", search_batcher=self.batcher)
+        marqo_url_and_version_cache["http://localhost:8882"] = "_skipped"
+        self.lock = threading.Lock()
+        self.requests = []
+
+    def tearDown(self):
+        marqo_url_and_version_cache.clear()
+
+    def post(self, path, body, index_name, **kwargs):
+        with self.lock:
+            self.requests.append((path, body))
+        if path.startswith("indexes/bulk/search"):
+            return {"result": [{"hits": [{"_id": f"{q['index']}:{q['q']}"}]} for q in body["queries"]]}
+        return {"hits": [{"_id": f"{index_name}:{body['q']}"}], "processingTimeMs": 1}
+
+    def test_concurrent_searches_are_sent_as_bulk_searches(self):
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=self.post):
+            results = run_concurrently(
+                lambda i: self.client.index(f"index-{i % 2}").search(str(i), device="cuda", limit=i + 1), 8
+            )
+
+        self.assertEqual([f"index-{i % 2}:{i}" for i in range(8)], [res["hits"][0]["_id"] for res in results])
+        self.assertEqual(2, len(self.requests))
+        for path, body in self.requests:
+            self.assertEqual("indexes/bulk/search?&device=cuda", path)
+            self.assertEqual(4, len(body["queries"]))
+            self.assertTrue(all(q["limit"] == int(q["q"]) + 1 for q in body["queries"]))
+        self.assertEqual({"calls": 8, "batches": 2}, self.batcher.stats())
+
+    def test_lone_search_is_sent_as_a_regular_search(self):
+        batcher = SearchBatcher(window_ms=1, max_batch_size=4)
+        client = Client("http://localhost:8882", search_batcher=batcher)
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=self.post):
+            res = client.index("my-index").search("a")
+
+        self.assertEqual({"hits": [{"_id": "my-index:a"}], "processingTimeMs": 1}, res)
+        self.assertEqual("indexes/my-index/search", self.requests[0][0])
+
+    def test_unsupported_parameters_bypass_batching(self):
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=self.post):
+            results = run_concurrently(lambda i: self.client.index("my-index").search(str(i), ef_search=100), 3)
+
+        self.assertEqual(3, len(results))
+        self.assertEqual(["indexes/my-index/search"] * 3, [path for path, _ in self.requests])
+        self.assertEqual(0, self.batcher.stats()["calls"])
+
+    def test_bulk_search_errors_are_raised_to_every_caller(self):
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=ValueError("boom")):
+            results = run_concurrently(lambda i: self.client.index("my-index").search(str(i)), 4)
+
+        self.assertTrue(all(isinstance(res, ValueError) for res in results))
+
+    def test_invalid_search_only_fails_its_own_call(self):
+        def post(path, body, index_name, **kwargs):
+            queries = body["queries"] if path.startswith("indexes/bulk/search") else [body]
+            if any(q["q"] == "bad" for q in queries):
+                raise MarqoWebError("invalid filter", code="invalid_argument", error_type="invalid_request",
+                                    status_code=400)
+            return self.post(path, body, index_name, **kwargs)
+
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=post) as mock_post:
+            results = run_concurrently(
+                lambda i: self.client.index("my-index").search("bad" if i == 2 else str(i)), 4
+            )
+
+        self.assertIsInstance(results[2], MarqoWebError)
+        self.assertEqual(["my-index:0", "my-index:1", "my-index:3"],
+                         [results[i]["hits"][0]["_id"] for i in (0, 1, 3)])
+        # the rejected bulk search, then one search per caller
+        self.assertEqual(5, mock_post.call_count)
+
+    def test_server_errors_are_not_retried_one_by_one(self):
+        error = MarqoWebError("internal", code="internal", error_type="internal", status_code=500)
+        with mock.patch("marqo._httprequests.HttpRequests.post", side_effect=error) as mock_post:
+            results = run_concurrently(lambda i: self.client.index("my-index").search(str(i)), 4)
+
+        self.assertTrue(all(res is error for res in results))
+        self.assertEqual(1, mock_post.call_count)
+
+    def test_invalid_settings(self):
+        with self.assertRaises(InvalidArgError):
+            SearchBatcher(max_batch_size=0)
+        with self.assertRaises(InvalidArgError):
+            SearchBatcher(window_ms=-1)
+
+    def test_subclass_must_define_send_batch(self):
+        class Batcher(MicroBatcher):
+            pass
+
+        with self.assertRaises(TypeError):
+            Batcher()
+
+
+@mark.fixed
+class TestDocumentLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.loader = DocumentLoader(window_ms=200, max_batch_size=6)
+        self.client = Client("http://localhost:8882", document_loader=self.loader)
+        marqo_url_and_version_cache["http://localhost:8882"] = "_skipped"
+        self.requests = []
+
+    def tearDown(self):
+        marqo_url_and_version_cache.clear()
+
+    def get(self, path, body=None, index_name=None, **kwargs):
+        self.requests.append((path, body))
+        if body is None:
+            return {"_id": path.split("/")[-1], "title": "single"}
+        return {"results": [
+            {"_id": _id, "_found": True, "title": f"doc {_id}"} if _id != "missing" else {"_id": _id, "_found": False}
+            for _id in body
+        ]}
+
+    def test_concurrent_get_document_calls_share_one_request(self):
+        ids = ["a", "b", "a", "missing", "c", "b"]
+        with mock.patch("marqo._httprequests.HttpRequests.get", side_effect=self.get):
+            results = run_concurrently(
+                lambda i: self.client.index("my-index").get_document(ids[i], expose_facets=True), 6
+            )
+
+        self.assertEqual(1, len(self.requests))
+        path, requested_ids = self.requests[0]
+        self.assertEqual("indexes/my-index/documents?expose_facets=True", path)
+        self.assertEqual(["a", "b", "c", "missing"], sorted(requested_ids))
+        for document_id, res in zip(ids, results):
+            if document_id == "missing":
+                self.assertIsInstance(res, DocumentNotFoundError)
+            else:
+                self.assertEqual({"_id": document_id, "title": f"doc {document_id}"}, res)
+        # callers asking for the same document get their own copies
+        self.assertIsNot(results[0], results[2])
+
+    def test_lone_call_is_sent_as_a_regular_get_document(self):
+        client = Client("http://localhost:8882", document_loader=DocumentLoader(window_ms=1))
+        with mock.patch("marqo._httprequests.HttpRequests.get", side_effect=self.get):
+            res = client.index("my-index").get_document("a")
+
+        self.assertEqual({"_id": "a", "title": "single"}, res)
+        self.assertEqual([("indexes/my-index/documents/a", None)], self.requests)
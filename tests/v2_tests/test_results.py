@@ -0,0 +1,193 @@
+import importlib.util
+import json
+import unittest
+from unittest import mock
+
+import numpy as np
+import pytest
+import requests
+from pytest import mark
+
+from marqo import serializers
+from marqo.client import Client
+from marqo.errors import InvalidArgError
+from marqo.index import marqo_url_and_version_cache
+from marqo.results import ColumnarBulkSearchResult, ColumnarSearchResult, Hit, SearchResult
+
+RESPONSE = {
+    "hits": [
+        {"_id": "a", "_score": 0.9, "title": "Shoes", "_highlights": [{"title": "Shoes"}]},
+        {"_id": "b", "_score": 0.7, "title": "Socks", "price": 3},
+    ],
+    "query": "footwear",
+    "limit": 2,
+    "offset": 0,
+    "processingTimeMs": 12,
+}
+
+
+@mark.fixed
+class TestSearchResult(unittest.TestCase):
+
+    def test_hits_are_views_over_the_response(self):
+        result = SearchResult(RESPONSE)
+
+        self.assertEqual(2, len(result))
+        self.assertEqual(["a", "b"], result.ids())
+        self.assertEqual([0.9, 0.7], result.scores())
+        self.assertEqual(("footwear", 2, 0, 12), (result.query, result.limit, result.offset, result.processing_time_ms))
+
+        hit = result[1]
+        self.assertEqual(("b", 0.7, None), (hit.id, hit.score, hit.highlights))
+        self.assertEqual("Socks", hit["title"])
+        self.assertEqual({"title": "Socks", "price": 3}, hit.fields("title", "price", "missing"))
+        self.assertIsNone(hit.get("missing"))
+        self.assertIn("price", hit)
+        self.assertIs(RESPONSE["hits"][1], hit.to_dict())
+        self.assertEqual(["a", "b"], [h.id for h in result])
+        self.assertEqual([Hit(RESPONSE["hits"][1])], result[1:])
+        self.assertIs(RESPONSE, result.raw)
+
+    def test_hits_have_no_instance_dict(self):
+        with self.assertRaises(AttributeError):
+            SearchResult(RESPONSE)[0].some_attribute = 1
+
+    def test_search_as_search_result(self):
+        client = Client("http://localhost:8882")
+        marqo_url_and_version_cache["http://localhost:8882"] = "_skipped"
+        self.addCleanup(marqo_url_and_version_cache.clear)
+        with mock.patch("marqo._httprequests.HttpRequests.post", return_value=RESPONSE):
+            result = client.index("my-index").search("footwear", as_search_result=True)
+            plain = client.index("my-index").search("footwear")
+
+        self.assertIsInstance(result, SearchResult)
+        self.assertEqual(["a", "b"], result.ids())
+        self.assertIs(RESPONSE, plain)
+
+    def test_lazily_decoded_response(self):
+        pytest.importorskip("simdjson")
+        result = SearchResult(serializers.lazy_loads(json.dumps(RESPONSE).encode("utf-8")))
+
+        self.assertEqual(2, len(result))
+        self.assertEqual(["a", "b"], result.ids())
+        self.assertEqual([0.9, 0.7], result.scores())
+        self.assertEqual(("footwear", 2, 0, 12), (result.query, result.limit, result.offset, result.processing_time_ms))
+        hit = result[0]
+        self.assertEqual([{"title": "Shoes"}], hit.highlights)
+        self.assertEqual({"title": "Shoes"}, hit.fields("title", "missing"))
+        self.assertEqual(RESPONSE["hits"][0], hit.to_dict())
+        self.assertEqual([Hit(RESPONSE["hits"][1])], result[1:])
+        self.assertEqual(RESPONSE, result.raw)
+        self.assertIsInstance(result.raw, dict)
+        self.assertEqual(["a", "b"], result.ids())
+
+    def test_search_as_search_result_decodes_lazily(self):
+        pytest.importorskip("simdjson")
+        client = Client("http://localhost:8882")
+        marqo_url_and_version_cache["http://localhost:8882"] = "_skipped"
+        self.addCleanup(marqo_url_and_version_cache.clear)
+
+        def send(url, headers, data, **kwargs):
+            response = requests.Response()
+            response.status_code = 200
+            response._content = json.dumps(RESPONSE).encode("utf-8")
+            return response
+
+        with mock.patch("marqo._httprequests.HttpRequests._operation", return_value=mock.Mock(side_effect=send)), \
+                mock.patch("marqo.serializers.lazy_loads", wraps=serializers.lazy_loads) as lazy_loads:
+            result = client.index("my-index").search("footwear", as_search_result=True)
+            plain = client.index("my-index").search("footwear")
+
+        lazy_loads.assert_called_once()
+        self.assertEqual(["a", "b"], result.ids())
+        self.assertEqual(RESPONSE, result.raw)
+        self.assertEqual(RESPONSE, plain)
+        # the processing time is read from lazily decoded responses too
+        self.assertEqual(2, client.metrics()["search"]["my-index"]["processingTimeSeconds"]["count"])
+
+    @unittest.skipIf(importlib.util.find_spec("simdjson"), "pysimdjson is installed")
+    def test_lazy_loads_without_pysimdjson(self):
+        with self.assertRaises(ImportError):
+            serializers.lazy_loads(b"{}")
+
+
+@mark.fixed
+class TestColumnarSearchResult(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client("http://localhost:8882")
+        marqo_url_and_version_cache["http://localhost:8882"] = "_skipped"
+
+    def tearDown(self):
+        marqo_url_and_version_cache.clear()
+
+    def test_to_arrays(self):
+        columns = SearchResult(RESPONSE).to_arrays()
+
+        self.assertEqual(["a", "b"], columns.ids.tolist())
+        np.testing.assert_array_equal(np.array([0.9, 0.7]), columns.scores)
+        self.assertEqual(np.float64, columns.scores.dtype)
+        self.assertTrue(columns.scores.flags["C_CONTIGUOUS"])
+        self.assertIsNone(columns.embeddings)
+        self.assertEqual(12, columns.processing_time_ms)
+
+    def test_embeddings_of_exposed_facets(self):
+        response = {"hits": [
+            {"_id": "a", "_score": 0.9, "_tensor_facets": [{"title": "x", "_embedding": [1.0, 2.0]}]},
+            {"_id": "b", "_score": 0.7, "_tensor_facets": [{"title": "y", "_embedding": [3.0, 4.0]}]},
+        ]}
+        columns = ColumnarSearchResult(response)
+
+        self.assertEqual((2, 2), columns.embeddings.shape)
+        self.assertEqual(np.float32, columns.embeddings.dtype)
+        np.testing.assert_array_equal([[1, 2], [3, 4]], columns.embeddings)
+
+    def test_empty_response(self):
+        columns = ColumnarSearchResult({"hits": []})
+        self.assertEqual(0, len(columns))
+        self.assertEqual((0,), columns.scores.shape)
+
+    def test_search_as_columnar(self):
+        with mock.patch("marqo._httprequests.HttpRequests.post", return_value=RESPONSE):
+            columns = self.client.index("my-index").search("footwear", as_columnar=True)
+
+        self.assertIsInstance(columns, ColumnarSearchResult)
+        self.assertEqual(["a", "b"], columns.ids.tolist())
+        with self.assertRaises(InvalidArgError):
+            self.client.index("my-index").search("footwear", as_columnar=True, as_search_result=True)
+
+    def test_bulk_search_as_columnar(self):
+        response = {"result": [RESPONSE, {"hits": [{"_id": "c", "_score": 0.5}]}], "processingTimeMs": 20}
+        with mock.patch("marqo._httprequests.HttpRequests.post", return_value=response):
+            columns = self.client.bulk_search(
+                [{"index": "my-index", "q": "footwear"}, {"index": "my-index", "q": "hats"}], as_columnar=True
+            )
+
+        self.assertIsInstance(columns, ColumnarBulkSearchResult)
+        self.assertEqual([["a", "b"], ["c"]], [result.ids.tolist() for result in columns])
+        self.assertIs(response, columns.raw)
+
+    def test_to_arrow(self):
+        pytest.importorskip("pyarrow")
+        response = {"result": [RESPONSE, {"hits": [{"_id": "c", "_score": 0.5}]}]}
+        table = ColumnarBulkSearchResult(response).to_arrow()
+
+        self.assertEqual([0, 0, 1], table.column("query").to_pylist())
+        self.assertEqual(["a", "b", "c"], table.column("_id").to_pylist())
+        self.assertEqual([0, 1, 0], table.column("rank").to_pylist())
+
+    def test_bulk_to_arrow_promotes_missing_embeddings(self):
+        pytest.importorskip("pyarrow")
+        with_embeddings = {"hits": [
+            {"_id": "a", "_score": 0.9, "_tensor_facets": [{"_embedding": [0.1, 0.2]}]},
+        ]}
+        table = ColumnarBulkSearchResult({"result": [with_embeddings, RESPONSE]}).to_arrow()
+
+        self.assertEqual(["a", "a", "b"], table.column("_id").to_pylist())
+        self.assertEqual(2, len(table.column("_embedding").to_pylist()[0]))
+        self.assertEqual([None, None], table.column("_embedding").to_pylist()[1:])
+
+    @unittest.skipIf(importlib.util.find_spec("pyarrow"), "pyarrow is installed")
+    def test_to_arrow_without_pyarrow(self):
+        with self.assertRaises(ImportError):
+            SearchResult(RESPONSE).to_arrays().to_arrow()
@@ -0,0 +1,168 @@
+import unittest
+from email.utils import formatdate
+import time
+from unittest import mock
+
+import requests
+from pytest import mark
+
+from marqo._httprequests import HttpRequests
+from marqo.client import Client
+from marqo.config import Config
+from marqo.default_instance_mappings import DefaultInstanceMappings
+from marqo.errors import BackendTimeoutError, InvalidArgError, MarqoWebError
+from marqo.index import marqo_url_and_version_cache
+from marqo.retry import RetryPolicy
+
+
+def mock_response(status_code, json_body=None, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = b'{}' if json_body is None else requests.compat.json.dumps(json_body).encode()
+    response.headers.update(headers or {})
+    return response
+
+
+@mark.fixed
+class TestRetryPolicy(unittest.TestCase):
+
+    def test_exponential_backoff_without_jitter(self):
+        policy = RetryPolicy(max_attempts=5, backoff_factor=0.5, max_backoff=3, jitter=False)
+        self.assertEqual([0.5, 1, 2, 3],
+                         [policy.delay_for_status(503, {}, attempt) for attempt in range(1, 5)])
+        self.assertIsNone(policy.delay_for_status(503, {}, 5))
+
+    def test_jitter_is_bounded(self):
+        policy = RetryPolicy(max_attempts=10, backoff_factor=1, max_backoff=4)
+        for _ in range(100):
+            self.assertTrue(0 <= policy.delay_for_error(True, 3) <= 4)
+
+    def test_status_codes(self):
+        policy = RetryPolicy(retry_on_status_codes=[429])
+        self.assertIsNotNone(policy.delay_for_status(429, {}, 1))
+        self.assertIsNone(policy.delay_for_status(503, {}, 1))
+        self.assertIsNone(policy.delay_for_status(400, {}, 1))
+
+    def test_retry_after(self):
+        policy = RetryPolicy(max_backoff=10)
+        self.assertEqual(7, policy.delay_for_status(429, {"Retry-After": "7"}, 1))
+        self.assertEqual(10, policy.delay_for_status(429, {"Retry-After": "120"}, 1))
+        as_date = policy.delay_for_status(503, {"Retry-After": formatdate(time.time() + 5, usegmt=True)}, 1)
+        self.assertTrue(3 <= as_date <= 5)
+
+        ignoring = RetryPolicy(backoff_factor=1, respect_retry_after=False, jitter=False)
+        self.assertEqual(1, ignoring.delay_for_status(429, {"Retry-After": "7"}, 1))
+
+    def test_errors(self):
+        policy = RetryPolicy(retry_on_timeout=False)
+        self.assertIsNone(policy.delay_for_error(True, 1))
+        self.assertIsNotNone(policy.delay_for_error(False, 1))
+
+    def test_invalid_policy(self):
+        with self.assertRaises(InvalidArgError):
+            RetryPolicy(max_attempts=0)
+        with self.assertRaises(InvalidArgError):
+            RetryPolicy(backoff_factor=-1)
+
+
+@mark.fixed
+@mock.patch("marqo._httprequests.time.sleep")
+class TestSendRequestRetries(unittest.TestCase):
+
+    def setUp(self):
+        self.config = Config(
+            instance_mappings=DefaultInstanceMappings("http://localhost:8882"),
+            retry_policy=RetryPolicy(max_attempts=3, jitter=False)
+        )
+        self.http = HttpRequests(self.config)
+
+    @mock.patch("requests.sessions.Session.request")
+    def test_retryable_request_is_retried_on_transient_status(self, mock_request, mock_sleep):
+        mock_request.side_effect = [mock_response(503), mock_response(429, headers={"Retry-After": "2"}),
+                                    mock_response(200, {"hits": []})]
+
+        self.assertEqual({"hits": []}, self.http.post("indexes/a/search", body={}, index_name="a", retryable=True))
+        self.assertEqual(3, mock_request.call_count)
+        self.assertEqual([mock.call(0.5), mock.call(2.0)], mock_sleep.call_args_list)
+
+    @mock.patch("requests.sessions.Session.request")
+    def test_gives_up_after_max_attempts(self, mock_request, mock_sleep):
+        mock_request.return_value = mock_response(503, {"message": "busy", "code": "busy", "type": "x"})
+
+        with self.assertRaises(MarqoWebError) as cm:
+            self.http.get("indexes/a/stats", index_name="a")
+        self.assertEqual(503, cm.exception.status_code)
+        self.assertEqual(3, mock_request.call_count)
+
+    @mock.patch("requests.sessions.Session.request")
+    def test_non_retryable_request_is_not_retried(self, mock_request, mock_sleep):
+        mock_request.return_value = mock_response(503)
+
+        with self.assertRaises(MarqoWebError):
+            self.http.post("indexes/a", body={})
+        self.assertEqual(1, mock_request.call_count)
+        mock_sleep.assert_not_called()
+
+    @mock.patch("requests.sessions.Session.request")
+    def test_timeouts_are_retried(self, mock_request, mock_sleep):
+        mock_request.side_effect = [requests.exceptions.Timeout(), mock_response(200, {"results": []})]
+        self.assertEqual({"results": []}, self.http.get("indexes/a/documents", body=["1"], index_name="a"))
+
+        mock_request.side_effect = requests.exceptions.Timeout()
+        with self.assertRaises(BackendTimeoutError):
+            self.http.get("indexes/a/documents", body=["1"], index_name="a")
+
+    @mock.patch("requests.sessions.Session.request")
+    def test_no_retry_policy(self, mock_request, mock_sleep):
+        http = HttpRequests(Config(instance_mappings=DefaultInstanceMappings("http://localhost:8882")))
+        mock_request.return_value = mock_response(503)
+        with self.assertRaises(MarqoWebError):
+            http.get("indexes/a/stats", index_name="a")
+        self.assertEqual(1, mock_request.call_count)
+
+    @mock.patch("requests.sessions.Session.request")
+    def test_retries_are_reported_in_telemetry(self, mock_request, mock_sleep):
+        self.config.use_telemetry = True
+        mock_request.side_effect = [mock_response(502), mock_response(200, {"hits": [], "telemetry": {}})]
+
+        res = self.http.post("indexes/a/search", body={}, index_name="a", retryable=True)
+        self.assertEqual(1, res["telemetry"]["clientRetries"])
+
+
+@mark.fixed
+@mock.patch("marqo._httprequests.time.sleep")
+@mock.patch("requests.sessions.Session.request")
+class TestAddDocumentsRetries(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client("http://localhost:8882", retry_policy=RetryPolicy(max_attempts=3, jitter=False))
+        marqo_url_and_version_cache["http://localhost:8882"] = "_skipped"
+        self.addCleanup(marqo_url_and_version_cache.clear)
+        self.ok = mock_response(200, {"errors": False, "items": []})
+
+    def test_timeouts_are_retried_for_documents_with_ids(self, mock_request, mock_sleep):
+        for client_batch_size in (None, 2):
+            with self.subTest(client_batch_size=client_batch_size):
+                mock_request.reset_mock()
+                mock_request.side_effect = [requests.exceptions.Timeout(), self.ok]
+                self.client.index("my-index").add_documents(
+                    [{"_id": "1", "title": "a"}], client_batch_size=client_batch_size, tensor_fields=["title"]
+                )
+                self.assertEqual(2, mock_request.call_count)
+
+    def test_documents_without_ids_are_not_resent_after_a_timeout(self, mock_request, mock_sleep):
+        for client_batch_size in (None, 2):
+            with self.subTest(client_batch_size=client_batch_size):
+                mock_request.reset_mock()
+                mock_request.side_effect = [requests.exceptions.Timeout(), self.ok]
+                with self.assertRaises(BackendTimeoutError):
+                    self.client.index("my-index").add_documents(
+                        [{"_id": "1", "title": "a"}, {"title": "b"}], client_batch_size=client_batch_size,
+                        tensor_fields=["title"]
+                    )
+                self.assertEqual(1, mock_request.call_count)
+
+    def test_documents_without_ids_are_resent_on_retried_status_codes(self, mock_request, mock_sleep):
+        mock_request.side_effect = [mock_response(503), self.ok]
+        self.client.index("my-index").add_documents([{"title": "b"}], tensor_fields=["title"])
+        self.assertEqual(2, mock_request.call_count)
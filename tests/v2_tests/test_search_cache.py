@@ -0,0 +1,147 @@
+import copy
+import unittest
+from unittest import mock
+
+from pytest import mark
+
+from marqo.client import Client
+from marqo.errors import InvalidArgError
+from marqo.index import marqo_url_and_version_cache
+from marqo.search_cache import SearchResultCache
+
+
+@mark.fixed
+class TestSearchResultCache(unittest.TestCase):
+
+    def test_key_ignores_body_key_order(self):
+        self.assertEqual(
+            SearchResultCache.make_key("my-index", "indexes/my-index/search", {"q": "a", "limit": 10}),
+            SearchResultCache.make_key("my-index", "indexes/my-index/search", {"limit": 10, "q": "a"}),
+        )
+
+    def test_hit_returns_a_fresh_copy(self):
+        cache = SearchResultCache()
+        key = cache.make_key("my-index", "path", {"q": "a"})
+        self.assertIsNone(cache.get(key))
+        cache.put(key, {"hits": [{"_id": "1"}]})
+
+        res = cache.get(key)
+        res["hits"].append({"_id": "2"})
+        self.assertEqual({"hits": [{"_id": "1"}]}, cache.get(key))
+        self.assertEqual((2, 1), (cache.hits, cache.misses))
+
+    def test_lru_eviction_on_max_entries(self):
+        cache = SearchResultCache(max_entries=2)
+        keys = [cache.make_key("my-index", "path", {"q": q}) for q in "abc"]
+        cache.put(keys[0], {"q": "a"})
+        cache.put(keys[1], {"q": "b"})
+        cache.get(keys[0])
+        cache.put(keys[2], {"q": "c"})
+
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertIsNotNone(cache.get(keys[2]))
+        self.assertEqual(1, cache.evictions)
+
+    def test_eviction_on_max_bytes(self):
+        cache = SearchResultCache(max_bytes=30)
+        keys = [cache.make_key("my-index", "path", {"q": q}) for q in "abc"]
+        for key in keys:
+            cache.put(key, {"hits": "x" * 5})
+
+        self.assertLessEqual(cache.stats()["bytes"], 30)
+        self.assertIsNone(cache.get(keys[0]))
+        self.assertIsNotNone(cache.get(keys[2]))
+
+        cache.put(cache.make_key("my-index", "path", {"q": "big"}), {"hits": "x" * 100})
+        self.assertEqual(1, cache.stats()["entries"])
+
+    def test_entries_expire(self):
+        cache = SearchResultCache(ttl=10)
+        key = cache.make_key("my-index", "path", {"q": "a"})
+        with mock.patch("marqo.search_cache.time.monotonic", return_value=100):
+            cache.put(key, {"hits": []})
+        with mock.patch("marqo.search_cache.time.monotonic", return_value=105):
+            self.assertIsNotNone(cache.get(key))
+        with mock.patch("marqo.search_cache.time.monotonic", return_value=111):
+            self.assertIsNone(cache.get(key))
+        self.assertEqual(0, cache.stats()["entries"])
+
+    def test_invalidate_index_only_drops_that_index(self):
+        cache = SearchResultCache()
+        key_1 = cache.make_key("index-1", "path", {"q": "a"})
+        key_2 = cache.make_key("index-2", "path", {"q": "a"})
+        cache.put(key_1, {"hits": []})
+        cache.put(key_2, {"hits": []})
+
+        cache.invalidate_index("index-1")
+        self.assertIsNone(cache.get(key_1))
+        self.assertIsNotNone(cache.get(key_2))
+
+    def test_response_fetched_before_invalidation_is_not_cached(self):
+        cache = SearchResultCache()
+        key = cache.make_key("my-index", "path", {"q": "a"})
+        generation = cache.generation("my-index")
+        cache.invalidate_index("my-index")
+        cache.put(key, {"hits": []}, generation=generation)
+        self.assertIsNone(cache.get(key))
+
+    def test_invalid_args(self):
+        for kwargs in [{"max_entries": 0}, {"ttl": 0}, {"max_bytes": -1}]:
+            with self.assertRaises(InvalidArgError):
+                SearchResultCache(**kwargs)
+
+    def test_deepcopy_gives_empty_cache_with_same_settings(self):
+        cache = SearchResultCache(max_entries=5, ttl=3, max_bytes=100)
+        cache.put(cache.make_key("my-index", "path", {}), {"hits": []})
+        copied = copy.deepcopy(cache)
+        self.assertEqual((5, 3, 100), (copied.max_entries, copied.ttl, copied.max_bytes))
+        self.assertEqual(0, copied.stats()["entries"])
+
+
+@mark.fixed
+class TestIndexSearchCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = SearchResultCache()
+        self.client = Client("http://localhost:8882", search_cache=self.cache)
+        marqo_url_and_version_cache["http://localhost:8882"] = "_skipped"
+
+    def tearDown(self):
+        marqo_url_and_version_cache.clear()
+
+    def test_repeated_search_is_served_from_cache(self):
+        with mock.patch("marqo._httprequests.HttpRequests.post", return_value={"hits": []}) as mock_post:
+            self.client.index("my-index").search("hello", filter_string="a:b", limit=5)
+            res = self.client.index("my-index").search("hello", filter_string="a:b", limit=5)
+            self.client.index("my-index").search("hello", filter_string="a:b", limit=6)
+
+        self.assertEqual({"hits": []}, res)
+        self.assertEqual(2, mock_post.call_count)
+        self.assertEqual({"hits": 1, "misses": 2}, {k: self.cache.stats()[k] for k in ("hits", "misses")})
+
+    def test_search_is_not_cached_without_a_cache(self):
+        client = Client("http://localhost:8882")
+        with mock.patch("marqo._httprequests.HttpRequests.post", return_value={"hits": []}) as mock_post:
+            client.index("my-index").search("hello")
+            client.index("my-index").search("hello")
+        self.assertEqual(2, mock_post.call_count)
+
+    def test_writes_invalidate_the_index(self):
+        index = self.client.index("my-index")
+        writes = [
+            lambda: index.add_documents([{"_id": "1"}], tensor_fields=[]),
+            lambda: index.add_documents([{"_id": "1"}], client_batch_size=1, tensor_fields=[]),
+            lambda: index.update_documents([{"_id": "1"}]),
+            lambda: index.update_documents([{"_id": "1"}], client_batch_size=1),
+            lambda: index.delete_documents(["1"]),
+        ]
+        with mock.patch("marqo._httprequests.HttpRequests.post", return_value={"hits": []}), \
+                mock.patch("marqo._httprequests.HttpRequests.patch", return_value={}):
+            for write in writes:
+                index.search("hello")
+                self.client.index("other-index").search("hello")
+                self.assertEqual(2, self.cache.stats()["entries"])
+                write()
+                self.assertEqual(1, self.cache.stats()["entries"])
+                self.client.index("other-index").search("hello")
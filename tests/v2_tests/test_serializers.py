@@ -0,0 +1,177 @@
+import json
+import unittest
+from unittest import mock
+
+import numpy as np
+import requests
+from pytest import mark
+
+from marqo.client import Client
+from marqo.config import Config
+from marqo.default_instance_mappings import DefaultInstanceMappings
+from marqo.index import marqo_url_and_version_cache
+from marqo.search_cache import SearchResultCache
+from marqo.serializers import JsonSerializer, OrjsonSerializer, default_serializer, orjson
+
+
+class _SerializerTests:
+    serializer_class = JsonSerializer
+
+    def setUp(self):
+        self.serializer = self.serializer_class()
+
+    def test_round_trip(self):
+        payload = {"documents": [{"_id": "1", "text": "héllo", "score": 0.5, "tags": None, "ok": True}]}
+        self.assertEqual(payload, self.serializer.loads(self.serializer.dumps(payload)))
+
+    def test_numpy_arrays_and_scalars(self):
+        payload = {
+            "vector": np.array([0.5, 0.25, 1.0], dtype=np.float32),
+            "ints": np.arange(3),
+            "matrix": np.ones((2, 2), dtype=np.float64),
+            "half": np.array([0.5], dtype=np.float16),
+            "strided": np.arange(6, dtype=np.float32)[::2],
+            "scalar": np.float32(0.5),
+        }
+        self.assertEqual(
+            {"vector": [0.5, 0.25, 1.0], "ints": [0, 1, 2], "matrix": [[1.0, 1.0], [1.0, 1.0]],
+             "half": [0.5], "strided": [0.0, 2.0, 4.0], "scalar": 0.5},
+            json.loads(self.serializer.dumps(payload))
+        )
+
+    def test_output_is_valid_json_for_stdlib(self):
+        payload = {"big": 2 ** 70, "nested": {"list": [1, "a", None]}}
+        self.assertEqual(payload, json.loads(self.serializer.dumps(payload)))
+
+    def test_unsupported_type_raises_type_error(self):
+        with self.assertRaises(TypeError):
+            self.serializer.dumps({"a": object()})
+
+    def test_loads_accepts_bytes_and_str(self):
+        self.assertEqual({"a": 1}, self.serializer.loads(b'{"a": 1}'))
+        self.assertEqual({"a": 1}, self.serializer.loads('{"a": 1}'))
+
+
+@mark.fixed
+class TestJsonSerializer(_SerializerTests, unittest.TestCase):
+    serializer_class = JsonSerializer
+
+
+@mark.fixed
+@unittest.skipIf(orjson is None, "orjson is not installed")
+class TestOrjsonSerializer(_SerializerTests, unittest.TestCase):
+    serializer_class = OrjsonSerializer
+
+    def test_loads_falls_back_for_nan(self):
+        self.assertTrue(np.isnan(self.serializer.loads(b'{"a": NaN}')["a"]))
+
+
+@mark.fixed
+class TestConfigSerializer(unittest.TestCase):
+
+    def test_default_serializer(self):
+        expected = OrjsonSerializer if orjson is not None else JsonSerializer
+        self.assertIsInstance(default_serializer(), expected)
+        self.assertIsInstance(Config(DefaultInstanceMappings("http://localhost:8882")).serializer, expected)
+
+    def test_send_request_uses_configured_serializer(self):
+        serializer = mock.MagicMock(wraps=JsonSerializer())
+        client = Client("http://localhost:8882", serializer=serializer)
+        response = mock.MagicMock(status_code=200, content=b'{"hits": []}')
+
+        with mock.patch("requests.sessions.Session.post", return_value=response) as mock_post:
+            res = client.http.post("indexes/my-index/search", body={"q": "a", "vector": np.zeros(2)})
+
+        self.assertEqual({"hits": []}, res)
+        serializer.dumps.assert_called_once()
+        serializer.loads.assert_called_once_with(b'{"hits": []}')
+        self.assertEqual({"q": "a", "vector": [0.0, 0.0]}, json.loads(mock_post.call_args.kwargs["data"]))
+
+    def test_string_bodies_are_sent_as_is(self):
+        client = Client("http://localhost:8882")
+        response = mock.MagicMock(status_code=200, content=b'{}')
+        with mock.patch("requests.sessions.Session.post", return_value=response) as mock_post:
+            client.http.post("indexes/bulk/search", body='{"queries": []}')
+        self.assertEqual('{"queries": []}', mock_post.call_args.kwargs["data"])
+
+    def test_non_json_response_raises_a_requests_error(self):
+        client = Client("http://localhost:8882")
+        response = mock.MagicMock(status_code=200, content=b"<html>proxy error</html>")
+        with mock.patch("requests.sessions.Session.get", return_value=response):
+            with self.assertRaises(requests.exceptions.JSONDecodeError) as cm:
+                client.http.get("indexes/my-index/stats")
+        self.assertIsInstance(cm.exception, requests.exceptions.RequestException)
+
+    def test_version_check_is_skipped_on_non_json_response(self):
+        client = Client("http://localhost:8882")
+        self.addCleanup(marqo_url_and_version_cache.clear)
+        response = mock.MagicMock(status_code=200, content=b"<html>proxy error</html>")
+        with mock.patch("requests.sessions.Session.get", return_value=response), \
+                self.assertLogs("marqo", level="WARNING") as logs:
+            client.index("my-index")
+        self.assertIn("problem trying to check the Marqo version", logs.output[0])
+        self.assertEqual("_skipped", marqo_url_and_version_cache["http://localhost:8882"])
+
+
+@mark.fixed
+class TestNumpyVectors(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client("http://localhost:8882")
+        marqo_url_and_version_cache["http://localhost:8882"] = "_skipped"
+
+    def tearDown(self):
+        marqo_url_and_version_cache.clear()
+
+    def _sent_body(self, mock_request):
+        return json.loads(mock_request.call_args.kwargs["data"])
+
+    def test_add_documents_with_numpy_custom_vectors(self):
+        docs = [{"_id": "1", "my_vector": {"content": "a", "vector": np.array([0.5, 0.25], dtype=np.float32)}}]
+        response = mock.MagicMock(status_code=200, content=b'{"errors": false, "items": []}')
+        with mock.patch("requests.sessions.Session.post", return_value=response) as mock_post:
+            self.client.index("my-index").add_documents(docs, tensor_fields=["my_vector"])
+
+        self.assertEqual({"content": "a", "vector": [0.5, 0.25]}, self._sent_body(mock_post)["documents"][0]["my_vector"])
+
+    def test_search_and_bulk_search_with_numpy_context(self):
+        context = {"tensor": [{"vector": np.array([1.0, 0.0]), "weight": np.float32(0.5)}]}
+        response = mock.MagicMock(status_code=200, content=b'{"hits": [], "result": []}')
+        with mock.patch("requests.sessions.Session.post", return_value=response) as mock_post:
+            self.client.index("my-index").search("a", context=context)
+            search_body = self._sent_body(mock_post)
+            self.client.bulk_search([{"index": "my-index", "q": "a", "context": context}])
+            bulk_body = self._sent_body(mock_post)
+
+        expected = {"tensor": [{"vector": [1.0, 0.0], "weight": 0.5}]}
+        self.assertEqual(expected, search_body["context"])
+        self.assertEqual(expected, bulk_body["queries"][0]["context"])
+
+    def test_get_documents_embeddings_as_numpy(self):
+        response = {"results": [
+            {"_id": "1", "_tensor_facets": [{"text": "a", "_embedding": [0.5, 0.25]}]},
+            {"_id": "2", "_found": False},
+        ]}
+        with mock.patch("marqo._httprequests.HttpRequests.get", return_value=response):
+            res = self.client.index("my-index").get_documents(["1", "2"], expose_facets=True, embeddings_as_numpy=True)
+
+        embedding = res["results"][0]["_tensor_facets"][0]["_embedding"]
+        self.assertIsInstance(embedding, np.ndarray)
+        self.assertEqual(np.float32, embedding.dtype)
+        np.testing.assert_array_equal([0.5, 0.25], embedding)
+
+    def test_get_document_embeddings_as_lists_by_default(self):
+        response = {"_id": "1", "_tensor_facets": [{"text": "a", "_embedding": [0.5, 0.25]}]}
+        with mock.patch("marqo._httprequests.HttpRequests.get", return_value=response):
+            res = self.client.index("my-index").get_document("1", expose_facets=True)
+        self.assertEqual([0.5, 0.25], res["_tensor_facets"][0]["_embedding"])
+
+    def test_search_cache_key_covers_whole_vector(self):
+        path = "indexes/my-index/search"
+        vector = np.zeros(2000)
+        other_vector = vector.copy()
+        other_vector[1000] = 1
+        self.assertNotEqual(
+            SearchResultCache.make_key("my-index", path, {"context": {"tensor": [{"vector": vector}]}}),
+            SearchResultCache.make_key("my-index", path, {"context": {"tensor": [{"vector": other_vector}]}}),
+        )
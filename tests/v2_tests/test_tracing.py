@@ -0,0 +1,181 @@
+import contextlib
+import contextvars
+import json
+import threading
+import types
+import unittest
+from unittest import mock
+
+import requests
+from pytest import mark
+
+from marqo import tracing
+from marqo.client import Client
+from marqo.cloud_helpers import cloud_wait_for_indexes_status
+from marqo.enums import IndexStatus
+from marqo.errors import MarqoWebError
+from marqo.index import marqo_url_and_version_cache
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class FakeSpan:
+
+    def __init__(self, name, kind, attributes, parent):
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.parent = parent
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def is_recording(self):
+        return True
+
+
+class FakeTracer:
+    """Records spans like an OpenTelemetry tracer, tracking the current span in a context variable."""
+
+    def __init__(self):
+        self.spans = []
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def start_as_current_span(self, name, kind=None, attributes=None):
+        span = FakeSpan(name, kind, attributes, _current_span.get())
+        with self.lock:
+            self.spans.append(span)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = e
+            raise
+        finally:
+            _current_span.reset(token)
+
+    def named(self, name):
+        return [span for span in self.spans if span.name == name]
+
+
+def make_response(status_code, body):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body).encode("utf-8")
+    return response
+
+
+@mark.fixed
+class TestTracingDisabled(unittest.TestCase):
+
+    def test_spans_are_shared_no_ops(self):
+        with mock.patch.multiple("marqo.tracing", trace=None, propagate=None):
+            with tracing.start_span("marqo.search", {tracing.INDEX_NAME: "my-index"}) as span:
+                span.set_attribute(tracing.HIT_COUNT, 1)
+                self.assertFalse(span.is_recording())
+            self.assertIs(span, tracing.start_span("marqo.request", client=True))
+
+            headers = {}
+            tracing.inject_context(headers)
+            self.assertEqual({}, headers)
+
+
+@mark.fixed
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+        self.tracer = FakeTracer()
+        fake_trace = types.SimpleNamespace(
+            get_tracer=lambda name: self.tracer,
+            SpanKind=types.SimpleNamespace(CLIENT="client", INTERNAL="internal"),
+        )
+        fake_propagate = types.SimpleNamespace(
+            inject=lambda headers: headers.__setitem__("traceparent", _current_span.get().name)
+        )
+        patcher = mock.patch.multiple("marqo.tracing", trace=fake_trace, propagate=fake_propagate)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.client = Client("http://localhost:8882")
+        marqo_url_and_version_cache["http://localhost:8882"] = "_skipped"
+        self.addCleanup(marqo_url_and_version_cache.clear)
+        self.sent_headers = []
+
+    def mock_operation(self, respond):
+        def send(url, headers, data, **kwargs):
+            self.sent_headers.append(headers)
+            return respond(url, data)
+        return mock.patch("marqo._httprequests.HttpRequests._operation", return_value=mock.Mock(side_effect=send))
+
+    def test_search_span_is_the_parent_of_the_request_span(self):
+        with self.mock_operation(lambda url, data: make_response(200, {"hits": [{}], "processingTimeMs": 7})):
+            self.client.index("my-index").search("hello")
+
+        search_span, = self.tracer.named("marqo.search")
+        request_span, = self.tracer.named("marqo.request")
+        self.assertIs(search_span, request_span.parent)
+        self.assertEqual("client", request_span.kind)
+        self.assertEqual({
+            tracing.INDEX_NAME: "my-index", tracing.SEARCH_METHOD: "TENSOR", tracing.HIT_COUNT: 1,
+            tracing.PROCESSING_TIME_MS: 7
+        }, search_span.attributes)
+        self.assertEqual("POST", request_span.attributes[tracing.HTTP_REQUEST_METHOD])
+        self.assertEqual("search", request_span.attributes[tracing.OPERATION])
+        self.assertEqual(200, request_span.attributes[tracing.HTTP_RESPONSE_STATUS_CODE])
+        self.assertGreater(request_span.attributes[tracing.HTTP_REQUEST_BODY_SIZE], 0)
+        # the trace context sent is that of the request span
+        self.assertEqual("marqo.request", self.sent_headers[0]["traceparent"])
+
+    def test_failed_requests_are_recorded(self):
+        error_body = {"message": "no index", "code": "index_not_found", "type": "invalid_request"}
+        with self.mock_operation(lambda url, data: make_response(404, error_body)):
+            with self.assertRaises(MarqoWebError):
+                self.client.index("my-index").search("hello")
+
+        request_span, = self.tracer.named("marqo.request")
+        self.assertIsInstance(request_span.error, MarqoWebError)
+        self.assertEqual(404, request_span.attributes[tracing.HTTP_RESPONSE_STATUS_CODE])
+
+    def test_add_documents_batches_sent_concurrently_have_their_own_spans(self):
+        def respond(url, data):
+            documents = json.loads(data)["documents"]
+            return make_response(200, {"errors": False, "processingTimeMs": 3, "items": [{}] * len(documents)})
+
+        documents = [{"_id": str(i), "title": "a"} for i in range(5)]
+        with self.mock_operation(respond):
+            self.client.index("my-index").add_documents(
+                documents, tensor_fields=["title"], client_batch_size=2, max_concurrency=3
+            )
+
+        add_documents_span, = self.tracer.named("marqo.add_documents")
+        batch_spans = sorted(self.tracer.named("marqo.add_documents.batch"),
+                             key=lambda span: span.attributes[tracing.BATCH_NUMBER])
+        self.assertEqual([0, 1, 2], [span.attributes[tracing.BATCH_NUMBER] for span in batch_spans])
+        self.assertEqual([2, 2, 1], [span.attributes[tracing.DOCUMENT_COUNT] for span in batch_spans])
+        self.assertTrue(all(span.parent is add_documents_span for span in batch_spans))
+        self.assertTrue(all(span.parent.name == "marqo.add_documents.batch"
+                            for span in self.tracer.named("marqo.request")))
+
+    def test_bulk_search_span(self):
+        with self.mock_operation(lambda url, data: make_response(200, {"result": [], "processingTimeMs": 5})):
+            self.client.bulk_search([{"index": "b", "q": "x"}, {"index": "a", "q": "y"}])
+
+        bulk_search_span, = self.tracer.named("marqo.bulk_search")
+        self.assertEqual({
+            tracing.INDEX_NAMES: ["a", "b"], tracing.QUERY_COUNT: 2, tracing.PROCESSING_TIME_MS: 5
+        }, bulk_search_span.attributes)
+        request_span, = self.tracer.named("marqo.request")
+        self.assertEqual("bulk_search", request_span.attributes[tracing.OPERATION])
+        self.assertNotIn(tracing.INDEX_NAME, request_span.attributes)
+
+    @mock.patch("marqo.cloud_helpers.time.sleep")
+    def test_cloud_wait_span(self, mock_sleep):
+        req = mock.Mock()
+        req.get.return_value = {"results": [{"indexName": "a", "indexStatus": "READY"}]}
+
+        cloud_wait_for_indexes_status(req, ["a"], IndexStatus.READY)
+
+        wait_span, = self.tracer.named("marqo.wait_for_index_status")
+        self.assertEqual({tracing.INDEX_NAMES: ["a"], tracing.INDEX_STATUS: "READY"}, wait_span.attributes)